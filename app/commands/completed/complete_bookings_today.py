@@ -9,7 +9,7 @@ import pytz
 
 from app.core.config import get_settings
 from app.core.logging_config import setup_logging
-from app.utils.email_service import send_completed_bookings_email
+from app.utils.email_service import close_email_client, send_completed_bookings_email
 from app.commands.completed.booking import Booking
 
 logger = logging.getLogger(__name__)
@@ -60,9 +60,8 @@ async def main():
     logger.info(msg)
 
     toaddr = settings.SUPPORT_EMAIL
-    await asyncio.to_thread(
-        send_completed_bookings_email, toaddr, completed_count, tz_count, tz_name
-    )
+    await send_completed_bookings_email(toaddr, completed_count, tz_count, tz_name)
+    await close_email_client()
 
 
 if __name__ == "__main__":
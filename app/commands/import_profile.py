@@ -0,0 +1,59 @@
+# app/commands/import_profile.py
+
+import argparse
+import subprocess
+import sys
+
+DEFAULT_MODULES = [
+    "app.main",
+    "app.commands.completed.complete_bookings_today",
+    "app.commands.klaviyo.dispatch_outbox",
+    "app.database.missing_locations",
+]
+
+
+def profile_imports(module: str) -> list[tuple[str, int, int]]:
+    """Import `module` in a fresh interpreter and return (name, self_us, cumulative_us) rows."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    return parse_importtime(result.stderr)
+
+
+def parse_importtime(text: str) -> list[tuple[str, int, int]]:
+    """Parse ``-X importtime`` output into (name, self_us, cumulative_us) rows."""
+    rows = []
+    for line in text.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # header line
+        rows.append((fields[2].strip(), int(fields[0]), int(fields[1])))
+    return rows
+
+
+def report(module: str, top: int) -> str:
+    """Total import time for `module` plus the `top` slowest modules by self time."""
+    rows = profile_imports(module)
+    total = next((cum for name, _, cum in rows if name == module), 0)
+    lines = [f"{module}: {total / 1000:.0f} ms total, {len(rows)} modules"]
+    for name, self_us, cum_us in sorted(rows, key=lambda r: r[1], reverse=True)[:top]:
+        lines.append(f"  {self_us / 1000:8.1f} ms self  {cum_us / 1000:8.1f} ms cumulative  {name}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report the slowest imports for app entry points.")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    for module in args.modules:
+        print(report(module, args.top))
+        print()
+
+
+if __name__ == "__main__":
+    main()
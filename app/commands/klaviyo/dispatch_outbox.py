@@ -0,0 +1,105 @@
+# app/commands/klaviyo/dispatch_outbox.py
+
+import asyncio
+import sys
+import logging
+
+from app.core.config import get_settings
+from app.core.database import async_session, engine
+from app.core.logging_config import setup_logging
+from app.daos.customer import customer_dao
+from app.daos.klaviyo_outbox import klaviyo_outbox_dao
+from app.utils.klaviyo import KlaviyoRejected, process_with_klaviyo, seed_known_profiles, WebhookRoute
+
+logger = logging.getLogger(__name__)
+
+
+async def dispatch_batch(batch_size: int, concurrency: int, max_attempts: int, lease_seconds: float) -> int:
+    """Claim one batch of outbox rows, send them, and record each outcome.
+
+    The claim is its own short transaction: rows are marked IN_PROGRESS with
+    a lease and committed, so no lock or connection is held while Klaviyo is
+    called (retries and rate-limit waits included). Each outcome is then
+    written in its own transaction. A dispatcher that dies mid-batch leaves
+    its rows to be claimed again once the lease runs out.
+    Returns the number of rows claimed.
+    """
+    async with async_session() as db:
+        rows = await klaviyo_outbox_dao.claim_batch(db, batch_size, lease_seconds)
+        if not rows:
+            return 0
+        await db.commit()
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send_one(row):
+        async with semaphore:
+            try:
+                await process_with_klaviyo(row.payload, WebhookRoute(row.route))
+            except Exception as e:
+                logger.warning("Klaviyo outbox %s (%s) failed: %s", row.id, row.route, e)
+                klaviyo_outbox_dao.mark_failed(
+                    row, str(e), max_attempts, retryable=not isinstance(e, KlaviyoRejected),
+                )
+            else:
+                klaviyo_outbox_dao.mark_sent(row)
+            async with async_session() as db:
+                if not await klaviyo_outbox_dao.save_outcome(db, row):
+                    logger.warning(
+                        "Klaviyo outbox %s (%s): lease lost before the outcome was saved", row.id, row.route,
+                    )
+
+    await asyncio.gather(*(send_one(row) for row in rows))
+
+    logger.info("Klaviyo outbox: dispatched %d rows", len(rows))
+    return len(rows)
+
+
+async def run(once: bool = False):
+    """Dispatch outbox rows until stopped, or until nothing is due when `once` is set."""
+    settings = get_settings()
+    while True:
+        claimed = await dispatch_batch(
+            settings.KLAVIYO_OUTBOX_BATCH_SIZE,
+            settings.KLAVIYO_OUTBOX_CONCURRENCY,
+            settings.KLAVIYO_OUTBOX_MAX_ATTEMPTS,
+            settings.KLAVIYO_OUTBOX_LEASE_SECONDS,
+        )
+        if claimed:
+            continue
+        if once:
+            return
+        await asyncio.sleep(settings.KLAVIYO_OUTBOX_POLL_SECONDS)
+
+
+async def seed_profile_cache() -> int:
+    """Seed the known-profile cache with the emails in our customer table.
+
+    Emails with an undelivered CUSTOMER_NEW row are left out: their Klaviyo
+    profile may not exist yet, and a cached entry would make the dispatcher
+    skip creating it.
+    """
+    async with async_session() as db:
+        emails = await customer_dao.get_all_emails(db)
+        undelivered = await klaviyo_outbox_dao.get_undelivered_emails(db, WebhookRoute.CUSTOMER_NEW)
+    count = seed_known_profiles(e for e in emails if e and e.strip().lower() not in undelivered)
+    logger.info("Klaviyo profile cache seeded with %d customer emails", count)
+    return count
+
+
+async def main():
+    settings = get_settings()
+    setup_logging()
+    once = "--once" in sys.argv[1:]
+
+    logger.info("%s: Klaviyo outbox dispatcher starting (once=%s)", settings.APP_NAME, once)
+    try:
+        if settings.KLAVIYO_PROFILE_CACHE_SEED:
+            await seed_profile_cache()
+        await run(once=once)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
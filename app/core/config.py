@@ -41,6 +41,17 @@ class Settings(BaseSettings):
 
     # Database configuration
     DATABASE_URL: str = "postgresql:///test"
+    # Optional read replica for GET endpoints and MCP tools (primary when empty)
+    READ_DATABASE_URL: str = ""
+    # Prepared statements asyncpg keeps per pooled connection (0 disables, e.g. behind PgBouncer)
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 256
+
+    # MCP tool calls: how many run at once (0 disables the limit), how long an
+    # extra call waits for a slot before a 429, and their own connection pool
+    MCP_MAX_CONCURRENCY: int = 4
+    MCP_QUEUE_TIMEOUT_SECONDS: float = 5.0
+    MCP_DB_POOL_SIZE: int = 3
+    MCP_DB_MAX_OVERFLOW: int = 1
 
     # Proxy (was Launch27)
     PROXY_URL: str = ""
@@ -55,6 +66,12 @@ class Settings(BaseSettings):
     SERVICE_ACCOUNT_CREDENTIALS: str = ""
     GMAIL_SERVICE_ACCOUNT_CREDENTIALS: str = ""
 
+    # Error log records waiting to be emailed; more are dropped and summarised
+    ERROR_EMAIL_QUEUE_SIZE: int = 100
+    # Errors are grouped by type and route: the first is emailed at once, repeats
+    # as one digest per window
+    ERROR_DIGEST_WINDOW_SECONDS: float = 300.0
+
     # Custom fields
     CUSTOM_SOURCE: str | None = None
     CUSTOM_BOOKED_BY: str | None = None
@@ -77,6 +94,57 @@ class Settings(BaseSettings):
     MY_KLAVIYO_URL: str = ""
     MY_KLAVIYO_API_KEY: str = ""
 
+    # Klaviyo outbox dispatcher (worker process)
+    KLAVIYO_OUTBOX_BATCH_SIZE: int = 50
+    KLAVIYO_OUTBOX_CONCURRENCY: int = 5
+    KLAVIYO_OUTBOX_POLL_SECONDS: float = 5.0
+    KLAVIYO_OUTBOX_MAX_ATTEMPTS: int = 5
+    # A claimed row is handed to another dispatcher if not finished in this long
+    KLAVIYO_OUTBOX_LEASE_SECONDS: float = 300.0
+
+    # Known Klaviyo profiles (skips GET /profile/check for emails seen before)
+    KLAVIYO_PROFILE_CACHE_SIZE: int = 20000
+    KLAVIYO_PROFILE_CACHE_TTL: int = 86400
+    KLAVIYO_PROFILE_CACHE_SEED: bool = False
+
+    # Suppress repeat house/bond notifications with an identical payload (0 disables)
+    KLAVIYO_DEDUPE_WINDOW_SECONDS: int = 86400
+    KLAVIYO_DEDUPE_CACHE_SIZE: int = 20000
+
+    # Outbound Klaviyo rate limit shared by all requests in the process (0 disables)
+    KLAVIYO_RATE_PER_SECOND: float = 3.0
+    KLAVIYO_RATE_BURST: int = 10
+
+    # Keyset pagination for booking searches (used when limit or cursor is given)
+    SEARCH_PAGE_SIZE_DEFAULT: int = 100
+    SEARCH_PAGE_SIZE_MAX: int = 500
+
+    # Booking search result cache (per process; webhook writes invalidate, 0 disables)
+    SEARCH_CACHE_SIZE: int = 256
+    SEARCH_CACHE_TTL_SECONDS: float = 60.0
+
+    # After a webhook write, results that touch the written booking are not cached
+    # for this long, so a lagging read replica cannot refill a cache with the old row
+    CACHE_WRITE_WINDOW_SECONDS: float = 5.0
+
+    # Serialised booking documents for GET /booking/{id} (per process, 0 disables)
+    BOOKING_CACHE_SIZE: int = 1024
+    BOOKING_CACHE_TTL_SECONDS: float = 300.0
+
+    # Answer GET /booking/stats from booking_daily_rollup where it can (enable
+    # after a full app/database/rebuild_rollup.py run)
+    STATS_USE_ROLLUP: bool = False
+
+    # POST /sql/query (read-only SQL for MCP): the role queries run as (SELECT on
+    # bookings and customer only; the endpoint is off while empty), per-statement
+    # time limit and row cap
+    SQL_QUERY_ROLE: str = ""
+    SQL_QUERY_TIMEOUT_MS: int = 5000
+    SQL_QUERY_MAX_ROWS: int = 500
+
+    # Rows fetched per server-side cursor round trip by GET /booking/export
+    EXPORT_CHUNK_SIZE: int = 1000
+
     # zip2location URL
     ZIP2LOCATION_URL: str = ""
 
@@ -85,6 +153,11 @@ class Settings(BaseSettings):
     def SQLALCHEMY_DATABASE_URI(self) -> str:
         return self.DATABASE_URL.replace("postgres://", "postgresql://")
 
+    @computed_field
+    @property
+    def SQLALCHEMY_READ_DATABASE_URI(self) -> str | None:
+        return self.READ_DATABASE_URL.replace("postgres://", "postgresql://") or None
+
     @computed_field
     @property
     def debug(self) -> bool:
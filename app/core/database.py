@@ -5,6 +5,7 @@ from collections.abc import AsyncGenerator
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 
 from app.core.config import get_settings
+from app.core.surface import MCP, current_surface
 
 
 def _async_url(url: str) -> str:
@@ -12,19 +13,57 @@ def _async_url(url: str) -> str:
     return url.replace("postgresql://", "postgresql+asyncpg://", 1)
 
 
-engine = create_async_engine(
-    _async_url(get_settings().SQLALCHEMY_DATABASE_URI),
-    pool_pre_ping=True,
-    pool_size=3,
-    max_overflow=2,
-    pool_timeout=10,
-    pool_recycle=1800,
-)
+def _create_engine(url: str, pool_size: int = 3, max_overflow: int = 2):
+    return create_async_engine(
+        _async_url(url),
+        pool_pre_ping=True,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=10,
+        pool_recycle=1800,
+        connect_args={
+            "prepared_statement_cache_size": get_settings().DB_PREPARED_STATEMENT_CACHE_SIZE,
+        },
+    )
+
+
+engine = _create_engine(get_settings().SQLALCHEMY_DATABASE_URI)
+
+# Reads get their own pool on the replica, so analytics load cannot starve
+# webhook writes of connections. Without a replica they share the primary.
+_read_url = get_settings().SQLALCHEMY_READ_DATABASE_URI
+read_engine = _create_engine(_read_url) if _read_url else engine
+
+# MCP tool calls get pools of their own on the same databases, so parallel
+# tool calls wait for each other rather than for webhook connections.
+_mcp_pool = {
+    "pool_size": get_settings().MCP_DB_POOL_SIZE,
+    "max_overflow": get_settings().MCP_DB_MAX_OVERFLOW,
+}
+mcp_engine = _create_engine(get_settings().SQLALCHEMY_DATABASE_URI, **_mcp_pool)
+mcp_read_engine = _create_engine(_read_url, **_mcp_pool) if _read_url else mcp_engine
 
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+read_session = async_sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False)
+mcp_session = async_sessionmaker(mcp_engine, class_=AsyncSession, expire_on_commit=False)
+mcp_read_session = async_sessionmaker(mcp_read_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+def open_session(read: bool = False) -> AsyncSession:
+    """New session for the current request surface: the MCP pools for MCP
+    tool calls, otherwise the primary (or, with `read`, the replica)."""
+    if current_surface.get() == MCP:
+        return mcp_read_session() if read else mcp_session()
+    return read_session() if read else async_session()
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """FastAPI dependency that yields an async database session."""
-    async with async_session() as session:
+    async with open_session() as session:
+        yield session
+
+
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """FastAPI dependency that yields a session on the read replica (or the primary)."""
+    async with open_session(read=True) as session:
         yield session
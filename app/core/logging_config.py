@@ -4,12 +4,26 @@ import logging
 import logging.config
 
 from app.core.config import get_settings
-from app.utils.gmail_handler import GmailOAuth2Handler
+
+# QueuedGmailHandler | None. The handler classes are imported in setup_logging()
+# only when mail is configured, so other processes skip the Google libraries.
+_mail_handler = None
+
+
+def shutdown_logging():
+    """Flush queued error emails and stop the Gmail handler's listener thread."""
+    global _mail_handler
+    if _mail_handler is not None:
+        logging.getLogger().removeHandler(_mail_handler)
+        _mail_handler.close()
+        _mail_handler = None
 
 
 def setup_logging():
     """Configure root logger and attach a Gmail error handler in production."""
+    global _mail_handler
     settings = get_settings()
+    shutdown_logging()
 
     log_level = "DEBUG" if settings.debug else "INFO"
     if settings.testing:
@@ -43,21 +57,31 @@ def setup_logging():
 
     logging.config.dictConfig(config)
 
-    # Add Gmail error handler in non-debug mode
+    # Error emails are production-only: in debug mode no Gmail handler is
+    # attached and errors only reach the console.
     if not settings.debug and settings.GMAIL_SERVICE_ACCOUNT_CREDENTIALS:
         try:
+            from app.utils.gmail_handler import GmailOAuth2Handler, QueuedGmailHandler
+
             m = settings.SUPPORT_EMAIL.split("@")
             to_addr = f"{m[0]}+error@{m[1]}"
-            subject = f"{settings.APP_NAME}: Error Detected"
+            subject = f"{settings.APP_NAME}: Error Digest"
 
-            mail_handler = GmailOAuth2Handler(
+            gmail_handler = GmailOAuth2Handler(
                 credentials_json=settings.GMAIL_SERVICE_ACCOUNT_CREDENTIALS,
                 impersonate_user=settings.FROM_ADDRESS,
                 recipient=to_addr,
                 subject=subject,
             )
-            mail_handler.setLevel(logging.ERROR)
-            logging.getLogger().addHandler(mail_handler)
+            # Emails go out from a listener thread so logging never blocks the
+            # caller. The first error of each type and route is sent at once;
+            # repeats are batched into one digest per window.
+            _mail_handler = QueuedGmailHandler(
+                gmail_handler,
+                maxsize=settings.ERROR_EMAIL_QUEUE_SIZE,
+                digest_window=settings.ERROR_DIGEST_WINDOW_SECONDS,
+            )
+            logging.getLogger().addHandler(_mail_handler)
         except Exception as e:
             logging.getLogger(__name__).warning(
                 "Failed to set up Gmail error handler: %s", e
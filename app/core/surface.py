@@ -0,0 +1,79 @@
+"""Request surfaces (webhook/API vs MCP tool calls) and per-surface concurrency limits.
+
+FastApiMCP runs each tool call as an in-process HTTP request against this
+app. Its client marks those requests with the X-Request-Surface header. The
+middleware records the surface in a ContextVar so database.py can give MCP
+its own connection pool. It also caps how many MCP requests run at once,
+so a burst of parallel tool calls cannot starve webhook ingestion.
+"""
+
+import asyncio
+import logging
+from contextvars import ContextVar
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+SURFACE_HEADER = "X-Request-Surface"
+API, MCP = "api", "mcp"
+
+current_surface: ContextVar[str] = ContextVar("current_surface", default=API)
+
+
+class SurfaceLimitMiddleware:
+    """ASGI middleware that tags each HTTP request with its surface and
+    limits how many requests per surface run concurrently.
+
+    `limits` maps surface -> max concurrent requests; surfaces not listed (or
+    with a limit of 0) are unlimited. A request over the limit waits up to
+    `queue_timeout` seconds for a slot (0: not at all), then gets a 429.
+    """
+
+    def __init__(self, app: ASGIApp, limits: dict[str, int], queue_timeout: float = 0.0):
+        self.app = app
+        self.queue_timeout = queue_timeout
+        self._slots = {surface: asyncio.Semaphore(n) for surface, n in limits.items() if n > 0}
+
+    async def _acquire(self, slots: asyncio.Semaphore) -> bool:
+        if self.queue_timeout <= 0:
+            if slots.locked():
+                return False
+            await slots.acquire()
+            return True
+        try:
+            async with asyncio.timeout(self.queue_timeout):
+                await slots.acquire()
+        except TimeoutError:
+            return False
+        return True
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        surface = MCP if Headers(scope=scope).get(SURFACE_HEADER, "").lower() == MCP else API
+        token = current_surface.set(surface)
+        try:
+            slots = self._slots.get(surface)
+            if slots is None:
+                await self.app(scope, receive, send)
+                return
+            if not await self._acquire(slots):
+                logger.warning("%s request to %s rejected: concurrency limit reached", surface, scope["path"])
+                response = JSONResponse(
+                    status_code=429,
+                    content={"error": "Too many concurrent requests", "status_code": 429},
+                    headers={"Retry-After": "1"},
+                )
+                await response(scope, receive, send)
+                return
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                slots.release()
+        finally:
+            current_surface.reset(token)
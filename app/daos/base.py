@@ -3,10 +3,11 @@
 import logging
 
 from fastapi import HTTPException
-from sqlalchemy import exc
+from sqlalchemy import Integer, String, bindparam, exc, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 
+from app.models.text_search import text_search_document
 from app.utils.locations import get_location
 from app.utils.validation import truncate_field, safe_int
 
@@ -53,15 +54,70 @@ async def safe_commit(
     return False
 
 
-class BaseDAO:
+def text_search_statement(model, columns):
+    """Select `columns` plus a score for rows whose contact fields match :q.
+
+    ``:q <% document`` is the pg_trgm word-similarity operator, which the GIN
+    trigram index serves; rows come best match first, :limit of them.
+    """
+    q = bindparam("q", type_=String)
+    document = text_search_document()
+    score = func.word_similarity(q, document).label("score")
+    return (
+        select(*columns, score)
+        .where(q.op("<%")(document))
+        .order_by(score.desc(), model.id.desc())
+        .limit(bindparam("limit", type_=Integer))
+    )
+
+
+class StatementDAO:
+    """A DAO bound to a model, with a per-instance cache of built statements."""
+
     def __init__(self, model):
         self.model = model
+        self._statements = {}
+
+    def _statement(self, key, build):
+        """Return the statement cached under `key`, building it on first use.
+
+        Hot queries are built once with bindparam() placeholders and executed
+        with a params dict, so each call skips constructing the select() and
+        reuses its memoized SQLAlchemy cache key.
+        """
+        stmt = self._statements.get(key)
+        if stmt is None:
+            stmt = self._statements[key] = build()
+        return stmt
+
+
+class BaseDAO(StatementDAO):
+    # Optional rollup DAO kept in step with every write (BookingDAO sets one)
+    rollup = None
+
+    def _by_booking_id(self):
+        return self._statement(
+            "by_booking_id",
+            lambda: select(self.model).where(self.model.booking_id == bindparam("booking_id")),
+        )
+
+    def _for_write(self):
+        """Select a record about to be changed; locked when a rollup tracks its old values."""
+        if self.rollup is None:
+            return self._by_booking_id()
+        return self._statement("by_booking_id_for_update", lambda: self._by_booking_id().with_for_update())
+
+    def _rollup_snapshot(self, row):
+        return self.rollup.snapshot(row) if self.rollup is not None else None
+
+    async def _apply_rollup(self, db: AsyncSession, before, row):
+        """Stage rollup deltas for a write; they commit or roll back with it."""
+        if self.rollup is not None:
+            await self.rollup.apply(db, before, self._rollup_snapshot(row))
 
     async def get_by_booking_id(self, db: AsyncSession, booking_id):
         """Look up a single record by its external booking_id."""
-        result = await db.execute(
-            select(self.model).where(self.model.booking_id == booking_id)
-        )
+        result = await db.execute(self._by_booking_id(), {"booking_id": booking_id})
         return result.scalars().first()
 
     async def create_update_booking(self, db: AsyncSession, new_data):
@@ -71,10 +127,9 @@ class BaseDAO:
             logger.error("booking has no booking_id - ignore this data")
             raise HTTPException(status_code=422, detail="booking has no booking_id")
 
-        result = await db.execute(
-            select(self.model).where(self.model.booking_id == booking_id)
-        )
+        result = await db.execute(self._for_write(), {"booking_id": booking_id})
         b = result.scalars().first()
+        before = self._rollup_snapshot(b)
 
         if b is None:
             logger.info("haven't seen this booking - ADDING to database")
@@ -89,6 +144,7 @@ class BaseDAO:
                 'Loading ... Name: "%s" team: "%s" booking_id: %s',
                 b.name, b.teams_assigned, b.booking_id,
             )
+        await self._apply_rollup(db, before, b)
 
         await safe_commit(
             db, str(b.model_dump()),
@@ -98,11 +154,10 @@ class BaseDAO:
     async def update_booking(self, db: AsyncSession, new_data):
         """Apply cancellation-specific updates to an existing booking."""
         booking_id = safe_int(new_data.get("booking_id"))
-        result = await db.execute(
-            select(self.model).where(self.model.booking_id == booking_id)
-        )
+        result = await db.execute(self._for_write(), {"booking_id": booking_id})
         b = result.scalars().first()
         logger.info("have seen this booking - UPDATING database")
+        before = self._rollup_snapshot(b)
 
         b.update_from_cancellation(new_data)
         await _resolve_location(b, new_data, id_field="booking_id")
@@ -111,6 +166,7 @@ class BaseDAO:
             'Loading ... Name: "%s" team: "%s" booking_id: %s',
             b.name, b.teams_assigned, b.booking_id,
         )
+        await self._apply_rollup(db, before, b)
 
         await safe_commit(
             db, str(b.model_dump()),
@@ -122,11 +178,10 @@ class BaseDAO:
         booking_id = safe_int(new_data.get("id"))
         if booking_id is None:
             return
-        result = await db.execute(
-            select(self.model).where(self.model.booking_id == booking_id)
-        )
+        result = await db.execute(self._for_write(), {"booking_id": booking_id})
         row = result.scalars().first()
         if row:
+            await self._apply_rollup(db, self._rollup_snapshot(row), None)
             await db.delete(row)
         if await safe_commit(db, str(new_data), f"Integrity error: {new_data}"):
             logger.info("Booking deleted from table: %s", booking_id)
@@ -1,19 +1,86 @@
 """Booking DAO with date-range and search query methods."""
 
 import logging
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
-from sqlalchemy import and_
+from sqlalchemy import Date, Integer, and_, bindparam, cast, func, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 
-from app.daos.base import BaseDAO
+from app.daos.base import BaseDAO, text_search_statement
+from app.daos.booking_rollup import booking_rollup_dao
 from app.models.booking import Booking
 
 logger = logging.getLogger(__name__)
 
+# Columns each search reads. These queries return lightweight Row tuples
+# (attribute access by field name) instead of hydrating full Booking objects.
+SEARCH_FIELDS = ("service_category", "name", "location", "booking_id", "service_date")
+COMPLETED_FIELDS = (
+    "booking_id", "service_date", "name", "email", "postcode", "location",
+    "teams_assigned", "created_by", "service_category", "service", "frequency",
+)
+EMAIL_WEEK_FIELDS = (
+    "booking_id", "service_date", "first_name", "last_name", "email", "postcode",
+    "location", "teams_assigned", "service_category", "service", "frequency",
+)
+MISSING_LOCATION_FIELDS = ("booking_id", "postcode")
+TEXT_SEARCH_FIELDS = (
+    "booking_id", "service_date", "booking_status", "service_category",
+    "name", "address", "email", "phone", "location",
+)
+
+# Dimensions GET /booking/stats may group by (name -> Booking field).
+STATS_DIMENSIONS = {
+    "category": "service_category",
+    "status": "booking_status",
+    "location": "location",
+    "team": "teams_assigned",
+    "day": "service_date",
+    "month": "service_date",
+}
+
+# GET /booking/query: projectable fields (the surrogate id stays internal),
+# the default projection, and the fields results may be sorted by.
+QUERY_FIELDS = tuple(f for f in Booking.model_fields if f != "id")
+QUERY_DEFAULT_FIELDS = ("booking_id", "service_date", "name", "service_category", "booking_status", "location")
+QUERY_SORT_FIELDS = ("service_date", "created_at", "updated_at", "booking_id", "final_price", "name")
+
+# Rows per server-side cursor round trip for iter_bookings_missing_locations.
+DEFAULT_CHUNK_SIZE = 1000
+
 
 class BookingDAO(BaseDAO):
+    rollup = booking_rollup_dao
+
+    def _columns(self, fields):
+        return [getattr(self.model, f) for f in fields]
+
+    def _keyset(self, stmt, sort_date, paged: bool, after: bool):
+        """Order by (sort_date, booking_id) and take :limit rows, after the
+        (:after_date, :after_id) key when `after` is set.
+
+        Unpaged statements are returned unchanged.
+        """
+        if not paged:
+            return stmt
+        if after:
+            stmt = stmt.where(
+                tuple_(sort_date, self.model.booking_id)
+                > tuple_(bindparam("after_date", type_=Date), bindparam("after_id", type_=Integer))
+            )
+        return stmt.order_by(sort_date, self.model.booking_id).limit(bindparam("limit", type_=Integer))
+
+    @staticmethod
+    def _keyset_params(limit: int | None, after: tuple | None) -> dict:
+        if limit is None:
+            return {}
+        params = {"limit": limit}
+        if after is not None:
+            after_date, params["after_id"] = after
+            params["after_date"] = after_date or date.min
+        return params
+
     async def get_by_booking_email_service_date_range(self, db: AsyncSession, email, service_date):
         """Find a booking by email within the same Mon-Sun week as service_date."""
         def get_week_start_end(date_str):
@@ -26,69 +93,207 @@ class BookingDAO(BaseDAO):
 
         week_start, week_end = get_week_start_end(service_date)
 
-        result = await db.execute(
-            select(self.model)
-            .where(self.model.email == email)
+        stmt = self._statement("email_week", lambda: (
+            select(*self._columns(EMAIL_WEEK_FIELDS))
+            .where(self.model.email == bindparam("email"))
             .where(
                 and_(
-                    self.model.service_date >= week_start,
-                    self.model.service_date <= week_end,
+                    self.model.service_date >= bindparam("week_start"),
+                    self.model.service_date <= bindparam("week_end"),
                 )
             )
-        )
-        return result.scalars().first()
+        ))
+        result = await db.execute(stmt, {"email": email, "week_start": week_start, "week_end": week_end})
+        return result.first()
 
     async def get_by_date_range(
-        self, db: AsyncSession, service_category, booking_status, start_created, end_created
+        self, db: AsyncSession, service_category, booking_status, start_created, end_created,
+        limit: int | None = None, after: tuple | None = None,
     ):
-        """Query bookings by category, status, and created_at date range."""
+        """Query bookings by category, status, and created_at date range.
+
+        With a limit, rows come in (service_date, booking_id) order starting
+        after the `after` key; a missing service_date sorts first.
+        """
         logger.debug(
             "params: category=%s date=%s,%s booking_status=%s",
             service_category, start_created, end_created, booking_status,
         )
 
-        result = await db.execute(
-            select(self.model)
+        paged, has_after = limit is not None, limit is not None and after is not None
+        stmt = self._statement(("date_range", paged, has_after), lambda: self._keyset(
+            select(*self._columns(SEARCH_FIELDS))
             .where(
-                self.model.service_category == service_category,
-                self.model.booking_status == booking_status,
+                self.model.service_category == bindparam("service_category"),
+                self.model.booking_status == bindparam("booking_status"),
             )
             .where(
                 and_(
-                    self.model.created_at >= start_created,
-                    self.model.created_at <= end_created,
+                    self.model.created_at >= bindparam("start_created"),
+                    self.model.created_at <= bindparam("end_created"),
                 )
-            )
-        )
-        return result.scalars().all()
+            ),
+            func.coalesce(self.model.service_date, date.min), paged, has_after,
+        ))
+        result = await db.execute(stmt, {
+            "service_category": service_category,
+            "booking_status": booking_status,
+            "start_created": start_created,
+            "end_created": end_created,
+            **self._keyset_params(limit, after),
+        })
+        return result.all()
 
-    async def completed_bookings_by_service_date(self, db: AsyncSession, from_date, to_date):
-        """Return all COMPLETED bookings within a service date range."""
-        result = await db.execute(
-            select(self.model)
+    async def completed_bookings_by_service_date(
+        self, db: AsyncSession, from_date, to_date,
+        limit: int | None = None, after: tuple | None = None,
+    ):
+        """Return COMPLETED bookings within a service date range (keyset-paged when limit is given)."""
+        paged, has_after = limit is not None, limit is not None and after is not None
+        stmt = self._statement(("completed", paged, has_after), lambda: self._keyset(
+            select(*self._columns(COMPLETED_FIELDS))
             .where(self.model.booking_status == "COMPLETED")
             .where(
                 and_(
-                    self.model.service_date >= from_date,
-                    self.model.service_date <= to_date,
+                    self.model.service_date >= bindparam("from_date"),
+                    self.model.service_date <= bindparam("to_date"),
                 )
-            )
+            ),
+            self.model.service_date, paged, has_after,
+        ))
+        result = await db.execute(stmt, {
+            "from_date": from_date, "to_date": to_date, **self._keyset_params(limit, after),
+        })
+        return result.all()
+
+    async def search_text(self, db: AsyncSession, q: str, limit: int):
+        """Bookings whose name, address, email, phone or location fuzzily match q, best first."""
+        stmt = self._statement(
+            "text_search", lambda: text_search_statement(self.model, self._columns(TEXT_SEARCH_FIELDS)),
         )
-        return result.scalars().all()
+        result = await db.execute(stmt, {"q": q, "limit": limit})
+        return result.all()
 
-    async def get_bookings_missing_locations(self, db: AsyncSession):
-        """Return all bookings that have no location set."""
-        result = await db.execute(
-            select(self.model).where(self.model.location.is_(None))
+    def _filtered(
+        self, stmt, service_category=None, booking_status=None, location=None, team=None,
+        postcode=None, email=None, start_created=None, end_created=None, from_date=None, to_date=None,
+    ):
+        """Add a WHERE clause for each filter that is given.
+
+        `team` matches anywhere in teams_assigned (case-insensitive); the
+        created and service date bounds are inclusive.
+        """
+        equals = (
+            (self.model.service_category, service_category),
+            (self.model.booking_status, booking_status),
+            (self.model.location, location),
+            (self.model.postcode, postcode),
+            (self.model.email, email),
         )
-        return result.scalars().all()
+        for column, value in equals:
+            if value is not None:
+                stmt = stmt.where(column == value)
+        if team is not None:
+            stmt = stmt.where(self.model.teams_assigned.icontains(team, autoescape=True))
+        if start_created is not None:
+            stmt = stmt.where(self.model.created_at >= start_created)
+        if end_created is not None:
+            stmt = stmt.where(self.model.created_at <= end_created)
+        if from_date is not None:
+            stmt = stmt.where(self.model.service_date >= from_date)
+        if to_date is not None:
+            stmt = stmt.where(self.model.service_date <= to_date)
+        return stmt
+
+    def _dimension(self, name: str):
+        column = getattr(self.model, STATS_DIMENSIONS[name])
+        if name == "month":
+            column = cast(func.date_trunc("month", column), Date)
+        return column.label(name)
+
+    async def aggregate(
+        self, db: AsyncSession, group_by: list[str], service_category=None, booking_status=None,
+        location=None, from_date=None, to_date=None,
+    ):
+        """Count bookings and sum final_price (cents) per group, in Postgres.
 
-    async def get_all_bookings_after_service_date(self, db: AsyncSession, date_start):
-        """Return all bookings with a service date on or after date_start."""
+        `group_by` names come from STATS_DIMENSIONS; an empty list gives one
+        totals row. Filters are optional and apply before grouping.
+        """
+        dims = [self._dimension(name) for name in group_by]
+        stmt = select(
+            *dims,
+            func.count().label("count"),
+            func.coalesce(func.sum(self.model.final_price), 0).label("final_price_sum"),
+        )
+        stmt = self._filtered(
+            stmt, service_category=service_category, booking_status=booking_status,
+            location=location, from_date=from_date, to_date=to_date,
+        )
+        if dims:
+            stmt = stmt.group_by(*dims).order_by(*dims)
+        result = await db.execute(stmt)
+        return result.all()
+
+    async def service_date_bounds(self, db: AsyncSession) -> tuple:
+        """Return (earliest, latest) service date, or (None, None) for an empty table."""
         result = await db.execute(
-            select(self.model).where(self.model.service_date >= date_start)
+            select(func.min(self.model.service_date), func.max(self.model.service_date))
         )
-        return result.scalars().all()
+        return tuple(result.one())
+
+    def export_query(
+        self, service_category=None, booking_status=None,
+        start_created=None, end_created=None, from_date=None, to_date=None,
+    ):
+        """Select every Booking field, filtered like the search endpoints (all filters optional)."""
+        stmt = self._filtered(
+            select(*self._columns(self.model.model_fields)),
+            service_category=service_category, booking_status=booking_status,
+            start_created=start_created, end_created=end_created, from_date=from_date, to_date=to_date,
+        )
+        return stmt.order_by(self.model.id)
+
+    async def query(
+        self, db: AsyncSession, fields, limit: int, sort: str = "service_date", descending: bool = False,
+        **filters,
+    ):
+        """Select only `fields` for bookings matching the optional `filters`
+        (see _filtered), ordered by `sort` then booking_id, at most `limit` rows.
+
+        Missing sort values come last in either direction.
+        """
+        sort_column, tiebreak = getattr(self.model, sort), self.model.booking_id
+        if descending:
+            order = (sort_column.desc().nulls_last(), tiebreak.desc())
+        else:
+            order = (sort_column.asc().nulls_last(), tiebreak)
+        stmt = (
+            self._filtered(select(*self._columns(fields)), **filters)
+            .order_by(*order)
+            .limit(limit)
+        )
+        result = await db.execute(stmt)
+        return result.all()
+
+    async def stream_partitions(self, db: AsyncSession, stmt, chunk_size: int):
+        """Yield lists of Rows from a server-side cursor, `chunk_size` rows at a time."""
+        result = await db.stream(stmt.execution_options(yield_per=chunk_size))
+        async for partition in result.partitions():
+            yield partition
+
+    def _missing_locations_query(self):
+        return select(*self._columns(MISSING_LOCATION_FIELDS)).where(self.model.location.is_(None))
+
+    async def get_bookings_missing_locations(self, db: AsyncSession):
+        """Return (booking_id, postcode) rows for bookings that have no location set."""
+        result = await db.execute(self._missing_locations_query())
+        return result.all()
+
+    async def iter_bookings_missing_locations(self, db: AsyncSession, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """Yield batches of (booking_id, postcode) rows for bookings that have no location set."""
+        async for rows in self.stream_partitions(db, self._missing_locations_query(), chunk_size):
+            yield rows
 
 
 booking_dao = BookingDAO(Booking)
@@ -0,0 +1,164 @@
+"""Booking daily rollup DAO: incremental deltas from the write path, rebuilds, aggregates."""
+
+import logging
+
+from sqlalchemy import BigInteger, Date, cast, delete, func, insert, literal, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.models.booking import Booking
+from app.models.booking_rollup import BookingDailyRollup
+
+logger = logging.getLogger(__name__)
+
+# Dimensions the rollup can group by (a subset of booking_dao's STATS_DIMENSIONS).
+ROLLUP_DIMENSIONS = {
+    "category": "category",
+    "status": "status",
+    "location": "location",
+    "day": "day",
+    "month": "day",
+}
+
+
+class BookingRollupDAO:
+    def __init__(self, model):
+        self.model = model
+
+    @staticmethod
+    def snapshot(booking) -> tuple | None:
+        """Return ((day, category, status, location), final_price) for a booking.
+
+        Bookings without a service date are not rolled up.
+        """
+        if booking is None or booking.service_date is None:
+            return None
+        key = (
+            booking.service_date,
+            booking.service_category or "",
+            booking.booking_status or "",
+            booking.location or "",
+        )
+        return key, booking.final_price or 0
+
+    @staticmethod
+    def deltas(before: tuple | None, after: tuple | None) -> list[tuple[tuple, int, int]]:
+        """(key, count delta, final_price delta) moving a booking from `before` to `after`.
+
+        Sorted by key so concurrent writers lock rollup rows in the same order.
+        """
+        changes: dict[tuple, list[int]] = {}
+        if before is not None:
+            key, price = before
+            changes.setdefault(key, [0, 0])
+            changes[key][0] -= 1
+            changes[key][1] -= price
+        if after is not None:
+            key, price = after
+            changes.setdefault(key, [0, 0])
+            changes[key][0] += 1
+            changes[key][1] += price
+        return [
+            (key, count, amount)
+            for key, (count, amount) in sorted(changes.items())
+            if count or amount
+        ]
+
+    async def apply(self, db: AsyncSession, before: tuple | None, after: tuple | None):
+        """Upsert the deltas between two snapshots in the caller's transaction.
+
+        Runs without autoflush so the booking row itself is still flushed by the
+        caller's commit, where safe_commit handles integrity errors; a rolled
+        back write takes its deltas with it.
+        """
+        table = self.model.__table__
+        with db.no_autoflush:
+            for (day, category, status, location), count, amount in self.deltas(before, after):
+                stmt = pg_insert(table).values(
+                    day=day, category=category, status=status, location=location,
+                    count=count, final_price_sum=amount,
+                )
+                stmt = stmt.on_conflict_do_update(
+                    constraint="uq_booking_daily_rollup_key",
+                    set_={
+                        "count": table.c.count + stmt.excluded.count,
+                        "final_price_sum": table.c.final_price_sum + stmt.excluded.final_price_sum,
+                    },
+                )
+                await db.execute(stmt)
+
+    async def rebuild(self, db: AsyncSession, from_date, to_date) -> int:
+        """Recompute rollup rows for service days in [from_date, to_date] from bookings.
+
+        The table lock holds off webhook deltas until the rebuild commits, so
+        each concurrent write is counted exactly once: either it committed
+        before the rebuild read bookings, or its delta lands on the new rows.
+        Returns the number of rollup rows written.
+        """
+        table = self.model.__table__
+        await db.execute(text("LOCK TABLE booking_daily_rollup IN SHARE ROW EXCLUSIVE MODE"))
+        await db.execute(delete(table).where(table.c.day >= from_date, table.c.day <= to_date))
+
+        b = Booking
+        category = func.coalesce(b.service_category, "")
+        status = func.coalesce(b.booking_status, "")
+        location = func.coalesce(b.location, "")
+        source = (
+            select(
+                b.service_date, category, status, location,
+                func.count(), func.coalesce(func.sum(b.final_price), 0),
+            )
+            .where(b.service_date >= from_date, b.service_date <= to_date)
+            .group_by(b.service_date, category, status, location)
+        )
+        result = await db.execute(
+            insert(table).from_select(
+                ["day", "category", "status", "location", "count", "final_price_sum"], source,
+            )
+        )
+        await db.commit()
+        logger.info("Rebuilt booking rollup %s..%s: %d rows", from_date, to_date, result.rowcount)
+        return result.rowcount
+
+    def _dimension(self, name: str):
+        column = getattr(self.model, ROLLUP_DIMENSIONS[name])
+        if name == "month":
+            column = cast(func.date_trunc("month", column), Date)
+        elif name != "day":
+            column = func.nullif(column, literal(""))
+        return column.label(name)
+
+    async def aggregate(
+        self, db: AsyncSession, group_by: list[str], service_category=None, booking_status=None,
+        location=None, from_date=None, to_date=None,
+    ):
+        """Same rows as BookingDAO.aggregate, summed from the rollup (O(days), not O(bookings)).
+
+        Deltas leave a row at count 0 once all its bookings move elsewhere;
+        groups that sum to 0 are dropped, as a GROUP BY over bookings never
+        returns them.
+        """
+        dims = [self._dimension(name) for name in group_by]
+        stmt = select(
+            *dims,
+            cast(func.coalesce(func.sum(self.model.count), 0), BigInteger).label("count"),
+            cast(func.coalesce(func.sum(self.model.final_price_sum), 0), BigInteger).label("final_price_sum"),
+        )
+        if service_category is not None:
+            stmt = stmt.where(self.model.category == service_category)
+        if booking_status is not None:
+            stmt = stmt.where(self.model.status == booking_status)
+        if location is not None:
+            stmt = stmt.where(self.model.location == location)
+        if from_date is not None:
+            stmt = stmt.where(self.model.day >= from_date)
+        if to_date is not None:
+            stmt = stmt.where(self.model.day <= to_date)
+        if dims:
+            stmt = stmt.group_by(*dims).having(func.sum(self.model.count) != 0).order_by(*dims)
+        result = await db.execute(stmt)
+        return result.all()
+
+
+booking_rollup_dao = BookingRollupDAO(BookingDailyRollup)
@@ -3,26 +3,29 @@
 import logging
 
 from fastapi import HTTPException
-from sqlalchemy import exc
+from sqlalchemy import bindparam, exc
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 
-from app.daos.base import _resolve_location, safe_commit
+from app.daos.base import StatementDAO, _resolve_location, safe_commit, text_search_statement
 from app.models.customer import Customer
 from app.utils.validation import safe_int
 
 logger = logging.getLogger(__name__)
 
+TEXT_SEARCH_FIELDS = ("customer_id", "name", "address", "email", "phone", "location")
 
-class CustomerDAO:
-    def __init__(self, model):
-        self.model = model
+
+class CustomerDAO(StatementDAO):
+    def _by_customer_id(self):
+        return self._statement(
+            "by_customer_id",
+            lambda: select(self.model).where(self.model.customer_id == bindparam("customer_id")),
+        )
 
     async def get_by_customer_id(self, db: AsyncSession, customer_id):
         """Look up a customer by their external customer_id."""
-        result = await db.execute(
-            select(self.model).where(self.model.customer_id == customer_id)
-        )
+        result = await db.execute(self._by_customer_id(), {"customer_id": customer_id})
         return result.scalars().first()
 
     async def create_customer(self, db: AsyncSession, data):
@@ -62,11 +65,24 @@ class CustomerDAO:
         if await safe_commit(db, "Customer error in model data"):
             logger.info("Updated Customer data")
 
-    async def create_or_update_customer(self, db: AsyncSession, data):
-        """Upsert a customer record."""
+    async def search_text(self, db: AsyncSession, q: str, limit: int):
+        """Customers whose name, address, email, phone or location fuzzily match q, best first."""
+        stmt = self._statement("text_search", lambda: text_search_statement(
+            self.model, [getattr(self.model, f) for f in TEXT_SEARCH_FIELDS],
+        ))
+        result = await db.execute(stmt, {"q": q, "limit": limit})
+        return result.all()
+
+    async def get_all_emails(self, db: AsyncSession):
+        """Return every distinct non-null customer email."""
         result = await db.execute(
-            select(self.model).where(self.model.customer_id == safe_int(data["id"]))
+            select(self.model.email).where(self.model.email.is_not(None)).distinct()
         )
+        return result.scalars().all()
+
+    async def create_or_update_customer(self, db: AsyncSession, data):
+        """Upsert a customer record."""
+        result = await db.execute(self._by_customer_id(), {"customer_id": safe_int(data["id"])})
         c = result.scalars().first()
         if c is None:
             await self.create_customer(db, data)
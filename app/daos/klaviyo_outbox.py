@@ -0,0 +1,122 @@
+"""Klaviyo outbox DAO: stage notifications with the upsert, claim them in the worker."""
+
+import logging
+from datetime import datetime, timedelta, timezone
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select, update
+
+from app.daos.base import safe_commit
+from app.models.klaviyo_outbox import KlaviyoOutbox, OutboxStatus
+
+logger = logging.getLogger(__name__)
+
+RETRY_BACKOFF_SECONDS = 60
+RETRY_BACKOFF_MAX_SECONDS = 3600
+
+
+class KlaviyoOutboxDAO:
+    def __init__(self, model):
+        self.model = model
+
+    def enqueue(self, db: AsyncSession, data: dict, route) -> KlaviyoOutbox:
+        """Stage a notification in the session so it commits with the caller's upsert."""
+        row = self.model(route=str(route), payload=jsonable_encoder(data))
+        db.add(row)
+        return row
+
+    async def ensure_committed(self, db: AsyncSession, row: KlaviyoOutbox):
+        """Commit a staged row the upsert did not commit (no-change update, rolled-back race)."""
+        if row not in db:
+            db.add(row)
+        await safe_commit(
+            db, f"Klaviyo outbox: {row.route}",
+            f"Klaviyo outbox row already stored: {row.route}",
+        )
+
+    async def claim_batch(self, db: AsyncSession, limit: int, lease_seconds: float):
+        """Lease up to `limit` due rows: PENDING ones, and IN_PROGRESS ones whose lease ran out.
+
+        The rows are locked (skipping rows other dispatchers are claiming) and
+        marked IN_PROGRESS until now + `lease_seconds`. The caller commits,
+        which releases the locks before anything is sent.
+        """
+        now = datetime.now(timezone.utc)
+        result = await db.execute(
+            select(self.model)
+            .where(
+                self.model.status.in_([OutboxStatus.PENDING, OutboxStatus.IN_PROGRESS]),
+                self.model.available_at <= now,
+            )
+            .order_by(self.model.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        rows = result.scalars().all()
+        for row in rows:
+            row.status = OutboxStatus.IN_PROGRESS
+            row.available_at = now + timedelta(seconds=lease_seconds)
+        return rows
+
+    async def save_outcome(self, db: AsyncSession, row: KlaviyoOutbox):
+        """Write a leased row's outcome (set by mark_sent/mark_failed) and commit.
+
+        Only a row that is still IN_PROGRESS is updated; returns False if the
+        row is no longer leased (e.g. another dispatcher finished it first).
+        """
+        result = await db.execute(
+            update(self.model)
+            .where(self.model.id == row.id, self.model.status == OutboxStatus.IN_PROGRESS)
+            .values(
+                status=row.status,
+                attempts=row.attempts,
+                last_error=row.last_error,
+                available_at=row.available_at,
+                sent_at=row.sent_at,
+            )
+        )
+        await db.commit()
+        return result.rowcount == 1
+
+    async def get_undelivered_emails(self, db: AsyncSession, route) -> set[str]:
+        """Lower-cased emails of `route` rows not yet sent (pending, retrying or given up)."""
+        email = self.model.payload["email"].as_string()
+        result = await db.execute(
+            select(email)
+            .where(
+                self.model.route == str(route),
+                self.model.status != OutboxStatus.SENT,
+                email.is_not(None),
+            )
+            .distinct()
+        )
+        return {e.strip().lower() for e in result.scalars().all() if e}
+
+    def mark_sent(self, row: KlaviyoOutbox):
+        """Record a successful delivery."""
+        row.attempts += 1
+        row.status = OutboxStatus.SENT
+        row.sent_at = datetime.now(timezone.utc)
+        row.last_error = None
+
+    def mark_failed(self, row: KlaviyoOutbox, error: str, max_attempts: int, retryable: bool = True):
+        """Record a failed delivery; back off and retry until max_attempts is reached.
+
+        A non-retryable failure (the request was rejected) is final at once.
+        """
+        row.attempts += 1
+        row.last_error = error
+        if not retryable or row.attempts >= max_attempts:
+            row.status = OutboxStatus.FAILED
+            logger.error(
+                "Klaviyo outbox %s (%s) gave up after %d attempts: %s",
+                row.id, row.route, row.attempts, error,
+            )
+            return
+        delay = min(RETRY_BACKOFF_SECONDS * 2 ** (row.attempts - 1), RETRY_BACKOFF_MAX_SECONDS)
+        row.status = OutboxStatus.PENDING
+        row.available_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+
+
+klaviyo_outbox_dao = KlaviyoOutboxDAO(KlaviyoOutbox)
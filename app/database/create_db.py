@@ -8,7 +8,9 @@ from app.core.database import engine
 
 # Import all models so they are registered with SQLModel.metadata
 from app.models.booking import Booking  # noqa: F401
+from app.models.booking_rollup import BookingDailyRollup  # noqa: F401
 from app.models.customer import Customer  # noqa: F401
+from app.models.klaviyo_outbox import KlaviyoOutbox  # noqa: F401
 
 
 async def _create_tables():
@@ -0,0 +1,90 @@
+"""
+Create any table and index declared on the models that the database does not have yet.
+
+It runs as the release phase, before any dyno boots, so tables added since
+the last deploy are created here first (``metadata.create_all``, which skips
+existing tables). ``create_all`` only builds indexes together with a new
+table, so indexes added to an existing model are applied here too. Each one is
+built with ``CREATE INDEX CONCURRENTLY IF NOT EXISTS`` so writes keep flowing
+and the script can be re-run safely. Extensions the indexes need (pg_trgm)
+are created first. An index left invalid by an interrupted concurrent build
+is dropped and rebuilt.
+
+Usage::
+
+    python -m app.database.create_indexes
+"""
+
+import asyncio
+import re
+
+from sqlalchemy import MetaData, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+from sqlmodel import SQLModel
+
+from app.core.database import engine
+
+# Import all models so they are registered with SQLModel.metadata
+from app.models.booking import Booking  # noqa: F401
+from app.models.booking_rollup import BookingDailyRollup  # noqa: F401
+from app.models.customer import Customer  # noqa: F401
+from app.models.klaviyo_outbox import KlaviyoOutbox  # noqa: F401
+from app.models.text_search import REQUIRED_EXTENSIONS
+
+
+def index_statements(metadata: MetaData) -> list[tuple[str, str]]:
+    """Return (index name, CREATE INDEX CONCURRENTLY IF NOT EXISTS sql) for every model index."""
+    dialect = postgresql.dialect()
+    statements = []
+    for table in metadata.sorted_tables:
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            sql = str(CreateIndex(index, if_not_exists=True).compile(dialect=dialect))
+            sql = re.sub(r"^CREATE (UNIQUE )?INDEX", r"CREATE \1INDEX CONCURRENTLY", sql)
+            statements.append((index.name, sql))
+    return statements
+
+
+async def create_indexes(metadata: MetaData = SQLModel.metadata) -> list[str]:
+    """Create missing tables, then build missing indexes; returns the index names checked."""
+    statements = index_statements(metadata)
+    names = [name for name, _ in statements]
+
+    async with engine.connect() as conn:
+        # CONCURRENTLY cannot run inside a transaction block
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for extension in REQUIRED_EXTENSIONS:
+            await conn.execute(text(f"CREATE EXTENSION IF NOT EXISTS {extension}"))
+        # After the extensions: a new table's trigram index needs pg_trgm
+        await conn.run_sync(metadata.create_all)
+        result = await conn.execute(
+            text(
+                "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE NOT i.indisvalid AND c.relname = ANY(:names)"
+            ),
+            {"names": names},
+        )
+        for name in result.scalars().all():
+            print(f"Dropping invalid index {name}")
+            await conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"'))
+
+        for name, sql in statements:
+            print(f"Ensuring index {name}")
+            await conn.execute(text(sql))
+    return names
+
+
+async def _main():
+    try:
+        names = await create_indexes()
+        print(f"{len(names)} indexes in place.")
+    finally:
+        await engine.dispose()
+
+
+def main():
+    asyncio.run(_main())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Create the role POST /sql/query runs its statements as.
+
+The role cannot log in and may only SELECT from the tables the endpoint
+allows (bookings and customer). The application's database user is made a
+member so it can ``SET LOCAL ROLE`` to it, which limits every function a
+caller's statement uses to those grants. Re-running the script resets the
+grants. Set ``SQL_QUERY_ROLE`` to the same name to enable the endpoint.
+
+Usage::
+
+    python -m app.database.create_sql_role m2m_sql_reader
+"""
+
+import argparse
+import asyncio
+
+from sqlalchemy import text
+
+from app.core.database import engine
+from app.services.sql_query import ALLOWED_TABLES, role_identifier
+
+
+def role_statements(role: str) -> list[str]:
+    """SQL that creates `role` (if needed) and limits it to SELECT on the allowed tables."""
+    ident = role_identifier(role)
+    return [
+        f"DO $$ BEGIN IF NOT EXISTS (SELECT FROM pg_roles WHERE rolname = '{role}') "
+        f"THEN CREATE ROLE {ident} NOLOGIN; END IF; END $$",
+        f"REVOKE ALL ON ALL TABLES IN SCHEMA public FROM {ident}",
+        f"REVOKE ALL ON ALL SEQUENCES IN SCHEMA public FROM {ident}",
+        f"GRANT USAGE ON SCHEMA public TO {ident}",
+        f"GRANT SELECT ON {', '.join(ALLOWED_TABLES)} TO {ident}",
+        f"GRANT {ident} TO CURRENT_USER",
+    ]
+
+
+async def create_sql_role(role: str):
+    async with engine.begin() as conn:
+        for sql in role_statements(role):
+            await conn.execute(text(sql))
+
+
+async def _main(role: str):
+    try:
+        await create_sql_role(role)
+        print(f"Role {role} can SELECT from {', '.join(ALLOWED_TABLES)}.")
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create the read-only role for POST /sql/query.")
+    parser.add_argument("role", help="Role name (lower case, e.g. m2m_sql_reader)")
+    asyncio.run(_main(parser.parse_args().role))
+
+
+if __name__ == "__main__":
+    main()
@@ -20,7 +20,7 @@ from app.core.config import get_settings
 from app.core.database import async_session
 from app.core.logging_config import setup_logging
 from app.daos.booking import booking_dao
-from app.utils.email_service import send_missing_location_email
+from app.utils.email_service import close_email_client, send_missing_location_email
 
 logger = logging.getLogger(__name__)
 
@@ -36,14 +36,17 @@ async def find_missing_locations() -> dict:
     The function opens its own ``AsyncSession`` so it can be called from a
     standalone script or scheduled job without a live HTTP request context.
     """
+    total = 0
+    postcodes = set()
     async with async_session() as db:
-        bookings = await booking_dao.get_bookings_missing_locations(db)
+        # Batches from a server-side cursor, so memory stays flat however many rows match.
+        async for rows in booking_dao.iter_bookings_missing_locations(db):
+            total += len(rows)
+            # Deduplicate postcodes; skip rows where postcode itself is also NULL.
+            postcodes.update(b.postcode for b in rows if b.postcode is not None)
 
-    total = len(bookings)
     logger.info("Bookings missing location: %d", total)
-
-    # Deduplicate postcodes; skip rows where postcode itself is also NULL.
-    postcodes = sorted({b.postcode for b in bookings if b.postcode is not None})
+    postcodes = sorted(postcodes)
     logger.info("Distinct postcodes affected: %d → %s", len(postcodes), postcodes)
 
     return {"total": total, "postcodes": postcodes}
@@ -74,11 +77,8 @@ async def main() -> None:
     toaddr = settings.SUPPORT_EMAIL
     msg = str(postcodes)
 
-    # email_service is synchronous (Google API); run in a thread to avoid
-    # blocking the event loop.
-    await asyncio.to_thread(
-        send_missing_location_email, toaddr, msg, total, n_postcodes
-    )
+    await send_missing_location_email(toaddr, msg, total, n_postcodes)
+    await close_email_client()
 
     logger.info(
         "%s: missing_locations script complete — alert sent to %s",
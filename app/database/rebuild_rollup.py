@@ -0,0 +1,79 @@
+"""
+Rebuild booking_daily_rollup from the bookings table.
+
+Webhook writes keep the rollup up to date with deltas; this script recomputes
+it from scratch for a range of service dates, e.g. to backfill before turning
+on ``STATS_USE_ROLLUP`` or to reconcile after a manual data fix. The range is
+rebuilt one calendar month per transaction, so webhook writes only wait on
+the rollup table for as long as one month takes.
+
+Usage::
+
+    python -m app.database.rebuild_rollup                      # every service date
+    python -m app.database.rebuild_rollup --from 2024-01-01 --to 2024-03-31
+"""
+
+import argparse
+import asyncio
+import logging
+from datetime import date, datetime, timedelta
+
+from app.core.database import async_session, engine
+from app.core.logging_config import setup_logging
+from app.daos.booking import booking_dao
+from app.daos.booking_rollup import booking_rollup_dao
+
+logger = logging.getLogger(__name__)
+
+
+def month_ranges(from_date: date, to_date: date):
+    """Yield (start, end) pairs covering [from_date, to_date], split at month boundaries."""
+    start = from_date
+    while start <= to_date:
+        next_month = (start.replace(day=1) + timedelta(days=32)).replace(day=1)
+        end = min(next_month - timedelta(days=1), to_date)
+        yield start, end
+        start = next_month
+
+
+async def rebuild(from_date: date | None = None, to_date: date | None = None) -> int:
+    """Rebuild the rollup for the range (default: all bookings); returns rows written."""
+    async with async_session() as db:
+        if from_date is None or to_date is None:
+            earliest, latest = await booking_dao.service_date_bounds(db)
+            from_date = from_date or earliest
+            to_date = to_date or latest
+        if from_date is None or to_date is None:
+            logger.info("No bookings with a service date — nothing to rebuild.")
+            return 0
+
+        total = 0
+        for start, end in month_ranges(from_date, to_date):
+            total += await booking_rollup_dao.rebuild(db, start, end)
+    return total
+
+
+def _parse_date(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+async def _main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild booking_daily_rollup from bookings.")
+    parser.add_argument("--from", dest="from_date", type=_parse_date, help="first service date (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="to_date", type=_parse_date, help="last service date (YYYY-MM-DD)")
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    try:
+        total = await rebuild(args.from_date, args.to_date)
+        print(f"{total} rollup rows written.")
+    finally:
+        await engine.dispose()
+
+
+def main():
+    asyncio.run(_main())
+
+
+if __name__ == "__main__":
+    main()
@@ -3,17 +3,18 @@
 import logging
 from contextlib import asynccontextmanager
 
+import httpx
 from fastapi import FastAPI, Request
-from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
 from fastapi_mcp import FastApiMCP
 from sqlalchemy import exc
 
-from app.core.logging_config import setup_logging
+from app.core.logging_config import setup_logging, shutdown_logging
 from sqlmodel import SQLModel
 
-from app.core.database import engine
-from app.routers import bookings, customers, health
+from app.core.database import engine, mcp_engine, mcp_read_engine, read_engine
+from app.core.surface import MCP, SURFACE_HEADER, SurfaceLimitMiddleware
+from app.routers import bookings, customers, health, sql
 from app.core.config import get_settings
 
 logger = logging.getLogger(__name__)
@@ -34,8 +35,10 @@ async def lifespan(app: FastAPI):
     yield
 
     # Shutdown
-    await engine.dispose()
+    for pool in {engine, read_engine, mcp_engine, mcp_read_engine}:
+        await pool.dispose()
     logger.info("%s: shutting down ...", settings.APP_NAME)
+    shutdown_logging()
 
 
 app = FastAPI(
@@ -48,6 +51,21 @@ app = FastAPI(
 app.include_router(health.router)
 app.include_router(bookings.router)
 app.include_router(customers.router)
+app.include_router(sql.router)
+
+# MCP tool calls run as in-process requests through this client; the surface
+# header routes them to their own concurrency limit and connection pool.
+app.add_middleware(
+    SurfaceLimitMiddleware,
+    limits={MCP: get_settings().MCP_MAX_CONCURRENCY},
+    queue_timeout=get_settings().MCP_QUEUE_TIMEOUT_SECONDS,
+)
+mcp_http_client = httpx.AsyncClient(
+    transport=httpx.ASGITransport(app=app, raise_app_exceptions=False),
+    base_url="http://apiserver",
+    headers={SURFACE_HEADER: MCP},
+    timeout=10.0,
+)
 
 # Mount MCP server
 
@@ -55,6 +73,10 @@ mcp = FastApiMCP(
     app,
     name="M2M Bookings MCP",
     description="M2M Bookings database - query and manage cleaning bookings and customers",
+    http_client=mcp_http_client,
+    # The export streams the whole filtered table; it is for HTTP clients, not
+    # agents, whose tool calls are paged (see services.bookings._surface_limit).
+    exclude_operations=["export_bookings"],
 )
 mcp.mount_http()
 
@@ -62,10 +84,19 @@ mcp.mount_http()
 # --- Exception Handlers ---
 
 
+def _route(request: Request) -> str:
+    """The matched route's path template (/booking/{booking_id}), else the URL path.
+
+    Error emails are fingerprinted on it, so one failure across many ids is
+    one alert rather than one per id.
+    """
+    return getattr(request.scope.get("route"), "path", request.url.path)
+
+
 @app.exception_handler(exc.OperationalError)
 async def sqlalchemy_operational_error_handler(request: Request, e: exc.OperationalError):
     """Return 503 when the database is unreachable or a connection drops."""
-    logger.error("Database operational error: %s", e)
+    logger.error("Database operational error: %s", e, extra={"route": _route(request)})
     return JSONResponse(
         status_code=503,
         content={"error": "Database temporarily unavailable", "status_code": 503},
@@ -75,7 +106,7 @@ async def sqlalchemy_operational_error_handler(request: Request, e: exc.Operatio
 @app.exception_handler(exc.DataError)
 async def sqlalchemy_data_error_handler(request: Request, e: exc.DataError):
     """Return 422 when SQLAlchemy detects invalid data (e.g. type mismatch)."""
-    logger.error("Database data error: %s", e)
+    logger.error("Database data error: %s", e, extra={"route": _route(request)})
     return JSONResponse(
         status_code=422,
         content={"error": "Invalid data", "status_code": 422},
@@ -84,19 +115,16 @@ async def sqlalchemy_data_error_handler(request: Request, e: exc.DataError):
 
 @app.exception_handler(Exception)
 async def generic_exception_handler(request: Request, e: Exception):
-    """Catch-all handler that logs the error and sends an alert email."""
-    logger.error("Unhandled exception on %s: %s", request.url.path, e, exc_info=True)
-
-    settings = get_settings()
-    if not settings.testing:
-        try:
-            from app.utils.email_service import send_error_email
-            m = settings.SUPPORT_EMAIL.split("@")
-            to_addr = f"{m[0]}+error@{m[1]}"
-            await run_in_threadpool(send_error_email, to_addr, f"({request.url.path}) {str(e)}")
-        except Exception as email_err:
-            logger.error("Failed to send error email: %s", email_err)
-
+    """Catch-all handler that logs the error.
+
+    The alert email comes from the Gmail log handler (not attached in debug
+    mode). It sends the first exception of each type and route at once and
+    folds repeats into one digest per window.
+    """
+    logger.error(
+        "Unhandled exception on %s: %s", request.url.path, e,
+        exc_info=True, extra={"route": _route(request)},
+    )
     return JSONResponse(
         status_code=500,
         content={"error": "Internal server error", "status_code": 500},
@@ -3,7 +3,7 @@
 import logging
 from datetime import datetime, date
 
-from sqlalchemy import Text, DateTime
+from sqlalchemy import Text, DateTime, Index, text
 from sqlmodel import SQLModel, Field
 
 from app.utils.validation import (
@@ -18,6 +18,7 @@ from app.utils.validation import (
     safe_int,
 )
 from app.core.config import get_settings
+from app.models.text_search import text_search_index
 
 logger = logging.getLogger(__name__)
 
@@ -156,6 +157,24 @@ class Booking(BookingBase, table=True):
     """Standard cleaning booking."""
 
     __tablename__ = "bookings"
+    # One index per BookingDAO access path. Existing databases get these from
+    # app/database/create_indexes.py (create_all only indexes new tables).
+    __table_args__ = (
+        # get_by_date_range: equality on category/status, range on created
+        Index("ix_bookings_category_status_created", "service_category", "booking_status", "_created_at"),
+        # completed_bookings_by_service_date
+        Index("ix_bookings_status_service_date", "booking_status", "_service_date"),
+        # get_by_booking_email_service_date_range
+        Index("ix_bookings_email_service_date", "email", "_service_date"),
+        # get_bookings_missing_locations: stays tiny, only unlocated rows
+        Index("ix_bookings_missing_location", "id", postgresql_where=text("location IS NULL")),
+        # _created_at grows with insertion order, so BRIN covers wide ranges cheaply
+        Index("ix_bookings_created_at_brin", "_created_at", postgresql_using="brin"),
+        # Service dates are booked in any order, so ranges on them need a btree
+        Index("ix_bookings_service_date", "_service_date"),
+        # search_text: trigram match over name, address, email, phone, location
+        text_search_index("ix_bookings_text_search_trgm"),
+    )
     id: int | None = Field(default=None, primary_key=True)
 
 
@@ -0,0 +1,33 @@
+"""Daily booking rollup: counts and final_price totals per (day, category, status, location)."""
+
+from datetime import date
+
+from sqlalchemy import BigInteger, UniqueConstraint
+from sqlmodel import SQLModel, Field
+
+
+class BookingDailyRollup(SQLModel, table=True):
+    """One row per service day and dimension combination.
+
+    Kept in step with the bookings table by BookingRollupDAO deltas on every
+    webhook write; app/database/rebuild_rollup.py recomputes any date range.
+    Missing category/status/location are stored as '' so the unique key holds.
+    """
+
+    __tablename__ = "booking_daily_rollup"
+    __table_args__ = (
+        UniqueConstraint("day", "category", "status", "location", name="uq_booking_daily_rollup_key"),
+    )
+
+    id: int | None = Field(default=None, primary_key=True)
+
+    day: date
+    category: str = Field(default="", max_length=64)
+    status: str = Field(default="", max_length=64)
+    location: str = Field(default="", max_length=64)
+
+    count: int = Field(default=0)
+    final_price_sum: int = Field(default=0, sa_type=BigInteger)
+
+    def __repr__(self):
+        return f"<BookingDailyRollup {self.day} {self.category}/{self.status}/{self.location}: {self.count}>"
@@ -5,6 +5,7 @@ import logging
 from sqlalchemy import Text, DateTime
 from sqlmodel import SQLModel, Field
 
+from app.models.text_search import text_search_index
 from app.utils.validation import (
     check_postcode,
     truncate_field,
@@ -17,6 +18,10 @@ logger = logging.getLogger(__name__)
 
 class Customer(SQLModel, table=True):
     __tablename__ = "customer"
+    __table_args__ = (
+        # CustomerDAO.search_text: trigram match over name, address, email, phone, location
+        text_search_index("ix_customer_text_search_trgm"),
+    )
 
     id: int | None = Field(default=None, primary_key=True)
 
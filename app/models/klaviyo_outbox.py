@@ -0,0 +1,51 @@
+"""Klaviyo outbox model: notifications queued for the dispatcher worker."""
+
+from datetime import datetime, timezone
+from enum import StrEnum
+
+from sqlalchemy import JSON, DateTime, Index, Text, text
+from sqlmodel import SQLModel, Field
+
+
+class OutboxStatus(StrEnum):
+    PENDING = "PENDING"
+    IN_PROGRESS = "IN_PROGRESS"
+    SENT = "SENT"
+    FAILED = "FAILED"
+
+
+def _utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class KlaviyoOutbox(SQLModel, table=True):
+    """A Klaviyo notification written alongside the booking/customer upsert.
+
+    For an IN_PROGRESS row, available_at is the end of the dispatcher's
+    lease: past it, the row is due again.
+    """
+
+    __tablename__ = "klaviyo_outbox"
+    __table_args__ = (
+        Index(
+            "ix_klaviyo_outbox_due",
+            "available_at",
+            "id",
+            postgresql_where=text("status IN ('PENDING', 'IN_PROGRESS')"),
+        ),
+    )
+
+    id: int | None = Field(default=None, primary_key=True)
+
+    route: str = Field(max_length=32)
+    payload: dict = Field(default_factory=dict, sa_type=JSON)
+    status: str = Field(default=OutboxStatus.PENDING, max_length=16)
+    attempts: int = Field(default=0)
+    last_error: str | None = Field(default=None, sa_type=Text)
+
+    created_at: datetime = Field(default_factory=_utc_now, sa_type=DateTime(timezone=True))
+    available_at: datetime = Field(default_factory=_utc_now, sa_type=DateTime(timezone=True))
+    sent_at: datetime | None = Field(default=None, sa_type=DateTime(timezone=True))
+
+    def __repr__(self):
+        return f"<KlaviyoOutbox {self.id} {self.route} {self.status}>"
@@ -0,0 +1,35 @@
+"""Trigram text search over the contact fields of bookings and customers.
+
+Both tables index one expression, the contact fields joined with spaces,
+with a pg_trgm GIN index. Queries must use the identical expression
+(``text_search_document``) for Postgres to match it to the index.
+"""
+
+from sqlalchemy import DDL, Index, event, literal_column
+from sqlmodel import SQLModel
+
+TEXT_SEARCH_COLUMNS = ("name", "address", "email", "phone", "location")
+# Postgres extensions the model indexes depend on
+REQUIRED_EXTENSIONS = ("pg_trgm",)
+
+# Literals, not bound parameters, so the planner sees the indexed expression
+_DOCUMENT_SQL = "(" + " || ' ' || ".join(f"coalesce({c}, '')" for c in TEXT_SEARCH_COLUMNS) + ")"
+
+# create_all on a fresh database needs the opclass before the indexes
+for _extension in REQUIRED_EXTENSIONS:
+    event.listen(SQLModel.metadata, "before_create", DDL(f"CREATE EXTENSION IF NOT EXISTS {_extension}"))
+
+
+def text_search_document():
+    """The indexed search expression, for use in WHERE / ORDER BY."""
+    return literal_column(_DOCUMENT_SQL)
+
+
+def text_search_index(name: str) -> Index:
+    """GIN trigram index on the search expression, for a model's __table_args__."""
+    return Index(
+        name,
+        text_search_document().label("text_search_document"),
+        postgresql_using="gin",
+        postgresql_ops={"text_search_document": "gin_trgm_ops"},
+    )
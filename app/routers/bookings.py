@@ -1,28 +1,40 @@
 """Booking webhook endpoints and search routes."""
 
 import logging
-from datetime import datetime
+from datetime import date, datetime
+from typing import Literal
 
-from fastapi import APIRouter, BackgroundTasks, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.auth import verify_api_key
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
 from app.utils.local_date_time import UTC_now, local_to_utc
 
-from app.daos.booking import booking_dao
-
+from app.services.booking_cache import etag_matches
 from app.services.bookings import (
     reject_booking,
     update_table,
     search_bookings,
     search_completed_bookings_by_service_date,
     get_booking_by_email_service_date,
+    search_bookings_text,
+    get_booking_document,
+    booking_stats,
+    query_bookings,
+    export_bookings,
+    EXPORT_MEDIA_TYPES,
 )
-from app.utils.klaviyo import process_with_klaviyo, WebhookRoute
+from app.utils.compact import RESPONSE_MODE_HEADER, compact_response, response_mode
+from app.utils.klaviyo import WebhookRoute
 
 logger = logging.getLogger(__name__)
 
+PAGE_LIMIT_HELP = "Page size; enables paging (capped by the server maximum)"
+PAGE_CURSOR_HELP = "next_cursor from the previous page"
+TEXT_QUERY_HELP = "Free text matched fuzzily against name, address, email, phone and location (e.g. 'smith elm street')"
+
 router = APIRouter(
     prefix="/booking",
     tags=["bookings"],
@@ -34,103 +46,199 @@ router = APIRouter(
 
 
 @router.post("/new", operation_id="create_new_booking")
-async def new(data: dict, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db)):
+async def new(data: dict, db: AsyncSession = Depends(get_db)):
     """Receive a new booking webhook from Zapier. Creates or updates the booking record."""
     logger.info("Processing a new booking ...")
-    result = await update_table(data, db, status="NOT_COMPLETE")
-    background_tasks.add_task(process_with_klaviyo, result, WebhookRoute.BOOKING_NEW)
+    await update_table(data, db, status="NOT_COMPLETE", route=WebhookRoute.BOOKING_NEW)
     return "OK"
 
 
 @router.post("/restored", operation_id="restore_booking")
-async def restored(data: dict, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db)):
+async def restored(data: dict, db: AsyncSession = Depends(get_db)):
     """Receive a restored booking webhook from Zapier. Re-activates a previously cancelled booking."""
     logger.info("Processing a RESTORED booking ...")
-    result = await update_table(data, db, status="NOT_COMPLETE", is_restored=True)
-    background_tasks.add_task(process_with_klaviyo, result, WebhookRoute.BOOKING_RESTORED)
+    await update_table(
+        data, db, status="NOT_COMPLETE", is_restored=True, route=WebhookRoute.BOOKING_RESTORED,
+    )
     return "OK"
 
 
 @router.post("/completed", operation_id="complete_booking")
-async def completed(data: dict, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db)):
+async def completed(data: dict, db: AsyncSession = Depends(get_db)):
     """Receive a completed booking webhook from Zapier. Marks the booking as completed."""
     logger.info("Processing a completed booking")
-    result = await update_table(data, db, status="COMPLETED")
-    background_tasks.add_task(process_with_klaviyo, result, WebhookRoute.BOOKING_COMPLETED)
+    await update_table(data, db, status="COMPLETED", route=WebhookRoute.BOOKING_COMPLETED)
     return "OK"
 
 
 @router.post("/cancellation", operation_id="cancel_booking")
-async def cancellation(data: dict, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db)):
+async def cancellation(data: dict, db: AsyncSession = Depends(get_db)):
     """Receive a cancellation webhook from Zapier. Marks the booking as cancelled and records the cancellation time."""
     logger.info("Processing a cancelled booking")
     if reject_booking(data):
         return "OK"
 
     data["_cancellation_datetime"] = UTC_now()
-    result = await update_table(data, db, status="CANCELLED")
-    background_tasks.add_task(process_with_klaviyo, result, WebhookRoute.BOOKING_CANCELLATION)
+    await update_table(data, db, status="CANCELLED", route=WebhookRoute.BOOKING_CANCELLATION)
     return "OK"
 
 
 @router.post("/updated", operation_id="update_booking")
-async def updated(data: dict, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db)):
+async def updated(data: dict, db: AsyncSession = Depends(get_db)):
     """Receive an updated booking webhook from Zapier. Updates existing booking data."""
     logger.info("Processing an updated booking")
-    result = await update_table(data, db)
-    background_tasks.add_task(process_with_klaviyo, result, WebhookRoute.BOOKING_UPDATED)
+    await update_table(data, db, route=WebhookRoute.BOOKING_UPDATED)
     return "OK"
 
 
 @router.post("/team_changed", operation_id="change_booking_team")
-async def team_changed(data: dict, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db)):
+async def team_changed(data: dict, db: AsyncSession = Depends(get_db)):
     """Receive a team change webhook from Zapier. Updates the team assigned to a booking."""
     logger.info("Processing a team assignment change")
-    result = await update_table(data, db, is_restored=True)
-    background_tasks.add_task(process_with_klaviyo, result, WebhookRoute.BOOKING_TEAM_CHANGED)
+    # Team changes never notify Klaviyo, so no outbox row is written.
+    await update_table(data, db, is_restored=True)
     return "OK"
 
 
 # --- GET endpoints ---
 
 
+def _created_day_range(day: str):
+    """UTC bounds of a local calendar day given as YYYY-MM-DD."""
+    created_at = datetime.strptime(day, "%Y-%m-%d")
+    start_created = local_to_utc(
+        created_at.replace(hour=0, minute=0, second=0, microsecond=0)
+    )
+    end_created = local_to_utc(
+        created_at.replace(hour=23, minute=59, second=59, microsecond=0)
+    )
+    return start_created, end_created
+
+
 @router.get("", operation_id="search_bookings")
 async def search(
     category: str = Query(..., description="Service category to filter by (e.g. 'House Clean', 'Bond Clean')"),
     date: str = Query(..., description="Date to search bookings for, in YYYY-MM-DD format"),
     booking_status: str = Query(..., description="Booking status filter (e.g. 'NOT_COMPLETE', 'COMPLETED', 'CANCELLED')"),
-    db: AsyncSession = Depends(get_db),
+    limit: int | None = Query(None, ge=1, description=PAGE_LIMIT_HELP),
+    cursor: str | None = Query(None, description=PAGE_CURSOR_HELP),
+    mode: str = Depends(response_mode),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    """Search bookings by service category, date, and status. Returns a list of matching bookings with name, location, and booking ID."""
-    created_at = datetime.strptime(date, "%Y-%m-%d")
-    start_created = local_to_utc(
-        created_at.replace(hour=0, minute=0, second=0, microsecond=0)
+    """Search bookings by service category, date, and status. Returns a list of matching bookings with name, location, and booking ID, or a page ({bookings, next_cursor}) when limit or cursor is given. MCP tool calls always get a page."""
+    start_created, end_created = _created_day_range(date)
+    result = await search_bookings(
+        db, category, start_created, end_created, booking_status.upper(), limit=limit, cursor=cursor,
     )
-    end_created = local_to_utc(
-        created_at.replace(hour=23, minute=59, second=59, microsecond=0)
+    return compact_response(result, mode, "bookings")
+
+
+@router.get("/stats", operation_id="booking_stats")
+async def stats(
+    group_by: str | None = Query(None, description="Comma-separated dimensions: category, status, location, team, day, month"),
+    category: str | None = Query(None, description="Service category to filter by"),
+    booking_status: str | None = Query(None, description="Booking status filter (e.g. 'COMPLETED')"),
+    location: str | None = Query(None, description="Location name to filter by"),
+    from_date: str | None = Query(None, alias="from", description="Start of service date range, in YYYY-MM-DD format"),
+    to_date: str | None = Query(None, alias="to", description="End of service date range, in YYYY-MM-DD format"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Count bookings and total their final price (in cents) per group, computed in the database. E.g. group_by=month&category=Bond Clean&booking_status=COMPLETED answers 'how many bond cleans were completed each month and for how much'."""
+    return await booking_stats(
+        db, group_by,
+        service_category=category,
+        booking_status=booking_status.upper() if booking_status else None,
+        location=location,
+        from_date_str=from_date,
+        to_date_str=to_date,
+    )
+
+
+@router.get("/query", operation_id="query_bookings")
+async def query(
+    limit: int = Query(..., ge=1, description="Maximum bookings to return (capped at the server's page size maximum)"),
+    fields: str | None = Query(None, description="Comma-separated Booking fields to return (default: booking_id, service_date, name, service_category, booking_status, location)"),
+    sort: str = Query("service_date", description="Sort field (service_date, created_at, updated_at, booking_id, final_price, name); prefix with '-' for descending"),
+    service_from: date | None = Query(None, description="Earliest service date, YYYY-MM-DD"),
+    service_to: date | None = Query(None, description="Latest service date, YYYY-MM-DD"),
+    created_from: date | None = Query(None, description="Earliest created date (local), YYYY-MM-DD"),
+    created_to: date | None = Query(None, description="Latest created date (local), YYYY-MM-DD"),
+    category: str | None = Query(None, description="Service category to filter by"),
+    booking_status: str | None = Query(None, description="Booking status filter (e.g. 'COMPLETED')"),
+    team: str | None = Query(None, description="Team name, matched anywhere in the assigned teams"),
+    location: str | None = Query(None, description="Location name to filter by"),
+    postcode: str | None = Query(None, description="Postcode to filter by"),
+    email: str | None = Query(None, description="Customer email to filter by"),
+    mode: str = Depends(response_mode),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Find bookings with any combination of filters and return just the fields asked for. E.g. fields=booking_id,name,final_price&booking_status=COMPLETED&team=Team A&service_from=2024-03-01&sort=-final_price&limit=10 answers 'Team A's ten biggest completed jobs since March' in one call. 'more' is true when further bookings match."""
+    result = await query_bookings(
+        db, limit, fields, sort,
+        service_category=category,
+        booking_status=booking_status.upper() if booking_status else None,
+        team=team,
+        location=location,
+        postcode=postcode,
+        email=email,
+        start_created=_created_day_range(created_from.isoformat())[0] if created_from else None,
+        end_created=_created_day_range(created_to.isoformat())[1] if created_to else None,
+        from_date=service_from,
+        to_date=service_to,
+    )
+    return compact_response(result, mode, "bookings")
+
+
+@router.get("/export", operation_id="export_bookings")
+async def export(
+    fmt: Literal["ndjson", "csv"] = Query("ndjson", alias="format", description="Output format: 'ndjson' or 'csv'"),
+    category: str | None = Query(None, description="Service category to filter by"),
+    booking_status: str | None = Query(None, description="Booking status filter (e.g. 'COMPLETED')"),
+    date: str | None = Query(None, description="Created date (local), in YYYY-MM-DD format"),
+    from_date: str | None = Query(None, alias="from", description="Start of service date range, in YYYY-MM-DD format"),
+    to_date: str | None = Query(None, alias="to", description="End of service date range, in YYYY-MM-DD format"),
+):
+    """Stream all matching bookings (every field) as NDJSON or CSV. Filters are optional and combine like the search endpoints."""
+    start_created, end_created = _created_day_range(date) if date else (None, None)
+    body = export_bookings(
+        fmt,
+        service_category=category,
+        booking_status=booking_status.upper() if booking_status else None,
+        start_created=start_created,
+        end_created=end_created,
+        from_date=datetime.strptime(from_date, "%Y-%m-%d").date() if from_date else None,
+        to_date=datetime.strptime(to_date, "%Y-%m-%d").date() if to_date else None,
+    )
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="bookings.{fmt}"'},
     )
-    return await search_bookings(db, category, start_created, end_created, booking_status.upper())
 
 
 @router.get("/{booking_id}", operation_id="get_booking_details")
-async def get_booking_details(booking_id: int, db: AsyncSession = Depends(get_db)):
+async def get_booking_details(
+    booking_id: int, request: Request, mode: str = Depends(response_mode), db: AsyncSession = Depends(get_read_db),
+):
     """Get full details of a specific booking by its ID. Returns all booking fields including customer info, dates, pricing, and team assignment."""
-    res = await booking_dao.get_by_booking_id(db, booking_id)
-    if res is None:
+    found = await get_booking_document(db, booking_id)
+    if found is None:
         raise HTTPException(status_code=404, detail="Booking not found")
-    return res.model_dump(mode="json")
+    doc, etag = found
+    if mode != "full":
+        etag = f'{etag[:-1]}-{mode}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": RESPONSE_MODE_HEADER}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(compact_response(doc, mode), headers=headers)
 
 
 @router.get("/was_new_customer/{booking_id}", operation_id="check_was_new_customer")
-async def get_was_new_customer(booking_id: int, db: AsyncSession = Depends(get_db)):
+async def get_was_new_customer(booking_id: int, db: AsyncSession = Depends(get_read_db)):
     """Check whether a booking was from a new customer."""
-    res = await booking_dao.get_by_booking_id(db, booking_id)
-    if res is not None:
-        return {
-            "was_new_customer": res.was_new_customer
-            if hasattr(res, "was_new_customer")
-            else False
-        }
+    found = await get_booking_document(db, booking_id)
+    if found is not None:
+        return {"was_new_customer": found[0].get("was_new_customer", False)}
     return {"was_new_customer": False}
 
 
@@ -138,17 +246,36 @@ async def get_was_new_customer(booking_id: int, db: AsyncSession = Depends(get_d
 async def search_by_dates(
     from_date: str = Query(..., alias="from", description="Start date for the search range, in YYYY-MM-DD format"),
     to_date: str = Query(..., alias="to", description="End date for the search range, in YYYY-MM-DD format"),
-    db: AsyncSession = Depends(get_db),
+    limit: int | None = Query(None, ge=1, description=PAGE_LIMIT_HELP),
+    cursor: str | None = Query(None, description=PAGE_CURSOR_HELP),
+    mode: str = Depends(response_mode),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    """Search completed bookings within a service date range. Returns booking details including team assignment, service info, and customer email."""
-    return await search_completed_bookings_by_service_date(db, from_date, to_date)
+    """Search completed bookings within a service date range. Returns booking details including team assignment, service info, and customer email, or a page ({bookings, next_cursor}) when limit or cursor is given. MCP tool calls always get a page."""
+    result = await search_completed_bookings_by_service_date(
+        db, from_date, to_date, limit=limit, cursor=cursor,
+    )
+    return compact_response(result, mode, "bookings")
 
 
 @router.get("/service_date/search", operation_id="search_by_email_and_date")
 async def search_by_service_date_and_email(
     service_date: str = Query(..., description="Service date to search for, in YYYY-MM-DD format"),
     email: str = Query(..., description="Customer email address to search for"),
-    db: AsyncSession = Depends(get_db),
+    mode: str = Depends(response_mode),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Find a booking by customer email and service date. Returns full booking details if found, or a 'not found' status."""
-    return await get_booking_by_email_service_date(db, email, service_date)
+    result = await get_booking_by_email_service_date(db, email, service_date)
+    return compact_response(result, mode, "data")
+
+
+@router.get("/search/text", operation_id="search_bookings_text")
+async def search_text(
+    q: str = Query(..., min_length=3, description=TEXT_QUERY_HELP),
+    limit: int = Query(10, ge=1, le=50, description="Maximum matches to return"),
+    mode: str = Depends(response_mode),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Find bookings by a name, street, email, phone number or suburb, tolerating typos and partial words. Returns the best matches first with booking ID, service date, status, category, contact fields and a similarity score (0-1)."""
+    return compact_response(await search_bookings_text(db, q, limit), mode)
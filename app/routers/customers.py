@@ -1,17 +1,20 @@
-"""Customer webhook endpoints."""
+"""Customer webhook endpoints and search."""
 
 import logging
 
-from fastapi import APIRouter, BackgroundTasks, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.auth import verify_api_key
-from app.core.database import get_db
-from app.services.customers import create_or_update_customer
-from app.utils.klaviyo import process_with_klaviyo, WebhookRoute
+from app.core.database import get_db, get_read_db
+from app.services.customers import create_or_update_customer, search_customers
+from app.utils.compact import compact_response, response_mode
+from app.utils.klaviyo import WebhookRoute
 
 logger = logging.getLogger(__name__)
 
+TEXT_QUERY_HELP = "Free text matched fuzzily against name, address, email, phone and location (e.g. 'smith elm street')"
+
 router = APIRouter(
     prefix="/customer",
     tags=["customers"],
@@ -20,18 +23,27 @@ router = APIRouter(
 
 
 @router.post("/new", operation_id="create_new_customer")
-async def new(data: dict, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db)):
+async def new(data: dict, db: AsyncSession = Depends(get_db)):
     """Receive a new customer webhook from Zapier. Creates or updates the customer record."""
     logger.info("Processing a new customer ...")
-    result = await create_or_update_customer(data, db)
-    background_tasks.add_task(process_with_klaviyo, data, WebhookRoute.CUSTOMER_NEW)
+    result = await create_or_update_customer(data, db, route=WebhookRoute.CUSTOMER_NEW)
     return result
 
 
 @router.post("/updated", operation_id="update_customer")
-async def updated(data: dict, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db)):
+async def updated(data: dict, db: AsyncSession = Depends(get_db)):
     """Receive an updated customer webhook from Zapier. Updates existing customer data."""
     logger.info("Processing an updated customer ...")
-    result = await create_or_update_customer(data, db)
-    background_tasks.add_task(process_with_klaviyo, data, WebhookRoute.CUSTOMER_UPDATED)
+    result = await create_or_update_customer(data, db, route=WebhookRoute.CUSTOMER_UPDATED)
     return result
+
+
+@router.get("/search", operation_id="search_customers")
+async def search(
+    q: str = Query(..., min_length=3, description=TEXT_QUERY_HELP),
+    limit: int = Query(10, ge=1, le=50, description="Maximum matches to return"),
+    mode: str = Depends(response_mode),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Find customers by a name, street, email, phone number or suburb, tolerating typos and partial words. Returns the best matches first with customer ID, contact fields and a similarity score (0-1)."""
+    return compact_response(await search_customers(db, q, limit), mode)
@@ -0,0 +1,29 @@
+"""Read-only SQL over bookings and customer, for ad-hoc analysis from MCP tools."""
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.auth import verify_api_key
+from app.core.database import get_read_db
+from app.schemas.sql import SQLQuery
+from app.services.sql_query import ALLOWED_FUNCTIONS, ALLOWED_TABLES, run_readonly_query
+
+router = APIRouter(
+    prefix="/sql",
+    tags=["sql"],
+    dependencies=[Depends(verify_api_key)],
+)
+
+QUERY_HELP = (
+    "Run one read-only PostgreSQL SELECT and get {columns, rows, truncated} back. Use it for counts, "
+    "sums and groupings that no other tool answers, so the database does the aggregation. Only these "
+    "tables and columns can be used (column names as stored, e.g. _service_date; quote mixed-case "
+    "names): "
+    + "; ".join(f"{table}({', '.join(columns)})" for table, columns in ALLOWED_TABLES.items())
+    + f". Functions: {', '.join(sorted(ALLOWED_FUNCTIONS))}. Statements are time-limited and rows are capped."
+)
+
+
+@router.post("/query", operation_id="run_sql_query", description=QUERY_HELP)
+async def query(body: SQLQuery, db: AsyncSession = Depends(get_read_db)):
+    return await run_readonly_query(db, body.sql, body.limit)
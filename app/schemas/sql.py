@@ -0,0 +1,10 @@
+"""Pydantic schemas for the read-only SQL endpoint."""
+
+from pydantic import BaseModel, Field
+
+
+class SQLQuery(BaseModel):
+    """Request body for POST /sql/query."""
+
+    sql: str = Field(..., min_length=1, max_length=10000, description="A single SELECT statement")
+    limit: int = Field(100, ge=1, description="Maximum rows to return (capped by the server)")
@@ -0,0 +1,77 @@
+"""In-process cache of serialised booking documents with ETags, keyed by booking_id."""
+
+import hashlib
+import json
+import time
+
+from cachetools import TTLCache
+
+from app.core.config import get_settings
+
+
+def booking_etag(doc: dict) -> str:
+    """Strong ETag for a booking document: a hash of the serialised document.
+
+    Hashing the whole document (not just updated_at) means fields the app
+    sets without touching updated_at, such as a forced status or a resolved
+    location, still change the tag.
+    """
+    basis = json.dumps(doc, sort_keys=True, default=str)
+    return '"%s"' % hashlib.sha1(basis.encode()).hexdigest()[:20]
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """True if an If-None-Match header value matches `etag` (weak comparison, '*' allowed)."""
+    if not if_none_match:
+        return False
+    candidates = [t.strip() for t in if_none_match.split(",")]
+    return "*" in candidates or etag in (t.removeprefix("W/") for t in candidates)
+
+
+class BookingDocCache:
+    """Bounded TTL/LRU map of booking_id -> (document, etag).
+
+    The webhook write path drops a booking's entry, so a cached document is
+    never older than the last write this process saw; the TTL bounds
+    staleness from writes made elsewhere. A TTL of 0 disables caching.
+
+    For `write_window` seconds after a write, the booking's document is
+    served but not stored, so a lagging read replica cannot refill the
+    cache with the row as it was before the write.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, write_window: float = 0.0):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl) if ttl > 0 else None
+        self.write_window = write_window
+        self._written: dict[int, float] = {}  # booking_id -> monotonic time of last write
+
+    def _recently_written(self, booking_id: int) -> bool:
+        cutoff = time.monotonic() - self.write_window
+        self._written = {k: t for k, t in self._written.items() if t >= cutoff}
+        return booking_id in self._written
+
+    def get(self, booking_id: int) -> tuple[dict, str] | None:
+        return self._entries.get(booking_id) if self._entries is not None else None
+
+    def put(self, booking_id: int, doc: dict) -> tuple[dict, str]:
+        entry = (doc, booking_etag(doc))
+        if self._entries is not None and not self._recently_written(booking_id):
+            self._entries[booking_id] = entry
+        return entry
+
+    def invalidate(self, booking_id: int | None):
+        if self._entries is not None and booking_id is not None:
+            self._entries.pop(booking_id, None)
+            if self.write_window > 0:
+                self._written[booking_id] = time.monotonic()
+
+    def clear(self):
+        if self._entries is not None:
+            self._entries.clear()
+
+
+booking_doc_cache = BookingDocCache(
+    maxsize=get_settings().BOOKING_CACHE_SIZE,
+    ttl=get_settings().BOOKING_CACHE_TTL_SECONDS,
+    write_window=get_settings().CACHE_WRITE_WINDOW_SECONDS,
+)
@@ -1,14 +1,29 @@
 """Booking business logic extracted from the router layer."""
 
+import csv
+import io
+import json
 import logging
-from datetime import datetime
+from datetime import date, datetime
 
 from fastapi import HTTPException
 from sqlalchemy import exc
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.daos.booking import booking_dao
+from app.core.config import get_settings
+from app.core.database import open_session
+from app.core.surface import MCP, current_surface
+from app.daos.booking import (
+    QUERY_DEFAULT_FIELDS, QUERY_FIELDS, QUERY_SORT_FIELDS, STATS_DIMENSIONS, booking_dao,
+)
+from app.daos.booking_rollup import ROLLUP_DIMENSIONS, booking_rollup_dao
 from app.daos.customer import customer_dao
+from app.daos.klaviyo_outbox import klaviyo_outbox_dao
+from app.services.booking_cache import booking_doc_cache
+from app.services.search_cache import booking_scope, search_cache
+from app.utils.klaviyo import WebhookRoute, klaviyo_handles
+from app.utils.pagination import decode_cursor, encode_cursor, page_size
+from app.utils.validation import safe_int
 
 logger = logging.getLogger(__name__)
 
@@ -28,80 +43,182 @@ async def update_table(
     db: AsyncSession,
     status: str | None = None,
     is_restored: bool = False,
+    route: WebhookRoute | None = None,
 ):
     """Route webhook data to the booking DAO.
 
-    Returns the data dict so callers can trigger post-DB work (e.g. Klaviyo)
-    after the DB session is released.
+    When a route is given and Klaviyo acts on it, an outbox row is staged
+    before the upsert so it commits in the same transaction; the dispatcher
+    worker sends it.
+    Returns the data dict.
     """
     if reject_booking(data):
         return "OK"
     if status:
         data["booking_status"] = status
 
+    outbox_row = (
+        klaviyo_outbox_dao.enqueue(db, data, route) if route and klaviyo_handles(data, route) else None
+    )
+
     logger.debug("Update Booking table")
     await booking_dao.create_update_booking(db, data)
+    search_cache.invalidate(data)
+    booking_doc_cache.invalidate(safe_int(data.get("id")))
     if not is_restored:
         await customer_dao.create_or_update_customer(db, data["customer"])
+    if outbox_row is not None:
+        await klaviyo_outbox_dao.ensure_committed(db, outbox_row)
     return data
 
 
+# --- Single booking reads ---
+
+
+async def get_booking_document(db: AsyncSession, booking_id: int) -> tuple[dict, str] | None:
+    """Return (serialised booking, ETag), from the document cache when possible."""
+    if (cached := booking_doc_cache.get(booking_id)) is not None:
+        return cached
+    row = await booking_dao.get_by_booking_id(db, booking_id)
+    if row is None:
+        return None
+    return booking_doc_cache.put(booking_id, row.model_dump(mode="json"))
+
+
 # --- Search helpers ---
 
 
+def _surface_limit(limit: int | None, cursor: str | None) -> int | None:
+    """The caller's limit, except that MCP tool calls are never unpaged.
+
+    An unpaged MCP search gets the default page size, so an agent cannot
+    pull a whole table into one response; next_cursor tells it there is more.
+    """
+    if limit is None and cursor is None and current_surface.get() == MCP:
+        return get_settings().SEARCH_PAGE_SIZE_DEFAULT
+    return limit
+
+
+def _page_params(limit: int | None, cursor: str | None) -> tuple[int | None, tuple | None]:
+    """Resolve (page size or None for unpaged, decoded cursor key)."""
+    settings = get_settings()
+    size = page_size(limit, cursor, settings.SEARCH_PAGE_SIZE_DEFAULT, settings.SEARCH_PAGE_SIZE_MAX)
+    return size, decode_cursor(cursor) if cursor else None
+
+
+def _paged(rows, size: int | None, to_dict):
+    """Unpaged: a plain list. Paged: {"bookings", "next_cursor"}.
+
+    The DAO is asked for one row more than the page size; if it arrives
+    there is another page and the cursor points at the last row returned.
+    """
+    if size is None:
+        return [to_dict(item) for item in rows]
+    rows = list(rows)
+    more = len(rows) > size
+    rows = rows[:size]
+    next_cursor = encode_cursor(rows[-1].service_date, rows[-1].booking_id) if more else None
+    return {"bookings": [to_dict(item) for item in rows], "next_cursor": next_cursor}
+
+
+def _search_row(item) -> dict:
+    return {
+        "category": item.service_category,
+        "name": item.name,
+        "location": item.location,
+        "booking_id": item.booking_id,
+    }
+
+
+def _completed_row(item) -> dict:
+    return {
+        "booking_id": item.booking_id,
+        "date_received": item.service_date.isoformat() if item.service_date else None,
+        "service_date": item.service_date.isoformat() if item.service_date else None,
+        "full_name": item.name,
+        "email": item.email,
+        "postcode": item.postcode,
+        "location_name": item.location,
+        "team_assigned": item.teams_assigned,
+        "created_by": item.created_by,
+        "service_category": item.service_category,
+        "service": item.service,
+        "frequency": item.frequency,
+    }
+
+
 async def search_bookings(
-    db: AsyncSession, service_category, start_created, end_created, booking_status
+    db: AsyncSession, service_category, start_created, end_created, booking_status,
+    limit: int | None = None, cursor: str | None = None,
 ):
-    """Query bookings by category, status, and date range."""
+    """Query bookings by category, status, and date range.
+
+    Returns a list, or a page envelope when limit or cursor is given (or
+    the call is from MCP).
+    """
+    limit = _surface_limit(limit, cursor)
+    key = ("search", service_category, booking_status, start_created, end_created, limit, cursor)
+    if (cached := search_cache.get(key)) is not None:
+        return cached
+
+    size, after = _page_params(limit, cursor)
     try:
         res = await booking_dao.get_by_date_range(
-            db, service_category, booking_status, start_created, end_created
+            db, service_category, booking_status, start_created, end_created,
+            limit=size + 1 if size else None, after=after,
         )
     except exc.OperationalError as e:
         raise HTTPException(status_code=503, detail="Database temporarily unavailable") from e
 
-    return [
-        {
-            "category": item.service_category,
-            "name": item.name,
-            "location": item.location,
-            "booking_id": item.booking_id,
-        }
-        for item in res
-    ]
+    result = _paged(res, size, _search_row)
+    search_cache.put(key, result, booking_scope(
+        category=service_category, status=booking_status, created=(start_created, end_created),
+    ))
+    return result
+
 
+async def search_completed_bookings_by_service_date(
+    db: AsyncSession, from_date_str, to_date_str,
+    limit: int | None = None, cursor: str | None = None,
+):
+    """Return completed bookings within a service date range as dicts.
 
-async def search_completed_bookings_by_service_date(db: AsyncSession, from_date_str, to_date_str):
-    """Return completed bookings within a service date range as dicts."""
+    Returns a list, or a page envelope when limit or cursor is given (or
+    the call is from MCP).
+    """
+    limit = _surface_limit(limit, cursor)
     start_date = datetime.strptime(from_date_str, "%Y-%m-%d").date()
     end_date = datetime.strptime(to_date_str, "%Y-%m-%d").date()
+    key = ("completed", start_date, end_date, limit, cursor)
+    if (cached := search_cache.get(key)) is not None:
+        return cached
 
+    size, after = _page_params(limit, cursor)
     try:
-        res = await booking_dao.completed_bookings_by_service_date(db, start_date, end_date)
+        res = await booking_dao.completed_bookings_by_service_date(
+            db, start_date, end_date, limit=size + 1 if size else None, after=after,
+        )
     except exc.OperationalError as e:
         raise HTTPException(status_code=503, detail="Database temporarily unavailable") from e
 
-    return [
-        {
-            "booking_id": item.booking_id,
-            "date_received": item.service_date.isoformat() if item.service_date else None,
-            "service_date": item.service_date.isoformat() if item.service_date else None,
-            "full_name": item.name,
-            "email": item.email,
-            "postcode": item.postcode,
-            "location_name": item.location,
-            "team_assigned": item.teams_assigned,
-            "created_by": item.created_by,
-            "service_category": item.service_category,
-            "service": item.service,
-            "frequency": item.frequency,
-        }
-        for item in res
-    ]
+    result = _paged(res, size, _completed_row)
+    search_cache.put(key, result, booking_scope(status="COMPLETED", service_dates=(start_date, end_date)))
+    return result
 
 
 async def get_booking_by_email_service_date(db: AsyncSession, email, service_date):
     """Look up a booking by customer email and service date week."""
+    key = ("email_week", email, service_date)
+    if (cached := search_cache.get(key)) is not None:
+        return cached
+
+    result = await _lookup_by_email_service_date(db, email, service_date)
+    # Scoped by email alone: any write for this customer re-runs the lookup.
+    search_cache.put(key, result, booking_scope(email=email))
+    return result
+
+
+async def _lookup_by_email_service_date(db: AsyncSession, email, service_date):
     row = await booking_dao.get_by_booking_email_service_date_range(db, email, service_date)
     if row:
         return {
@@ -124,3 +241,163 @@ async def get_booking_by_email_service_date(db: AsyncSession, email, service_dat
             "status": "found",
         }
     return {"data": {}, "status": "not found"}
+
+
+# --- Text search ---
+
+
+async def search_bookings_text(db: AsyncSession, q: str, limit: int):
+    """Fuzzy-match bookings on contact fields; compact rows with a 0-1 score, best first."""
+    try:
+        rows = await booking_dao.search_text(db, q.strip(), limit)
+    except exc.OperationalError as e:
+        raise HTTPException(status_code=503, detail="Database temporarily unavailable") from e
+    return [
+        {**{k: _export_value(v) for k, v in row._mapping.items()}, "score": round(row.score, 3)}
+        for row in rows
+    ]
+
+
+# --- Aggregates ---
+
+
+def parse_group_by(group_by: str | None) -> list[str]:
+    """Split a comma-separated group_by value and check it against STATS_DIMENSIONS."""
+    names = [n.strip().lower() for n in (group_by or "").split(",") if n.strip()]
+    unknown = [n for n in names if n not in STATS_DIMENSIONS]
+    if unknown:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown group_by {unknown}; allowed: {sorted(STATS_DIMENSIONS)}",
+        )
+    if "day" in names and "month" in names:
+        raise HTTPException(status_code=422, detail="Group by day or month, not both")
+    return list(dict.fromkeys(names))
+
+
+def _stats_source(names: list[str], from_date, to_date):
+    """Pick the daily rollup when it can give the same answer as the bookings table.
+
+    The rollup has no team dimension and skips bookings without a service
+    date, which a from/to filter excludes from the bookings query anyway.
+    """
+    if (
+        get_settings().STATS_USE_ROLLUP
+        and set(names) <= set(ROLLUP_DIMENSIONS)
+        and (from_date is not None or to_date is not None)
+    ):
+        return booking_rollup_dao
+    return booking_dao
+
+
+async def booking_stats(
+    db: AsyncSession, group_by: str | None = None, service_category=None, booking_status=None,
+    location=None, from_date_str=None, to_date_str=None,
+):
+    """Booking counts and final_price totals (cents), grouped and summed in Postgres."""
+    names = parse_group_by(group_by)
+    from_date = datetime.strptime(from_date_str, "%Y-%m-%d").date() if from_date_str else None
+    to_date = datetime.strptime(to_date_str, "%Y-%m-%d").date() if to_date_str else None
+
+    try:
+        rows = await _stats_source(names, from_date, to_date).aggregate(
+            db, names, service_category=service_category, booking_status=booking_status,
+            location=location, from_date=from_date, to_date=to_date,
+        )
+    except exc.OperationalError as e:
+        raise HTTPException(status_code=503, detail="Database temporarily unavailable") from e
+
+    return {
+        "group_by": names,
+        "groups": [
+            {k: _export_value(v) for k, v in row._mapping.items()} for row in rows
+        ],
+    }
+
+
+def parse_fields(fields: str | None) -> list[str]:
+    """Split a comma-separated fields value and check it against QUERY_FIELDS."""
+    names = [n.strip() for n in (fields or "").split(",") if n.strip()]
+    unknown = [n for n in names if n not in QUERY_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown fields {unknown}; see Booking fields")
+    return list(dict.fromkeys(names)) or list(QUERY_DEFAULT_FIELDS)
+
+
+def parse_sort(sort: str) -> tuple[str, bool]:
+    """Return (field, descending) for a sort value like 'service_date' or '-created_at'."""
+    field = sort.strip().removeprefix("-")
+    if field not in QUERY_SORT_FIELDS:
+        raise HTTPException(
+            status_code=422, detail=f"Cannot sort by {field!r}; allowed: {list(QUERY_SORT_FIELDS)}",
+        )
+    return field, sort.strip().startswith("-")
+
+
+async def query_bookings(
+    db: AsyncSession, limit: int, fields: str | None = None, sort: str = "service_date", **filters,
+):
+    """Bookings matching the optional filters, projected to the requested fields.
+
+    Only the requested columns are selected. One extra row is fetched to
+    report whether more bookings match than `limit` (capped at
+    SEARCH_PAGE_SIZE_MAX) let through.
+    """
+    names = parse_fields(fields)
+    sort_field, descending = parse_sort(sort)
+    limit = min(limit, get_settings().SEARCH_PAGE_SIZE_MAX)
+
+    try:
+        rows = await booking_dao.query(db, names, limit + 1, sort_field, descending, **filters)
+    except exc.OperationalError as e:
+        raise HTTPException(status_code=503, detail="Database temporarily unavailable") from e
+
+    return {
+        "fields": names,
+        "bookings": [
+            {k: _export_value(v) for k, v in row._mapping.items()} for row in rows[:limit]
+        ],
+        "more": len(rows) > limit,
+    }
+
+
+# --- Export ---
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _export_value(value):
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+
+def _export_chunk(rows, fields: list[str], fmt: str) -> str:
+    """Serialise one cursor partition as NDJSON lines or CSV rows."""
+    if fmt == "csv":
+        buf = io.StringIO()
+        csv.writer(buf).writerows([_export_value(v) for v in row] for row in rows)
+        return buf.getvalue()
+    return "".join(
+        json.dumps({f: _export_value(v) for f, v in zip(fields, row)}) + "\n" for row in rows
+    )
+
+
+async def export_bookings(fmt: str, **filters):
+    """Yield an export of matching bookings, one chunk per server-side cursor partition.
+
+    Opens its own read session rather than taking one from get_read_db: the
+    body is streamed after the route returns, so it must own the connection
+    for as long as the cursor is open. Memory stays at one partition
+    regardless of how many rows match.
+    """
+    settings = get_settings()
+    stmt = booking_dao.export_query(**filters)
+    fields = list(stmt.selected_columns.keys())
+
+    if fmt == "csv":
+        buf = io.StringIO()
+        csv.writer(buf).writerow(fields)
+        yield buf.getvalue()
+
+    async with open_session(read=True) as db:
+        async for rows in booking_dao.stream_partitions(db, stmt, settings.EXPORT_CHUNK_SIZE):
+            yield _export_chunk(rows, fields, fmt)
@@ -3,16 +3,39 @@
 import logging
 
 from fastapi import HTTPException
+from sqlalchemy import exc
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.daos.customer import customer_dao
+from app.daos.klaviyo_outbox import klaviyo_outbox_dao
+from app.utils.klaviyo import WebhookRoute, klaviyo_handles
 
 logger = logging.getLogger(__name__)
 
 
-async def create_or_update_customer(data: dict, db: AsyncSession):
-    """Validate and delegate customer upsert to the DAO."""
+async def create_or_update_customer(
+    data: dict, db: AsyncSession, route: WebhookRoute | None = None
+):
+    """Validate and delegate customer upsert to the DAO.
+
+    When a route is given and Klaviyo acts on it, an outbox row is committed
+    with the upsert.
+    """
     if not data.get("id"):
         raise HTTPException(status_code=422, detail="Missing required field: id")
+    outbox_row = (
+        klaviyo_outbox_dao.enqueue(db, data, route) if route and klaviyo_handles(data, route) else None
+    )
     await customer_dao.create_or_update_customer(db, data)
+    if outbox_row is not None:
+        await klaviyo_outbox_dao.ensure_committed(db, outbox_row)
     return "OK"
+
+
+async def search_customers(db: AsyncSession, q: str, limit: int):
+    """Fuzzy-match customers on contact fields; compact rows with a 0-1 score, best first."""
+    try:
+        rows = await customer_dao.search_text(db, q.strip(), limit)
+    except exc.OperationalError as e:
+        raise HTTPException(status_code=503, detail="Database temporarily unavailable") from e
+    return [{**row._mapping, "score": round(row.score, 3)} for row in rows]
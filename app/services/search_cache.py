@@ -0,0 +1,130 @@
+"""In-process cache of booking search results, invalidated by webhook writes."""
+
+import logging
+import time
+from collections import deque
+from datetime import date, datetime
+
+from cachetools import TTLCache
+
+from app.core.config import get_settings
+from app.utils.validation import parse_date, parse_datetime, safe_int
+
+logger = logging.getLogger(__name__)
+
+
+def booking_scope(
+    category: str | None = None,
+    status: str | None = None,
+    created: tuple[datetime, datetime] | None = None,
+    service_dates: tuple[date, date] | None = None,
+    email: str | None = None,
+):
+    """Return a predicate: could a booking webhook payload appear in this search?
+
+    Each given criterion must match. A criterion the payload does not carry,
+    or cannot be parsed, counts as a match, so doubt always invalidates.
+    """
+    def covers(data: dict) -> bool:
+        try:
+            if category is not None and data.get("service_category") not in (None, category):
+                return False
+            if status is not None and data.get("booking_status") not in (None, status):
+                return False
+            if email is not None and data.get("email") not in (None, email):
+                return False
+            if created is not None and data.get("created_at"):
+                created_at = parse_datetime(data["created_at"])
+                if created_at is not None and not created[0] <= created_at <= created[1]:
+                    return False
+            if service_dates is not None and data.get("service_date"):
+                service_date = parse_date(data["service_date"])
+                if service_date is not None and not service_dates[0] <= service_date <= service_dates[1]:
+                    return False
+        except (TypeError, ValueError):
+            return True
+        return True
+
+    return covers
+
+
+def _booking_ids(result) -> frozenset:
+    """booking_ids present in a search result (list, page envelope, or lookup)."""
+    if isinstance(result, dict):
+        rows = result.get("bookings")
+        if rows is None:
+            rows = [result.get("data") or {}]
+    else:
+        rows = result
+    return frozenset(r["booking_id"] for r in rows if r.get("booking_id") is not None)
+
+
+class SearchCache:
+    """Bounded TTL/LRU cache of search results.
+
+    Each entry remembers the booking_ids it returned and a scope predicate
+    for the bookings it *could* return. A write drops the entries that
+    contain the booking (it may have changed or left the result) and those
+    whose scope covers the new data (it may have joined the result). The TTL
+    bounds staleness from writes made by other processes. A TTL of 0
+    disables caching.
+
+    For `write_window` seconds after a write, results that the write would
+    have invalidated are returned but not stored. A read replica that has
+    not replayed the write yet (or a read that started before it) cannot
+    put the old rows back.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, write_window: float = 0.0):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl) if ttl > 0 else None
+        self.write_window = write_window
+        self._recent = deque()  # (monotonic time, booking_id, payload) per write
+
+    def _recent_writes(self):
+        cutoff = time.monotonic() - self.write_window
+        while self._recent and self._recent[0][0] < cutoff:
+            self._recent.popleft()
+        return list(self._recent)
+
+    def get(self, key):
+        if self._entries is None:
+            return None
+        entry = self._entries.get(key)
+        return entry[0] if entry is not None else None
+
+    def put(self, key, result, covers):
+        if self._entries is None:
+            return
+        ids = _booking_ids(result)
+        if any(booking_id in ids or covers(data) for _, booking_id, data in self._recent_writes()):
+            logger.debug("search cache: not storing %s, a booking it covers was just written", key)
+            return
+        self._entries[key] = (result, ids, covers)
+
+    def invalidate(self, data: dict) -> int:
+        """Drop entries affected by a write of this booking payload; returns how many."""
+        booking_id = safe_int(data.get("id") or data.get("booking_id"))
+        if self._entries is not None and self.write_window > 0:
+            self._recent.append((time.monotonic(), booking_id, data))
+        if not self._entries:
+            return 0
+        stale = [
+            key for key, (_, ids, covers) in list(self._entries.items())
+            if booking_id in ids or covers(data)
+        ]
+        for key in stale:
+            self._entries.pop(key, None)
+        if stale:
+            logger.debug("search cache: %d entries invalidated by booking %s", len(stale), booking_id)
+        return len(stale)
+
+    def clear(self):
+        if self._entries is not None:
+            self._entries.clear()
+
+
+search_cache = SearchCache(
+    maxsize=get_settings().SEARCH_CACHE_SIZE,
+    ttl=get_settings().SEARCH_CACHE_TTL_SECONDS,
+    write_window=get_settings().CACHE_WRITE_WINDOW_SECONDS,
+)
@@ -0,0 +1,220 @@
+"""Read-only ad-hoc SQL over bookings and customer, for MCP tool calls.
+
+Guardrails, in the order they apply:
+
+1. check_sql() tokenises the statement. It must be one SELECT (or WITH ...
+   SELECT) with no parameters, dollar quotes or escape strings. Every word
+   must be an SQL keyword, a type name, an allowed function, an allowed table
+   or column, or an alias. A call must be to an allowed function or a type;
+   an alias is never callable.
+2. The statement runs as SQL_QUERY_ROLE (SET LOCAL ROLE), a role that can
+   only SELECT from bookings and customer (see app/database/create_sql_role.py).
+   Any function that reads other relations fails for lack of privileges.
+   The endpoint is disabled while the role is not configured.
+3. It runs wrapped as SELECT * FROM (...) LIMIT n, in a READ ONLY
+   transaction with SET LOCAL statement_timeout. The transaction is always
+   rolled back.
+4. EXPLAIN runs first in the same transaction. Every relation the plan
+   scans must be an allowed table.
+"""
+
+import json
+import logging
+import re
+
+from fastapi import HTTPException
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.models.booking import Booking
+from app.models.customer import Customer
+
+logger = logging.getLogger(__name__)
+
+# Table name -> database column names callers may use
+ALLOWED_TABLES = {
+    model.__tablename__: tuple(c.name for c in model.__table__.columns)
+    for model in (Booking, Customer)
+}
+
+ALLOWED_FUNCTIONS = frozenset({
+    "count", "sum", "avg", "min", "max", "stddev", "variance", "percentile_cont", "percentile_disc",
+    "mode", "array_agg", "string_agg", "bool_and", "bool_or", "round", "ceil", "floor", "abs",
+    "greatest", "least", "coalesce", "nullif", "date_trunc", "date_part", "extract", "age",
+    "to_char", "make_date", "lower", "upper", "length", "trim", "substring", "split_part",
+    "concat", "left", "right", "replace", "position", "cast", "row_number", "rank", "dense_rank",
+    "lag", "lead", "ntile", "generate_series",
+})
+
+SQL_KEYWORDS = frozenset({
+    "select", "distinct", "from", "where", "group", "by", "having", "order", "asc", "desc",
+    "nulls", "first", "last", "limit", "offset", "fetch", "next", "rows", "row", "only", "with",
+    "as", "and", "or", "not", "in", "is", "null", "true", "false", "between", "like", "ilike",
+    "similar", "to", "escape", "case", "when", "then", "else", "end", "join", "inner", "left",
+    "right", "full", "outer", "cross", "on", "using", "union", "intersect", "except", "all",
+    "any", "some", "exists", "over", "partition", "range", "unbounded", "preceding", "following",
+    "current", "filter", "within", "interval", "at", "time", "zone", "epoch", "year", "quarter",
+    "month", "week", "day", "dow", "isodow", "doy", "hour", "minute", "second", "for",
+})
+
+# Keywords that are syntax, not function calls, when "(" follows them
+PAREN_KEYWORDS = frozenset({
+    "select", "from", "where", "having", "by", "in", "exists", "any", "all", "some", "over",
+    "filter", "within", "as", "join", "on", "using", "and", "or", "not", "when", "then", "else",
+    "case", "between", "like", "ilike", "union", "intersect", "except", "with", "row", "interval",
+    "is", "distinct",
+})
+
+TYPE_NAMES = frozenset({
+    "int", "integer", "bigint", "smallint", "numeric", "decimal", "real", "double", "precision",
+    "float", "text", "varchar", "char", "boolean", "date", "timestamp", "timestamptz", "without",
+})
+
+# Never callable, even under an alias: sleeping, file/large-object and
+# remote access, settings, and anything in the pg_ namespace.
+DENIED_NAMES = frozenset({
+    "dblink", "lo_import", "lo_export", "lo_get", "current_setting", "set_config",
+    "query_to_xml", "query_to_json", "copy", "into",
+})
+
+_TOKEN = re.compile(
+    r"""
+      (?P<space>\s+)
+    | (?P<comment>--[^\n]*|/\*.*?\*/)
+    | (?P<string>'(?:[^']|'')*')
+    | (?P<quoted>"(?:[^"]|"")+")
+    | (?P<number>(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?)
+    | (?P<word>[A-Za-z_][A-Za-z0-9_]*)
+    | (?P<op>::|<=|>=|<>|!=|\|\||[-+*/%<>=(),.\[\]])
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+
+class SQLNotAllowed(ValueError):
+    """The statement is not a single SELECT over the allowed tables and functions."""
+
+
+def _tokens(sql: str) -> list[tuple[str, str]]:
+    tokens, pos = [], 0
+    while pos < len(sql):
+        match = _TOKEN.match(sql, pos)
+        if match is None:
+            raise SQLNotAllowed(f"Unexpected character {sql[pos]!r} at position {pos}")
+        if match.lastgroup not in ("space", "comment"):
+            tokens.append((match.lastgroup, match.group()))
+        pos = match.end()
+    return tokens
+
+
+def _name(kind: str, value: str) -> str:
+    return value[1:-1].replace('""', '"') if kind == "quoted" else value.lower()
+
+
+def check_sql(sql: str) -> str:
+    """Validate a caller's statement and return it without trailing semicolons.
+
+    Raises SQLNotAllowed with a message meant for the caller.
+    """
+    sql = sql.strip().rstrip(";").strip()
+    tokens = _tokens(sql)
+    if not tokens or _name(*tokens[0]) not in ("select", "with"):
+        raise SQLNotAllowed("Only a single SELECT (or WITH ... SELECT) statement is allowed")
+
+    depth = 0
+    for token in tokens:
+        depth += {("op", "("): 1, ("op", ")"): -1}.get(token, 0)
+        if depth < 0:
+            break
+    if depth:
+        raise SQLNotAllowed("Unbalanced parentheses")
+
+    names = [(i, _name(kind, value)) for i, (kind, value) in enumerate(tokens) if kind in ("word", "quoted")]
+    tables = set(ALLOWED_TABLES)
+    columns = {c.lower() for cols in ALLOWED_TABLES.values() for c in cols} | {
+        c for cols in ALLOWED_TABLES.values() for c in cols
+    }
+    known = SQL_KEYWORDS | TYPE_NAMES | tables | columns
+
+    # Aliases: "AS x", "x AS (" for CTEs, and a bare word straight after a
+    # table name or a closing parenthesis ("FROM bookings b", "(...) q").
+    aliases = set()
+    for i, name in names:
+        previous = _name(*tokens[i - 1]) if i else ""
+        following = tokens[i + 1][1] if i + 1 < len(tokens) else ""
+        if previous == "as" or (following.lower() == "as" and tokens[i + 2:i + 3] == [("op", "(")]):
+            aliases.add(name)
+        elif name not in known and i and (previous in tables or tokens[i - 1] == ("op", ")")):
+            aliases.add(name)
+
+    for i, name in names:
+        called = i + 1 < len(tokens) and tokens[i + 1] == ("op", "(")
+        if name in DENIED_NAMES or name.startswith("pg_"):
+            raise SQLNotAllowed(f"{name!r} is not allowed")
+        if called and name not in ALLOWED_FUNCTIONS | PAREN_KEYWORDS | TYPE_NAMES:
+            raise SQLNotAllowed(f"Function {name!r} is not allowed; allowed: {sorted(ALLOWED_FUNCTIONS)}")
+        if not called and name not in known | aliases:
+            raise SQLNotAllowed(f"Unknown or disallowed name {name!r}")
+    return sql
+
+
+def role_identifier(role: str) -> str:
+    """Quoted identifier for a role name; only plain lower-case names are accepted."""
+    if not re.fullmatch(r"[a-z_][a-z0-9_]*", role):
+        raise ValueError(f"Invalid role name {role!r}")
+    return f'"{role}"'
+
+
+def _relations(plan) -> set[str]:
+    """Every relation an EXPLAIN (FORMAT JSON) plan scans."""
+    if isinstance(plan, list):
+        return set().union(*map(_relations, plan)) if plan else set()
+    if not isinstance(plan, dict):
+        return set()
+    found = {plan["Relation Name"]} if "Relation Name" in plan else set()
+    return found.union(*(_relations(v) for v in plan.values() if isinstance(v, (list, dict))))
+
+
+async def run_readonly_query(db: AsyncSession, sql: str, limit: int):
+    """Run a checked SELECT in a read-only, time-limited transaction.
+
+    Returns {"columns", "rows", "truncated"}; at most `limit` rows, capped at
+    SQL_QUERY_MAX_ROWS.
+    """
+    settings = get_settings()
+    if not settings.SQL_QUERY_ROLE:
+        raise HTTPException(status_code=503, detail="Read-only SQL is not configured (SQL_QUERY_ROLE)")
+    try:
+        sql = check_sql(sql)
+    except SQLNotAllowed as e:
+        raise HTTPException(status_code=422, detail=str(e)) from e
+    limit = min(limit, settings.SQL_QUERY_MAX_ROWS)
+    # The caller's SQL goes to the driver as is (exec_driver_sql): text() would
+    # read ":name" inside a string literal as a bind parameter.
+    wrapped = f"SELECT * FROM (\n{sql}\n) AS q LIMIT {limit + 1}"
+
+    try:
+        await db.execute(text("SET TRANSACTION READ ONLY"))
+        await db.execute(text(f"SET LOCAL ROLE {role_identifier(settings.SQL_QUERY_ROLE)}"))
+        await db.execute(text(f"SET LOCAL statement_timeout = {int(settings.SQL_QUERY_TIMEOUT_MS)}"))
+        conn = await db.connection()
+        plan = (await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {wrapped}")).scalar()
+        denied = _relations(json.loads(plan) if isinstance(plan, str) else plan) - set(ALLOWED_TABLES)
+        if denied:
+            raise HTTPException(status_code=422, detail=f"Tables not allowed: {sorted(denied)}")
+        result = await conn.exec_driver_sql(wrapped)
+        columns, rows = list(result.keys()), [list(row) for row in result.all()]
+    except exc.StatementError as e:
+        message = str(e.orig or e).strip().splitlines()[0]
+        if "statement timeout" in message:
+            raise HTTPException(
+                status_code=408, detail=f"Query exceeded the {settings.SQL_QUERY_TIMEOUT_MS} ms time limit",
+            ) from e
+        if isinstance(e, exc.OperationalError):
+            raise HTTPException(status_code=503, detail="Database temporarily unavailable") from e
+        raise HTTPException(status_code=422, detail=f"Query failed: {message}") from e
+    finally:
+        await db.rollback()
+
+    return {"columns": columns, "rows": rows[:limit], "truncated": len(rows) > limit}
@@ -0,0 +1,115 @@
+"""Token-compact response shapes for MCP tool calls.
+
+Selected per request with the `response_mode` query parameter or the
+X-Response-Mode header:
+
+- full: the endpoint's usual response, unchanged.
+- compact: empty values (None, "", False, [] and {}) are dropped and field
+  names are shortened. A "keys" dictionary maps each short name back to the
+  field name.
+- columnar: like compact, but a list of rows becomes one array per field. All
+  arrays have the same length, so empty values stay in them as null. Fields
+  that are empty in every row are dropped.
+"""
+
+from itertools import chain, count
+from typing import Literal
+
+from fastapi import HTTPException, Query, Request
+
+ResponseMode = Literal["full", "compact", "columnar"]
+RESPONSE_MODES = ("full", "compact", "columnar")
+RESPONSE_MODE_HEADER = "X-Response-Mode"
+
+
+def response_mode(
+    request: Request,
+    mode: ResponseMode | None = Query(
+        None,
+        alias="response_mode",
+        description="'compact' drops empty fields and shortens field names, with a 'keys' dictionary; "
+                    "'columnar' also turns lists into one array per field. Default 'full'.",
+    ),
+) -> str:
+    """FastAPI dependency: the requested response mode, from the query string or the header."""
+    if mode is not None:
+        return mode
+    value = request.headers.get(RESPONSE_MODE_HEADER, "full").strip().lower()
+    if value not in RESPONSE_MODES:
+        raise HTTPException(
+            status_code=422, detail=f"Invalid {RESPONSE_MODE_HEADER} {value!r}; allowed: {list(RESPONSE_MODES)}",
+        )
+    return value
+
+
+def _empty(value) -> bool:
+    return value is None or value is False or value == "" or value == [] or value == {}
+
+
+class _Keys:
+    """Assigns short, unique names to field names in the order they are first seen.
+
+    A field becomes the initials of its underscore-separated words
+    (service_date -> sd). On a clash, more letters of the last word are
+    added (state -> st after service -> s), then the full name, then a
+    numbered suffix.
+    """
+
+    def __init__(self):
+        self.short: dict[str, str] = {}
+        self.used: set[str] = set()
+
+    def __call__(self, field: str) -> str:
+        if field in self.short:
+            return self.short[field]
+        words = [w for w in field.lower().split("_") if w] or [field]
+        initials = "".join(w[0] for w in words)
+        last = words[-1]
+        candidates = [initials] + [initials[:-1] + last[:i] for i in range(2, len(last) + 1)] + [field]
+        candidates = chain(candidates, (f"{initials}{n}" for n in count(2)))
+        name = next(c for c in candidates if c not in self.used)
+        self.short[field] = name
+        self.used.add(name)
+        return name
+
+    def dictionary(self) -> dict[str, str]:
+        return {short: field for field, short in self.short.items()}
+
+
+def _record(row: dict, keys: _Keys) -> dict:
+    return {keys(k): v for k, v in row.items() if not _empty(v)}
+
+
+def _columns(rows: list[dict], keys: _Keys) -> dict[str, list]:
+    fields = list(dict.fromkeys(k for row in rows for k in row))
+    return {
+        keys(f): [None if _empty(row.get(f)) else row.get(f) for row in rows]
+        for f in fields
+        if not all(_empty(row.get(f)) for row in rows)
+    }
+
+
+def compact_response(payload, mode: str, key: str | None = None):
+    """Reshape `payload` for `mode`.
+
+    `key` names the rows inside an envelope (e.g. "bookings" in a page, or
+    "data"); the rest of the envelope is kept as it is. A bare list or
+    record is returned as {"keys": ..., "data": ...}.
+    """
+    if mode == "full":
+        return payload
+    enveloped = key is not None and isinstance(payload, dict)
+    target = payload.get(key) if enveloped else payload
+
+    keys = _Keys()
+    if isinstance(target, list):
+        rows = [row for row in target if isinstance(row, dict)]
+        data = _columns(rows, keys) if mode == "columnar" else [_record(row, keys) for row in rows]
+    elif isinstance(target, dict):
+        data = _record(target, keys)
+    else:
+        return payload
+
+    if enveloped:
+        return {**payload, key: data, "keys": keys.dictionary()}
+    return {"keys": keys.dictionary(), "data": data}
@@ -3,37 +3,139 @@
 import base64
 import json
 import logging
+import time
 from email.mime.text import MIMEText
+from functools import lru_cache
 
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
+import httpx
 
 from app.core.config import get_settings
 
 logger = logging.getLogger(__name__)
 
 
-def _get_gmail_service():
-    """Build an authenticated Gmail API service client from service account credentials."""
-    settings = get_settings()
+GMAIL_SEND_SCOPE = "https://www.googleapis.com/auth/gmail.send"
+GMAIL_SEND_URL = "https://gmail.googleapis.com/gmail/v1/users/me/messages/send"
+GOOGLE_TOKEN_URI = "https://oauth2.googleapis.com/token"
+
+# Refresh the cached access token this many seconds before Google expires it.
+TOKEN_EXPIRY_MARGIN = 60
+
+
+def build_gmail_service(credentials_info: dict, subject: str):
+    """Build a synchronous Gmail API client from service account credentials.
+
+    Used by the logging handler, which sends from its own thread. Uses the
+    discovery document bundled with google-api-python-client, so no
+    discovery fetch or cache lookup happens. The credentials refresh their
+    access token on expiry, so the client can be kept for the process lifetime.
+    """
+    # Imported here: googleapiclient is slow to import and only the log handler needs it.
+    from google.oauth2 import service_account
+    from googleapiclient.discovery import build
+
     credentials = service_account.Credentials.from_service_account_info(
-        json.loads(settings.GMAIL_SERVICE_ACCOUNT_CREDENTIALS),
-        scopes=["https://www.googleapis.com/auth/gmail.send"],
-        subject=settings.FROM_ADDRESS,
+        credentials_info, scopes=[GMAIL_SEND_SCOPE], subject=subject,
+    )
+    return build(
+        "gmail", "v1", credentials=credentials,
+        static_discovery=True, cache_discovery=False,
     )
-    return build("gmail", "v1", credentials=credentials)
 
 
-def send_email(subject: str, sender: tuple | str, recipients: list[str], html_body: str):
-    """Send email via Gmail API."""
+# --- Async sender: Gmail REST endpoint over a pooled httpx client ---
+
+_client: httpx.AsyncClient | None = None
+_access_token: dict = {"token": None, "expires_at": 0.0}
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Return the shared AsyncClient, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(timeout=10)
+    return _client
+
+
+async def close_email_client():
+    """Close the shared AsyncClient (call on app shutdown / end of a command)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+@lru_cache(maxsize=1)
+def _service_account_info() -> dict:
+    return json.loads(get_settings().GMAIL_SERVICE_ACCOUNT_CREDENTIALS)
+
+
+def _token_assertion(info: dict, subject: str) -> str:
+    """Signed JWT for the service-account (domain-wide delegation) token grant."""
+    from google.auth import crypt, jwt
+
+    now = int(time.time())
+    payload = {
+        "iss": info["client_email"],
+        "sub": subject,
+        "scope": GMAIL_SEND_SCOPE,
+        "aud": info.get("token_uri", GOOGLE_TOKEN_URI),
+        "iat": now,
+        "exp": now + 3600,
+    }
+    # jwt.encode returns bytes; httpx would form-encode those as "b'...'"
+    return jwt.encode(crypt.RSASigner.from_service_account_info(info), payload).decode()
+
+
+async def _get_access_token(client: httpx.AsyncClient) -> str:
+    """Return a cached OAuth access token, exchanging a fresh assertion when it expires.
+
+    Concurrent callers that both see an expired token each fetch one; the
+    last one wins, which is harmless and cheaper than a lock across loops.
+    """
+    if _access_token["token"] and time.time() < _access_token["expires_at"]:
+        return _access_token["token"]
+
+    info = _service_account_info()
+    response = await client.post(
+        info.get("token_uri", GOOGLE_TOKEN_URI),
+        data={
+            "grant_type": "urn:ietf:params:oauth:grant-type:jwt-bearer",
+            "assertion": _token_assertion(info, get_settings().FROM_ADDRESS),
+        },
+    )
+    response.raise_for_status()
+    body = response.json()
+    _access_token["token"] = body["access_token"]
+    _access_token["expires_at"] = time.time() + body.get("expires_in", 3600) - TOKEN_EXPIRY_MARGIN
+    return _access_token["token"]
+
+
+async def _post_message(raw: str):
+    """POST a raw MIME message to Gmail, refreshing the token once on a 401."""
+    client = _get_client()
+    for attempt in range(2):
+        token = await _get_access_token(client)
+        response = await client.post(
+            GMAIL_SEND_URL,
+            json={"raw": raw},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        if response.status_code == 401 and attempt == 0:
+            _access_token["token"] = None
+            continue
+        response.raise_for_status()
+        return
+
+
+async def send_email(subject: str, sender: tuple | str, recipients: list[str], html_body: str):
+    """Send email via the Gmail REST API."""
     settings = get_settings()
     if settings.testing:
         logger.debug("Testing mode - email suppressed: %s to %s", subject, recipients)
         return
 
     try:
-        service = _get_gmail_service()
-
         from_addr = sender[1] if isinstance(sender, tuple) else sender
 
         mime = MIMEText(html_body, "html")
@@ -42,18 +144,16 @@ def send_email(subject: str, sender: tuple | str, recipients: list[str], html_bo
         mime["from"] = from_addr
 
         raw = base64.urlsafe_b64encode(mime.as_bytes()).decode()
-        raw_msg = {"raw": raw}
-
-        service.users().messages().send(userId="me", body=raw_msg).execute()
+        await _post_message(raw)
         logger.info("Email '%s' sent to %s", subject, recipients)
     except Exception as e:
         logger.error("Failed to send email to %s: %s", recipients, e)
 
 
-def _send_notification(subject: str, body: str, toaddr):
+async def _send_notification(subject: str, body: str, toaddr):
     """Send a notification email with standardised sender and recipient handling."""
     settings = get_settings()
-    send_email(
+    await send_email(
         subject=subject,
         sender=(settings.FROM_NAME, settings.FROM_ADDRESS),
         recipients=toaddr if isinstance(toaddr, list) else [toaddr],
@@ -61,14 +161,14 @@ def _send_notification(subject: str, body: str, toaddr):
     )
 
 
-def send_error_email(toaddr, error_msg):
+async def send_error_email(toaddr, error_msg):
     """Send developer email when an error has occurred."""
     settings = get_settings()
     body = f"<h1>{settings.APP_NAME}: Error</h1><p>{error_msg}</p>"
-    _send_notification(f"{settings.APP_NAME}: Error has occurred", body, toaddr)
+    await _send_notification(f"{settings.APP_NAME}: Error has occurred", body, toaddr)
 
 
-def send_missing_location_email(toaddr, error_msg, locations, postcodes):
+async def send_missing_location_email(toaddr, error_msg, locations, postcodes):
     """Send an alert email about bookings with missing location data."""
     settings = get_settings()
     body = (
@@ -76,12 +176,12 @@ def send_missing_location_email(toaddr, error_msg, locations, postcodes):
         f"<p>{error_msg}</p>"
         f"<p>Locations: {locations}, Postcodes: {postcodes}</p>"
     )
-    _send_notification(
+    await _send_notification(
         f"{settings.COMPANY_NAME}: Missing Location information!!", body, toaddr,
     )
 
 
-def send_updated_locations_email(toaddr, number_locations, updated, missing, postcodes):
+async def send_updated_locations_email(toaddr, number_locations, updated, missing, postcodes):
     """Send a summary email after a bulk location update run."""
     settings = get_settings()
     body = (
@@ -89,12 +189,12 @@ def send_updated_locations_email(toaddr, number_locations, updated, missing, pos
         f"<p>Total: {number_locations}, Updated: {updated}, "
         f"Missing: {missing}, Postcodes: {postcodes}</p>"
     )
-    _send_notification(
+    await _send_notification(
         f"{settings.APP_NAME}: Updated booking locations information!!", body, toaddr,
     )
 
 
-def send_completed_bookings_email(toaddr, bookings_count, n_active, tz_name):
+async def send_completed_bookings_email(toaddr, bookings_count, n_active, tz_name):
     """Send a summary email after marking bookings as completed."""
     settings = get_settings()
     body = (
@@ -102,6 +202,6 @@ def send_completed_bookings_email(toaddr, bookings_count, n_active, tz_name):
         f"<p>{bookings_count} bookings marked completed. "
         f"Active: {n_active}. Timezone: {tz_name}</p>"
     )
-    _send_notification(
+    await _send_notification(
         f"{settings.APP_NAME}: {bookings_count} bookings marked completed", body, toaddr,
     )
@@ -0,0 +1,72 @@
+"""Error notification digest: fingerprint errors, count repeats, summarise per window."""
+
+import threading
+from datetime import datetime, timezone
+
+
+class ErrorDigest:
+    """Thread-safe aggregation of errors keyed by (kind, where).
+
+    ``kind`` is usually the exception type and ``where`` the route or logger.
+    Repeats only bump a counter, so an incident that raises the same error a
+    thousand times becomes one line with a count. Distinct fingerprints beyond
+    ``max_entries`` are counted as overflow rather than stored.
+    """
+
+    def __init__(self, max_entries: int = 100):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: dict[tuple[str, str], dict] = {}
+        self._overflow = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def record(self, kind: str, where: str, message: str, detail: str | None = None):
+        """Count one occurrence of an error; ``detail`` (e.g. a traceback) is kept from the first."""
+        now = datetime.now(timezone.utc)
+        key = (kind, where)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry["count"] += 1
+                entry["last_seen"] = now
+                entry["message"] = message
+            elif len(self._entries) < self.max_entries:
+                self._entries[key] = {
+                    "kind": kind,
+                    "where": where,
+                    "message": message,
+                    "detail": detail,
+                    "count": 1,
+                    "first_seen": now,
+                    "last_seen": now,
+                }
+            else:
+                self._overflow += 1
+
+    def drain(self) -> tuple[list[dict], int]:
+        """Return (entries by descending count, overflow count) and reset the digest."""
+        with self._lock:
+            entries, self._entries = list(self._entries.values()), {}
+            overflow, self._overflow = self._overflow, 0
+        entries.sort(key=lambda e: e["count"], reverse=True)
+        return entries, overflow
+
+
+def format_digest(entries: list[dict], overflow: int = 0) -> str:
+    """Render drained digest entries as a plain-text email body."""
+    total = sum(e["count"] for e in entries) + overflow
+    lines = [f"{len(entries)} distinct errors, {total} occurrences", ""]
+    for e in entries:
+        lines.append(
+            f"[{e['count']}x] {e['kind']} on {e['where']} "
+            f"(first {e['first_seen']:%H:%M:%S}, last {e['last_seen']:%H:%M:%S} UTC): {e['message']}"
+        )
+    if overflow:
+        lines.append(f"... plus {overflow} further errors not itemised")
+    details = [e for e in entries if e["detail"]]
+    for e in details:
+        lines += ["", f"--- first {e['kind']} on {e['where']} ---", e["detail"]]
+    return "\n".join(lines)
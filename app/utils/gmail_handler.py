@@ -1,12 +1,16 @@
-"""Custom logging handler that sends error-level log entries via Gmail API."""
+"""Custom logging handlers that send error-level log entries via Gmail API."""
 
 import logging
+import logging.handlers
 import json
 import base64
+import queue
+import threading
+import time
 from email.mime.text import MIMEText
 
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
+from app.utils.email_service import build_gmail_service
+from app.utils.error_digest import ErrorDigest, format_digest
 
 
 class GmailOAuth2Handler(logging.Handler):
@@ -37,12 +41,7 @@ class GmailOAuth2Handler(logging.Handler):
 
     def _get_gmail_service(self):
         """Build and return an authenticated Gmail API service client."""
-        creds = service_account.Credentials.from_service_account_info(
-            self.credentials_info,
-            scopes=["https://www.googleapis.com/auth/gmail.send"],
-            subject=self.impersonate_user,
-        )
-        return build("gmail", "v1", credentials=creds)
+        return build_gmail_service(self.credentials_info, self.impersonate_user)
 
     def emit(self, record):
         """Format the log record and send it as an email."""
@@ -63,3 +62,136 @@ class GmailOAuth2Handler(logging.Handler):
 
         except Exception:
             self.handleError(record)
+
+
+_STOP = object()
+
+
+class QueuedGmailHandler(logging.handlers.QueueHandler):
+    """Non-blocking, digesting front for a mail handler.
+
+    ``emit`` only puts the record on a bounded in-memory queue; a daemon
+    thread drains it into ``target`` (normally a GmailOAuth2Handler), so a
+    ``logger.error`` on the event loop never waits for Google.
+
+    With a ``digest_window`` the listener groups records by exception type
+    and route (the ``route`` extra, else the logging function). The first
+    record of a group is sent at once, so a new failure alerts without
+    waiting for the window. Repeats within ``digest_window`` of the last
+    alert for that group are counted and sent as one digest email per
+    window. Records dropped because the queue was full are counted and
+    reported too. ``close()`` flushes whatever is pending.
+    """
+
+    def __init__(
+        self,
+        target: logging.Handler,
+        maxsize: int = 100,
+        level=logging.ERROR,
+        digest_window: float = 0.0,
+    ):
+        super().__init__(queue.Queue(maxsize))
+        self.setLevel(level)
+        self.target = target
+        self.digest_window = digest_window
+        self.digest = ErrorDigest()
+        self._alerted: dict[tuple[str, str], float] = {}  # fingerprint -> monotonic time of last alert
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._drain, name="gmail-log-handler", daemon=True,
+        )
+        self._thread.start()
+
+    def prepare(self, record):
+        """Keep the exception type, which the base class discards with exc_info."""
+        exc_type = record.exc_info[0].__name__ if record.exc_info and record.exc_info[0] else None
+        record = super().prepare(record)
+        record.exc_type = exc_type
+        return record
+
+    def enqueue(self, record):
+        """Queue the record without blocking; count it as dropped if the queue is full."""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+    def _take_dropped(self) -> int:
+        with self._dropped_lock:
+            n, self.dropped = self.dropped, 0
+        return n
+
+    def _summary(self, msg: str, *args) -> logging.LogRecord:
+        return logging.LogRecord(__name__, logging.ERROR, __file__, 0, msg, args or None, None)
+
+    def _fingerprint(self, record) -> tuple[str, str]:
+        kind = getattr(record, "exc_type", None) or record.name
+        where = getattr(record, "route", None) or f"{record.module}.{record.funcName}"
+        return kind, where
+
+    def _alert_now(self, key: tuple[str, str]) -> bool:
+        """True for the first record of a fingerprint not alerted within the window."""
+        now = time.monotonic()
+        self._alerted = {k: t for k, t in self._alerted.items() if now - t < self.digest_window}
+        if key in self._alerted:
+            return False
+        self._alerted[key] = now
+        return True
+
+    def _add_to_digest(self, key: tuple[str, str], record):
+        # prepare() has already folded any traceback into the message
+        text = record.getMessage()
+        self.digest.record(*key, text.split("\n", 1)[0], text if "\n" in text else None)
+
+    def _flush_digest(self):
+        entries, overflow = self.digest.drain()
+        overflow += self._take_dropped()
+        if entries or overflow:
+            self.target.handle(self._summary(format_digest(entries, overflow)))
+
+    def _drain(self):
+        """Listener thread: hand queued records (or digests of them) to the target."""
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                record = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                record = None
+            try:
+                if record is _STOP:
+                    self._flush_digest()
+                    return
+                if record is not None:
+                    key = self._fingerprint(record) if self.digest_window > 0 else None
+                    if key is None or self._alert_now(key):
+                        self.target.handle(record)
+                    else:
+                        self._add_to_digest(key, record)
+                        if deadline is None:
+                            deadline = time.monotonic() + self.digest_window
+                if deadline is not None and time.monotonic() >= deadline:
+                    self._flush_digest()
+                    deadline = None
+                elif self.digest_window <= 0 and (n := self._take_dropped()):
+                    self.target.handle(self._summary(
+                        "%d further error log records were dropped (email queue full)", n,
+                    ))
+            finally:
+                if record is not None:
+                    self.queue.task_done()
+
+    def close(self, timeout: float = 10.0):
+        """Send everything already queued, then stop the listener thread."""
+        if not self._closed:
+            self._closed = True
+            try:
+                self.queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                pass
+            self._thread.join(timeout)
+            self.target.close()
+        super().close()
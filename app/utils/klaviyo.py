@@ -1,10 +1,15 @@
 """Klaviyo CRM integration for notifying new house and bond customers."""
 
+import hashlib
+import json
 import logging
 import re
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from enum import StrEnum
 
 import httpx
+from cachetools import TTLCache
 from tenacity import (
     retry,
     stop_after_attempt,
@@ -14,9 +19,78 @@ from tenacity import (
 )
 
 from app.core.config import get_settings
+from app.utils.rate_limit import TokenBucket
 
 logger = logging.getLogger(__name__)
 
+# Lower-cased emails known to have a Klaviyo profile -> profile_id (None if unknown).
+known_profiles: TTLCache = TTLCache(
+    maxsize=get_settings().KLAVIYO_PROFILE_CACHE_SIZE,
+    ttl=get_settings().KLAVIYO_PROFILE_CACHE_TTL,
+)
+
+# (email, category, payload fingerprint) of house/bond notifications already sent.
+sent_notifications: TTLCache = TTLCache(
+    maxsize=get_settings().KLAVIYO_DEDUPE_CACHE_SIZE,
+    ttl=max(get_settings().KLAVIYO_DEDUPE_WINDOW_SECONDS, 1),
+)
+
+# One bucket per process so concurrent dispatches share the allowance.
+rate_limiter = TokenBucket(
+    rate=get_settings().KLAVIYO_RATE_PER_SECOND,
+    capacity=get_settings().KLAVIYO_RATE_BURST,
+)
+
+_backoff = wait_exponential(min=1, max=10)
+
+
+class KlaviyoRateLimited(Exception):
+    """Klaviyo answered 429; `retry_after` is the requested pause in seconds."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Klaviyo rate limited; retry after {retry_after:g}s")
+        self.retry_after = retry_after
+
+
+class KlaviyoError(Exception):
+    """Klaviyo answered with a status other than the one the call expects."""
+
+    def __init__(self, method: str, path: str, status_code: int, body: str):
+        super().__init__(f"Klaviyo {method.upper()} {path} failed ({status_code}): {body}")
+        self.status_code = status_code
+
+
+class KlaviyoServerError(KlaviyoError):
+    """A 5xx: worth retrying later."""
+
+
+class KlaviyoRejected(KlaviyoError):
+    """A 4xx other than 429: Klaviyo refused the request, so sending it again will not help."""
+
+
+def _retry_after_seconds(value, default: float = 1.0) -> float:
+    """Parse a Retry-After header (delta-seconds or HTTP-date) into seconds."""
+    if not value:
+        return default
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def _wait_before_retry(retry_state):
+    """No extra wait after a 429 (the shared limiter is paused); otherwise back off."""
+    if isinstance(retry_state.outcome.exception(), KlaviyoRateLimited):
+        return 0
+    return _backoff(retry_state)
+
 
 class Klaviyo:
     """HTTP client for the Klaviyo customer notification API."""
@@ -31,43 +105,49 @@ class Klaviyo:
 
     def _get_payload(self, data):
         """Build the Klaviyo API payload from booking data."""
-        return {
-            "email": data.get("email"),
-            "first_name": data.get("first_name"),
-            "phone": _normalize_phone(data.get("phone")),
-            "postcode": data.get("postcode", data.get("zip", "")),
-            "quote": _clean_price(data.get("final_price")),
-        }
+        return _build_payload(data)
 
     @retry(
         stop=stop_after_attempt(3),
-        wait=wait_exponential(min=1, max=10),
-        retry=retry_if_exception_type((httpx.RequestError, httpx.HTTPStatusError)),
+        wait=_wait_before_retry,
+        retry=retry_if_exception_type((httpx.RequestError, KlaviyoRateLimited, KlaviyoServerError)),
         before_sleep=before_sleep_log(logger, logging.WARNING),
     )
     async def _request(self, method, path, *, json=None, params=None, expected_status=200):
-        """Send an HTTP request with retry and standardised error logging."""
+        """Send a rate-limited HTTP request with retry and standardised error logging.
+
+        Every request takes a token from the shared bucket first. A 429 pauses
+        the bucket for the Retry-After period, so queued requests wait it out
+        too, and the request is retried once the pause ends.
+
+        Any other unexpected status raises: KlaviyoServerError for a 5xx
+        (retried here, then left to the outbox's retries), KlaviyoRejected for
+        a 4xx, which the outbox records as failed without retrying.
+        """
+        await rate_limiter.acquire()
         async with httpx.AsyncClient(timeout=10) as client:
             res = await getattr(client, method)(
                 f"{self.url}{path}", headers=self.headers, json=json, params=params,
             )
+        if res.status_code == 429:
+            retry_after = _retry_after_seconds(res.headers.get("Retry-After"))
+            rate_limiter.pause(retry_after)
+            raise KlaviyoRateLimited(retry_after)
         if res.status_code != expected_status:
-            logger.error(
-                "Klaviyo %s %s failed (%d): %s",
-                method.upper(), path, res.status_code, res.text,
-            )
+            error = KlaviyoServerError if res.status_code >= 500 else KlaviyoRejected
+            raise error(method, path, res.status_code, res.text)
         return res
 
     async def post_home_data(self, data):
         """Send a new house-clean customer to Klaviyo."""
         payload = self._get_payload(data)
         logger.debug("Klaviyo house POST: payload=%s", payload)
-        await self._request("post", "/house/new", json=payload, expected_status=201)
+        return await self._request("post", "/house/new", json=payload, expected_status=201)
 
     async def post_bond_data(self, data):
         """Send a new bond-clean customer to Klaviyo."""
         payload = self._get_payload(data)
-        await self._request("post", "/bond/new", json=payload, expected_status=201)
+        return await self._request("post", "/bond/new", json=payload, expected_status=201)
 
     async def create_klaviyo_profile(self, data):
         """Create a new Klaviyo profile."""
@@ -75,7 +155,9 @@ class Klaviyo:
             logger.debug("Klaviyo disabled — skipping profile creation for %s", data.get("email"))
             return None
         res = await self._request("post", "/profile/new", json=data, expected_status=201)
-        return res.json()
+        body = res.json()
+        remember_profile(data.get("email"), body.get("profile_id") if isinstance(body, dict) else None)
+        return body
 
     async def update_klaviyo_profile(self, data):
         """Update an existing Klaviyo profile."""
@@ -87,12 +169,33 @@ class Klaviyo:
 
     async def check_profile(self, email):
         """Check if an email exists as a Klaviyo profile."""
-        res = await self._request("get", "/profile/check", params={"email": email})
-        if res.status_code != 200:
+        try:
+            res = await self._request("get", "/profile/check", params={"email": email})
+        except KlaviyoRejected:
             return {"exists": False, "profile_id": None}
         return res.json()
 
 
+def _build_payload(data):
+    """Build the house/bond notification payload from booking data."""
+    return {
+        "email": data.get("email"),
+        "first_name": data.get("first_name"),
+        "phone": _normalize_phone(data.get("phone")),
+        "postcode": data.get("postcode", data.get("zip", "")),
+        "quote": _clean_price(data.get("final_price")),
+    }
+
+
+def _notification_key(service_category, data):
+    """Dedupe key: (email, category, fingerprint of the payload Klaviyo would receive)."""
+    payload = _build_payload(data)
+    fingerprint = hashlib.sha1(
+        json.dumps(payload, sort_keys=True, default=str).encode()
+    ).hexdigest()
+    return ((data.get("email") or "").strip().lower(), service_category, fingerprint)
+
+
 def _normalize_phone(phone):
     """Normalize an Australian phone number to E.164 format (+61...)."""
     if not phone:
@@ -134,36 +237,74 @@ class WebhookRoute(StrEnum):
     CUSTOMER_UPDATED = "customer_updated"
 
 
+# Booking routes that notify Klaviyo of a new customer, for these categories
+NOTIFY_ROUTES = frozenset({
+    WebhookRoute.BOOKING_NEW,
+    WebhookRoute.BOOKING_UPDATED,
+    WebhookRoute.BOOKING_RESTORED,
+    WebhookRoute.BOOKING_COMPLETED,
+    WebhookRoute.BOOKING_CANCELLATION,
+})
+NOTIFY_CATEGORIES = ("Bond Clean", "House Clean")
+
+
 async def notify_klaviyo(service_category, data):
-    """Dispatch a new-customer notification to the appropriate Klaviyo list."""
-    if not get_settings().KLAVIYO_ENABLED:
+    """Dispatch a new-customer notification to the appropriate Klaviyo list.
+
+    A booking's lifecycle (new, updated, completed, ...) repeats the same
+    notification; an identical one sent within KLAVIYO_DEDUPE_WINDOW_SECONDS
+    is suppressed. Failures propagate so the outbox dispatcher can record and
+    retry them, and are not remembered as sent.
+    """
+    settings = get_settings()
+    if not settings.KLAVIYO_ENABLED:
         logger.debug("Klaviyo disabled — skipping notification for %s", data.get("email"))
         return
-    try:
-        k = Klaviyo()
-        if service_category == "House Clean":
-            await k.post_home_data(data)
-        else:
-            await k.post_bond_data(data)
-    except Exception as e:
-        logger.error("Klaviyo notification failed for %s: %s", data.get("email"), e)
+
+    dedupe = settings.KLAVIYO_DEDUPE_WINDOW_SECONDS > 0
+    key = _notification_key(service_category, data)
+    if dedupe and key in sent_notifications:
+        logger.debug(
+            "Klaviyo %s notification for %s already sent — skipping",
+            service_category, data.get("email"),
+        )
+        return
+
+    k = Klaviyo()
+    if service_category == "House Clean":
+        res = await k.post_home_data(data)
+    else:
+        res = await k.post_bond_data(data)
+
+    # Only a confirmed 2xx counts as sent; anything else may be retried
+    if dedupe and 200 <= res.status_code < 300:
+        sent_notifications[key] = True
+
+
+def klaviyo_handles(data, route: WebhookRoute) -> bool:
+    """True if process_with_klaviyo would act on this webhook.
+
+    Webhooks it would ignore are not queued in the outbox at all.
+    """
+    if not isinstance(data, dict):
+        return False
+    if route in NOTIFY_ROUTES:
+        return data.get("service_category") in NOTIFY_CATEGORIES
+    if route in (WebhookRoute.CUSTOMER_NEW, WebhookRoute.CUSTOMER_UPDATED):
+        return bool(data.get("email"))
+    return False
 
 
 async def process_with_klaviyo(data, route: WebhookRoute):
-    """Central Klaviyo hook called by all POST routes via BackgroundTasks.
+    """Central Klaviyo hook called by the outbox dispatcher for each queued row.
 
-    Only booking_new and booking_updated routes trigger notifications,
-    and only when the booking is from a new customer in a qualifying category.
+    Only the NOTIFY_ROUTES booking routes trigger notifications, and only for
+    bookings in a qualifying category; customer routes create or update
+    profiles. See klaviyo_handles().
     """
     if not isinstance(data, dict):
         return
-    if route in (
-            WebhookRoute.BOOKING_NEW,
-            WebhookRoute.BOOKING_UPDATED,
-            WebhookRoute.BOOKING_RESTORED,
-            WebhookRoute.BOOKING_COMPLETED,
-            WebhookRoute.BOOKING_CANCELLATION
-        ):
+    if route in NOTIFY_ROUTES:
         """
         BOOKING_NEW may conain a new customer.  The other routes
         should refer to existing customer.  HOWEVER, when building
@@ -171,7 +312,7 @@ async def process_with_klaviyo(data, route: WebhookRoute):
         customer in the database or in the profile, so we fix
         that here"""
         service_category = data.get("service_category")
-        if service_category in ("Bond Clean", "House Clean"):
+        if service_category in NOTIFY_CATEGORIES:
             logger.debug(
                 "New customer: send %s to Klaviyo with %s",
                 data.get("email"), service_category,
@@ -192,17 +333,48 @@ async def process_with_klaviyo(data, route: WebhookRoute):
             await k.update_klaviyo_profile(data)
 
 
+def _profile_key(email):
+    return email.strip().lower()
+
+
+def remember_profile(email, profile_id=None):
+    """Record an email as having a Klaviyo profile."""
+    if email:
+        known_profiles[_profile_key(email)] = profile_id
+
+
+def seed_known_profiles(emails) -> int:
+    """Pre-load known profiles (e.g. from our customer table). Returns the count added."""
+    count = 0
+    for email in emails:
+        if email:
+            known_profiles.setdefault(_profile_key(email), None)
+            count += 1
+    return count
+
+
 async def check_klaviyo_profile(email):
     """Check if an email exists as a Klaviyo profile.
 
+    Known profiles are answered from the cache; only unknown emails cost a
+    GET /profile/check. Negative results are never cached.
+
     Returns {"exists": bool, "profile_id": str | None}.
     """
     settings = get_settings()
     if not settings.KLAVIYO_ENABLED:
         return {"exists": False, "profile_id": None}
 
+    key = _profile_key(email)
+    if key in known_profiles:
+        return {"exists": True, "profile_id": known_profiles[key]}
+
     try:
-        return await Klaviyo().check_profile(email)
+        res = await Klaviyo().check_profile(email)
     except Exception as e:
         logger.error("Klaviyo profile check failed for %s: %s", email, e)
         return {"exists": False, "profile_id": None}
+
+    if res.get("exists"):
+        remember_profile(email, res.get("profile_id"))
+    return res
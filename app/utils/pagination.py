@@ -0,0 +1,30 @@
+"""Opaque keyset cursors over (service_date, booking_id)."""
+
+import base64
+import json
+from datetime import date
+
+from fastapi import HTTPException
+
+
+def encode_cursor(service_date: date | None, booking_id: int) -> str:
+    """Encode the sort key of the last row on a page as an opaque token."""
+    key = [service_date.isoformat() if service_date else None, booking_id]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[date | None, int]:
+    """Decode a token from encode_cursor; malformed tokens are a 400."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        service_date, booking_id = json.loads(base64.urlsafe_b64decode(padded))
+        return (date.fromisoformat(service_date) if service_date else None, int(booking_id))
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from e
+
+
+def page_size(limit: int | None, cursor: str | None, default: int, maximum: int) -> int | None:
+    """Effective page size: None (unpaged) unless limit or cursor is given; never above maximum."""
+    if limit is None and cursor is None:
+        return None
+    return min(limit or default, maximum)
@@ -0,0 +1,52 @@
+"""Async token-bucket rate limiter for outbound API calls."""
+
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Token bucket that queues callers in FIFO order when it runs dry.
+
+    ``rate`` tokens are added per second up to ``capacity`` (the burst size).
+    ``pause()`` stops handing out tokens for a while, so a server's
+    Retry-After applies to every caller sharing the bucket, not just the one
+    that was throttled. A rate of 0 disables limiting.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _delay(self) -> float:
+        """Seconds until a token can be taken (0 if one is available now)."""
+        now = time.monotonic()
+        if now < self._paused_until:
+            return self._paused_until - now
+        self._refill(now)
+        if self._tokens >= 1:
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    async def acquire(self):
+        """Wait for and take one token."""
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while (delay := self._delay()) > 0:
+                await asyncio.sleep(delay)
+            self._tokens -= 1
+
+    def pause(self, seconds: float):
+        """Hand out no tokens for `seconds`; the bucket restarts empty afterwards."""
+        now = time.monotonic()
+        self._paused_until = max(self._paused_until, now + seconds)
+        self._tokens = 0.0
+        self._updated = self._paused_until
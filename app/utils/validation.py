@@ -6,8 +6,6 @@ import logging
 from datetime import datetime, date
 from typing import Any
 
-import dateutil.parser
-
 logger = logging.getLogger(__name__)
 
 
@@ -48,6 +46,8 @@ def parse_datetime(val: str | None) -> datetime | None:
         return None
     try:
         if "Z" in val:
+            import dateutil.parser  # only this branch needs it; keeps module import light
+
             return dateutil.parser.isoparse(val)
         elif "am" in val or "pm" in val:
             return datetime.strptime(val, "%d/%m/%Y %I:%M%p")
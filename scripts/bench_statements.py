@@ -0,0 +1,154 @@
+"""Benchmark per-call statement overhead of the hot DAO queries.
+
+Every ``db.execute`` needs the statement and its SQLAlchemy cache key before
+the compiled-SQL cache can be consulted. This script times that Python-side
+work for each hot query twice: building a fresh ``select()`` per call (how
+the DAOs used to do it) and going through the DAO method, which reuses a
+statement built once with ``bindparam()`` placeholders. No database
+connection is needed.
+
+Usage:
+    python scripts/bench_statements.py [--calls 20000]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import and_, func, tuple_  # noqa: E402
+from sqlmodel import select  # noqa: E402
+
+from app.daos.booking import COMPLETED_FIELDS, EMAIL_WEEK_FIELDS, SEARCH_FIELDS, booking_dao  # noqa: E402
+from app.daos.customer import customer_dao  # noqa: E402
+from app.models.booking import Booking  # noqa: E402
+from app.models.customer import Customer  # noqa: E402
+
+
+def _columns(fields):
+    return [getattr(Booking, f) for f in fields]
+
+
+def plain_by_booking_id(booking_id):
+    return select(Booking).where(Booking.booking_id == booking_id)
+
+
+def plain_by_customer_id(customer_id):
+    return select(Customer).where(Customer.customer_id == customer_id)
+
+
+def plain_date_range(category, status, start, end, limit, after):
+    sort_date = func.coalesce(Booking.service_date, date.min)
+    return (
+        select(*_columns(SEARCH_FIELDS))
+        .where(Booking.service_category == category, Booking.booking_status == status)
+        .where(and_(Booking.created_at >= start, Booking.created_at <= end))
+        .where(tuple_(sort_date, Booking.booking_id) > tuple_(after[0], after[1]))
+        .order_by(sort_date, Booking.booking_id)
+        .limit(limit)
+    )
+
+
+def plain_completed(from_date, to_date):
+    return (
+        select(*_columns(COMPLETED_FIELDS))
+        .where(Booking.booking_status == "COMPLETED")
+        .where(and_(Booking.service_date >= from_date, Booking.service_date <= to_date))
+    )
+
+
+def plain_email_week(email, start, end):
+    return (
+        select(*_columns(EMAIL_WEEK_FIELDS))
+        .where(Booking.email == email)
+        .where(and_(Booking.service_date >= start, Booking.service_date <= end))
+    )
+
+
+class _Capture:
+    """Stands in for AsyncSession: keeps the statement a DAO method would execute."""
+
+    def __init__(self):
+        self.statement = None
+
+    async def execute(self, statement, params=None):
+        self.statement = statement
+        return self
+
+    def scalars(self):
+        return self
+
+    def first(self):
+        return None
+
+    def all(self):
+        return []
+
+
+def _dao_statement(method, *args, **kwargs):
+    db = _Capture()
+    coro = method(db, *args, **kwargs)
+    try:
+        coro.send(None)
+    except StopIteration:
+        pass
+    return db.statement
+
+
+CASES = [
+    (
+        "get_by_booking_id",
+        lambda i: plain_by_booking_id(i),
+        lambda i: _dao_statement(booking_dao.get_by_booking_id, i),
+    ),
+    (
+        "get_by_customer_id",
+        lambda i: plain_by_customer_id(i),
+        lambda i: _dao_statement(customer_dao.get_by_customer_id, i),
+    ),
+    (
+        "get_by_date_range (paged)",
+        lambda i: plain_date_range("House Clean", "COMPLETED", "2024-01-01", "2024-01-31", 101, (date(2024, 1, 2), i)),
+        lambda i: _dao_statement(
+            booking_dao.get_by_date_range, "House Clean", "COMPLETED", "2024-01-01", "2024-01-31",
+            limit=101, after=(date(2024, 1, 2), i),
+        ),
+    ),
+    (
+        "completed_bookings_by_service_date",
+        lambda i: plain_completed(date(2024, 1, 1), date(2024, 1, 31)),
+        lambda i: _dao_statement(booking_dao.completed_bookings_by_service_date, date(2024, 1, 1), date(2024, 1, 31)),
+    ),
+    (
+        "get_by_booking_email_service_date_range",
+        lambda i: plain_email_week(f"c{i}@example.com", "2024-02-12", "2024-02-18"),
+        lambda i: _dao_statement(booking_dao.get_by_booking_email_service_date_range, f"c{i}@example.com", "2024-02-15"),
+    ),
+]
+
+
+def per_call_us(build, calls: int) -> float:
+    """Microseconds to build one statement and derive its cache key."""
+    counter = iter(range(10**9))
+    build(0)._generate_cache_key()  # warm the lambda / compiled caches
+    seconds = timeit.timeit(lambda: build(next(counter))._generate_cache_key(), number=calls)
+    return seconds / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'query':<42} {'select() us':>12} {'cached us':>10} {'speedup':>8}")
+    for name, plain, cached in CASES:
+        before = per_call_us(plain, args.calls)
+        after = per_call_us(cached, args.calls)
+        print(f"{name:<42} {before:>12.1f} {after:>10.1f} {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
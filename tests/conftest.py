@@ -27,6 +27,10 @@ os.environ.setdefault("FROM_ADDRESS", "noreply@example.com")
 os.environ.setdefault("FROM_NAME", "Test App")
 os.environ.setdefault("COMPANY_NAME", "Test Company")
 os.environ.setdefault("APP_NAME", "TestApp")
+# Search results and booking documents are cached per process; tests opt in
+# with their own cache instances.
+os.environ.setdefault("SEARCH_CACHE_TTL_SECONDS", "0")
+os.environ.setdefault("BOOKING_CACHE_TTL_SECONDS", "0")
 
 # Clear the lru_cache so fresh settings are built with the env vars above.
 from app.core.config import get_settings  # noqa: E402
@@ -59,12 +63,12 @@ def mock_db_session():
 def client(mock_db_session):
     """
     Starlette TestClient with:
-    - get_db overridden to yield the mock AsyncSession
+    - get_db and get_read_db overridden to yield the mock AsyncSession
     - verify_api_key overridden to accept the test key without a real DB check
-    - app.main.engine patched so the lifespan table-creation step is a no-op
+    - app.main.engine (and read_engine) patched so the lifespan table-creation step is a no-op
     """
     from app.main import app
-    from app.core.database import get_db
+    from app.core.database import get_db, get_read_db
     from app.core.auth import verify_api_key
 
     async def override_get_db():
@@ -76,6 +80,7 @@ def client(mock_db_session):
         )
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     app.dependency_overrides[verify_api_key] = override_verify_api_key
 
     # Patch the engine used in the lifespan to avoid a real DB connection.
@@ -90,7 +95,7 @@ def client(mock_db_session):
     mock_engine.begin = _mock_begin
     mock_engine.dispose = AsyncMock()
 
-    with patch("app.main.engine", mock_engine):
+    with patch("app.main.engine", mock_engine), patch("app.main.read_engine", mock_engine):
         with TestClient(app) as c:
             yield c
 
@@ -0,0 +1,96 @@
+"""Tests for app/services/booking_cache.py — booking document cache and ETags."""
+
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.services.booking_cache import BookingDocCache, booking_etag, etag_matches
+from app.services.bookings import get_booking_document, update_table
+
+
+def _doc(updated_at="2024-02-15T10:00:00+10:00", **extra):
+    return {"booking_id": 1, "updated_at": updated_at, **extra}
+
+
+class TestEtag:
+    def test_changes_with_updated_at(self):
+        assert booking_etag(_doc()) != booking_etag(_doc("2024-02-16T10:00:00+10:00"))
+
+    def test_stable_for_same_content(self):
+        assert booking_etag(_doc(name="a")) == booking_etag(_doc(name="a"))
+
+    def test_changes_with_content_when_updated_at_does_not(self):
+        # app-set fields can change without a new updated_at
+        assert booking_etag(_doc(booking_status="NOT_COMPLETE")) != booking_etag(_doc(booking_status="CANCELLED"))
+        assert booking_etag(_doc(location="Sydney")) != booking_etag(_doc(location="Newcastle"))
+
+    def test_without_updated_at_uses_content(self):
+        assert booking_etag(_doc(None, name="a")) != booking_etag(_doc(None, name="b"))
+
+    def test_if_none_match_parsing(self):
+        assert etag_matches('"x", W/"abc"', '"abc"')
+        assert etag_matches("*", '"abc"')
+        assert not etag_matches('"x"', '"abc"')
+        assert not etag_matches(None, '"abc"')
+
+
+class TestBookingDocument:
+    def _patch_cache(self):
+        return patch("app.services.bookings.booking_doc_cache", BookingDocCache(maxsize=8, ttl=60))
+
+    def _patch_dao(self):
+        row = MagicMock()
+        row.model_dump.return_value = _doc()
+        return patch(
+            "app.services.bookings.booking_dao.get_by_booking_id",
+            new_callable=AsyncMock,
+            return_value=row,
+        )
+
+    async def test_second_read_skips_database(self):
+        db = AsyncMock()
+        with self._patch_cache(), self._patch_dao() as mock_get:
+            first = await get_booking_document(db, 1)
+            second = await get_booking_document(db, 1)
+        assert first == second
+        mock_get.assert_awaited_once()
+
+    async def test_webhook_write_invalidates(self):
+        db = AsyncMock()
+        with (
+            self._patch_cache(),
+            self._patch_dao() as mock_get,
+            patch("app.services.bookings.booking_dao.create_update_booking", new_callable=AsyncMock),
+            patch("app.services.bookings.customer_dao.create_or_update_customer", new_callable=AsyncMock),
+        ):
+            await get_booking_document(db, 1)
+            await update_table({"id": "1", "customer": {}}, db)
+            await get_booking_document(db, 1)
+        assert mock_get.await_count == 2
+
+    async def test_read_just_after_a_write_is_not_stored(self):
+        db = AsyncMock()
+        cache = BookingDocCache(maxsize=8, ttl=60, write_window=5)
+        with patch("app.services.bookings.booking_doc_cache", cache), self._patch_dao() as mock_get:
+            cache.invalidate(1)
+            # served from the (possibly lagging) replica, so not kept
+            await get_booking_document(db, 1)
+            await get_booking_document(db, 1)
+            assert mock_get.await_count == 2
+            with patch("app.services.booking_cache.time.monotonic", return_value=time.monotonic() + 6):
+                await get_booking_document(db, 1)
+            await get_booking_document(db, 1)
+        assert mock_get.await_count == 3
+
+    async def test_missing_booking_is_not_cached(self):
+        db = AsyncMock()
+        with (
+            self._patch_cache(),
+            patch(
+                "app.services.bookings.booking_dao.get_by_booking_id",
+                new_callable=AsyncMock,
+                return_value=None,
+            ) as mock_get,
+        ):
+            assert await get_booking_document(db, 1) is None
+            assert await get_booking_document(db, 1) is None
+        assert mock_get.await_count == 2
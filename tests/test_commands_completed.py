@@ -199,17 +199,17 @@ class TestCompleteBookingsToday:
                 ),
             ),
             patch(
-                "app.commands.completed.complete_bookings_today.asyncio.to_thread",
+                "app.commands.completed.complete_bookings_today.send_completed_bookings_email",
                 new_callable=AsyncMock,
-            ) as mock_to_thread,
+            ) as mock_send,
         ):
             from app.commands.completed.complete_bookings_today import main
 
             await main()
 
         mock_b.complete.assert_not_called()
-        call_args = mock_to_thread.call_args[0]
-        _fn, _toaddr, completed_count, tz_count, _tz = call_args
+        call_args = mock_send.call_args[0]
+        _toaddr, completed_count, tz_count, _tz = call_args
         assert completed_count == 0
         assert tz_count == 0
 
@@ -235,16 +235,16 @@ class TestCompleteBookingsToday:
                 ),
             ),
             patch(
-                "app.commands.completed.complete_bookings_today.asyncio.to_thread",
+                "app.commands.completed.complete_bookings_today.send_completed_bookings_email",
                 new_callable=AsyncMock,
-            ) as mock_to_thread,
+            ) as mock_send,
         ):
             from app.commands.completed.complete_bookings_today import main
 
             await main()
 
-        call_args = mock_to_thread.call_args[0]
-        _fn, _toaddr, completed_count, tz_count, _tz = call_args
+        call_args = mock_send.call_args[0]
+        _toaddr, completed_count, tz_count, _tz = call_args
         assert tz_count == 3   # len(booking_ids), NOT 204
         assert completed_count == 3
 
@@ -270,17 +270,17 @@ class TestCompleteBookingsToday:
                 ),
             ),
             patch(
-                "app.commands.completed.complete_bookings_today.asyncio.to_thread",
+                "app.commands.completed.complete_bookings_today.send_completed_bookings_email",
                 new_callable=AsyncMock,
-            ) as mock_to_thread,
+            ) as mock_send,
         ):
             from app.commands.completed.complete_bookings_today import main
 
             await main()
 
         assert mock_b.complete.call_count == 4
-        call_args = mock_to_thread.call_args[0]
-        _fn, _toaddr, completed_count, tz_count, _tz = call_args
+        call_args = mock_send.call_args[0]
+        _toaddr, completed_count, tz_count, _tz = call_args
         assert completed_count == 4
         assert tz_count == 4
 
@@ -307,16 +307,16 @@ class TestCompleteBookingsToday:
                 ),
             ),
             patch(
-                "app.commands.completed.complete_bookings_today.asyncio.to_thread",
+                "app.commands.completed.complete_bookings_today.send_completed_bookings_email",
                 new_callable=AsyncMock,
-            ) as mock_to_thread,
+            ) as mock_send,
         ):
             from app.commands.completed.complete_bookings_today import main
 
             await main()
 
-        call_args = mock_to_thread.call_args[0]
-        _fn, _toaddr, completed_count, tz_count, tz_name = call_args
+        call_args = mock_send.call_args[0]
+        _toaddr, completed_count, tz_count, tz_name = call_args
         assert completed_count == 2
         assert tz_count == 3
         assert tz_name == "ACST"
@@ -340,16 +340,16 @@ class TestCompleteBookingsToday:
                 ),
             ),
             patch(
-                "app.commands.completed.complete_bookings_today.asyncio.to_thread",
+                "app.commands.completed.complete_bookings_today.send_completed_bookings_email",
                 new_callable=AsyncMock,
-            ) as mock_to_thread,
+            ) as mock_send,
         ):
             from app.commands.completed.complete_bookings_today import main
 
             await main()
 
-        call_args = mock_to_thread.call_args[0]
-        _fn, toaddr = call_args[0], call_args[1]
+        call_args = mock_send.call_args[0]
+        toaddr = call_args[0]
         assert toaddr == "support@example.com"
 
     async def test_complete_called_for_each_booking_id(self):
@@ -374,7 +374,7 @@ class TestCompleteBookingsToday:
                 ),
             ),
             patch(
-                "app.commands.completed.complete_bookings_today.asyncio.to_thread",
+                "app.commands.completed.complete_bookings_today.send_completed_bookings_email",
                 new_callable=AsyncMock,
             ),
         ):
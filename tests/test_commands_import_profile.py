@@ -0,0 +1,41 @@
+"""Tests for app/commands/import_profile.py and the lazy-import guarantees it reports on."""
+
+import subprocess
+import sys
+
+import pytest
+
+from app.commands.import_profile import parse_importtime
+
+SAMPLE = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:      2305 |     419623 |         fastapi.params
+import time:     27648 |    2001055 | app.main
+"""
+
+
+class TestParseImporttime:
+    def test_parses_rows_and_skips_header(self):
+        assert parse_importtime(SAMPLE) == [
+            ("_io", 120, 120),
+            ("fastapi.params", 2305, 419623),
+            ("app.main", 27648, 2001055),
+        ]
+
+    def test_ignores_unrelated_lines(self):
+        assert parse_importtime("Traceback (most recent call last):\n") == []
+
+
+class TestLazyImports:
+    @pytest.mark.parametrize(
+        "module",
+        ["app.commands.completed.complete_bookings_today", "app.core.logging_config"],
+    )
+    def test_google_and_dateutil_not_imported_at_load(self, module):
+        code = (
+            f"import sys, {module}; "
+            "print(sorted(m for m in ('googleapiclient', 'google.auth', 'dateutil.parser') if m in sys.modules))"
+        )
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        assert out.stdout.strip() == "[]"
@@ -0,0 +1,196 @@
+"""Tests for app/commands/klaviyo/dispatch_outbox.py — batch dispatch and run loop."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.commands.klaviyo.dispatch_outbox import dispatch_batch, run
+from app.models.klaviyo_outbox import KlaviyoOutbox, OutboxStatus
+from app.utils.klaviyo import KlaviyoRejected, KlaviyoServerError, WebhookRoute, known_profiles
+
+
+def _make_row(row_id, route="booking_new"):
+    return KlaviyoOutbox(id=row_id, route=route, payload={"email": f"{row_id}@example.com"})
+
+
+def _patch_session(db):
+    mock_ctx = AsyncMock()
+    mock_ctx.__aenter__.return_value = db
+    return patch("app.commands.klaviyo.dispatch_outbox.async_session", return_value=mock_ctx)
+
+
+def _patch_claim(rows):
+    return patch(
+        "app.commands.klaviyo.dispatch_outbox.klaviyo_outbox_dao.claim_batch",
+        new_callable=AsyncMock,
+        return_value=rows,
+    )
+
+
+def _patch_save():
+    return patch(
+        "app.commands.klaviyo.dispatch_outbox.klaviyo_outbox_dao.save_outcome",
+        new_callable=AsyncMock,
+        return_value=True,
+    )
+
+
+class TestDispatchBatch:
+    async def test_no_rows_returns_zero_without_commit(self):
+        db = AsyncMock()
+        with _patch_session(db), _patch_claim([]):
+            claimed = await dispatch_batch(10, 2, 5, 300)
+        assert claimed == 0
+        db.commit.assert_not_called()
+
+    async def test_sends_each_row_and_marks_sent(self):
+        db = AsyncMock()
+        rows = [_make_row(1), _make_row(2, route="customer_new")]
+        with (
+            _patch_session(db),
+            _patch_claim(rows) as mock_claim,
+            _patch_save() as mock_save,
+            patch(
+                "app.commands.klaviyo.dispatch_outbox.process_with_klaviyo",
+                new_callable=AsyncMock,
+            ) as mock_process,
+        ):
+            claimed = await dispatch_batch(10, 2, 5, 300)
+
+        assert claimed == 2
+        mock_claim.assert_awaited_once_with(db, 10, 300)
+        assert mock_process.call_count == 2
+        assert all(r.status == OutboxStatus.SENT for r in rows)
+        assert [c.args[1] for c in mock_save.await_args_list] == rows
+
+    async def test_claim_is_committed_before_sending(self):
+        db = AsyncMock()
+        events = []
+        db.commit.side_effect = lambda: events.append("commit")
+        with (
+            _patch_session(db),
+            _patch_claim([_make_row(1)]),
+            _patch_save() as mock_save,
+            patch(
+                "app.commands.klaviyo.dispatch_outbox.process_with_klaviyo",
+                new_callable=AsyncMock,
+                side_effect=lambda *a: events.append("send"),
+            ),
+        ):
+            mock_save.side_effect = lambda *a: events.append("save")
+            await dispatch_batch(10, 2, 5, 300)
+        assert events == ["commit", "send", "save"]
+
+    async def test_failure_is_recorded_and_others_still_sent(self):
+        db = AsyncMock()
+        rows = [_make_row(1), _make_row(2)]
+        with (
+            _patch_session(db),
+            _patch_claim(rows),
+            _patch_save() as mock_save,
+            patch(
+                "app.commands.klaviyo.dispatch_outbox.process_with_klaviyo",
+                new_callable=AsyncMock,
+                side_effect=[Exception("boom"), None],
+            ),
+        ):
+            await dispatch_batch(10, 1, 5, 300)
+
+        assert rows[0].status == OutboxStatus.PENDING
+        assert rows[0].last_error == "boom"
+        assert rows[1].status == OutboxStatus.SENT
+        assert mock_save.await_count == 2
+
+    async def test_rejected_send_fails_without_retry(self):
+        db = AsyncMock()
+        rows = [_make_row(1), _make_row(2)]
+        with (
+            _patch_session(db),
+            _patch_claim(rows),
+            _patch_save(),
+            patch(
+                "app.commands.klaviyo.dispatch_outbox.process_with_klaviyo",
+                new_callable=AsyncMock,
+                side_effect=[
+                    KlaviyoRejected("post", "/house/new", 400, "bad payload"),
+                    KlaviyoServerError("post", "/house/new", 502, "bad gateway"),
+                ],
+            ),
+        ):
+            await dispatch_batch(10, 1, 5, 300)
+
+        assert rows[0].status == OutboxStatus.FAILED
+        assert rows[1].status == OutboxStatus.PENDING
+        assert "502" in rows[1].last_error
+
+
+class TestRun:
+    async def test_once_drains_until_nothing_due(self):
+        settings = MagicMock(
+            KLAVIYO_OUTBOX_BATCH_SIZE=10,
+            KLAVIYO_OUTBOX_CONCURRENCY=2,
+            KLAVIYO_OUTBOX_MAX_ATTEMPTS=5,
+            KLAVIYO_OUTBOX_LEASE_SECONDS=300,
+        )
+        with (
+            patch("app.commands.klaviyo.dispatch_outbox.get_settings", return_value=settings),
+            patch(
+                "app.commands.klaviyo.dispatch_outbox.dispatch_batch",
+                new_callable=AsyncMock,
+                side_effect=[10, 3, 0],
+            ) as mock_dispatch,
+        ):
+            await run(once=True)
+        assert mock_dispatch.call_count == 3
+
+
+class TestSeedProfileCache:
+    async def test_seeds_customer_emails(self):
+        db = AsyncMock()
+        with (
+            _patch_session(db),
+            patch(
+                "app.commands.klaviyo.dispatch_outbox.customer_dao.get_all_emails",
+                new_callable=AsyncMock,
+                return_value=["a@example.com", "b@example.com"],
+            ),
+            patch(
+                "app.commands.klaviyo.dispatch_outbox.klaviyo_outbox_dao.get_undelivered_emails",
+                new_callable=AsyncMock,
+                return_value=set(),
+            ),
+            patch(
+                "app.commands.klaviyo.dispatch_outbox.seed_known_profiles", return_value=2,
+            ) as mock_seed,
+        ):
+            from app.commands.klaviyo.dispatch_outbox import seed_profile_cache
+
+            count = await seed_profile_cache()
+        assert count == 2
+        assert list(mock_seed.call_args[0][0]) == ["a@example.com", "b@example.com"]
+
+    async def test_skips_emails_with_undelivered_customer_new(self):
+        db = AsyncMock()
+        with (
+            _patch_session(db),
+            patch(
+                "app.commands.klaviyo.dispatch_outbox.customer_dao.get_all_emails",
+                new_callable=AsyncMock,
+                return_value=["a@example.com", "Pending@Example.com"],
+            ),
+            patch(
+                "app.commands.klaviyo.dispatch_outbox.klaviyo_outbox_dao.get_undelivered_emails",
+                new_callable=AsyncMock,
+                return_value={"pending@example.com"},
+            ) as mock_undelivered,
+        ):
+            from app.commands.klaviyo.dispatch_outbox import seed_profile_cache
+
+            known_profiles.clear()
+            try:
+                assert await seed_profile_cache() == 1
+                assert "a@example.com" in known_profiles
+                assert "pending@example.com" not in known_profiles
+            finally:
+                known_profiles.clear()
+        mock_undelivered.assert_awaited_once_with(db, WebhookRoute.CUSTOMER_NEW)
@@ -0,0 +1,59 @@
+"""Tests for app/utils/compact.py — token-compact response shapes."""
+
+from app.utils.compact import compact_response
+
+
+ROWS = [
+    {"booking_id": 1, "service_date": "2024-03-01", "service": "Standard", "state": None, "extras": []},
+    {"booking_id": 2, "service_date": None, "service": "Deep", "state": None, "extras": ["Oven"]},
+]
+
+
+class TestCompactResponse:
+    def test_full_mode_returns_payload_unchanged(self):
+        assert compact_response(ROWS, "full") is ROWS
+
+    def test_record_drops_empty_values_and_shortens_keys(self):
+        doc = {
+            "booking_id": 5, "service_date": "2024-03-01", "name": "", "tip": 0,
+            "was_new_customer": False, "is_new_customer": True, "staff_notes": None,
+        }
+        assert compact_response(doc, "compact") == {
+            "keys": {"bi": "booking_id", "sd": "service_date", "t": "tip", "inc": "is_new_customer"},
+            "data": {"bi": 5, "sd": "2024-03-01", "t": 0, "inc": True},
+        }
+
+    def test_clashing_short_names_take_more_letters(self):
+        result = compact_response({"service": "a", "state": "b", "source": "c", "s": "d"}, "compact")
+        assert result["keys"] == {"s": "service", "st": "state", "so": "source", "s2": "s"}
+        assert result["data"] == {"s": "a", "st": "b", "so": "c", "s2": "d"}
+
+    def test_list_rows_share_one_dictionary(self):
+        result = compact_response(ROWS, "compact")
+        assert result["keys"] == {"bi": "booking_id", "sd": "service_date", "s": "service", "e": "extras"}
+        assert result["data"] == [
+            {"bi": 1, "sd": "2024-03-01", "s": "Standard"},
+            {"bi": 2, "s": "Deep", "e": ["Oven"]},
+        ]
+
+    def test_columnar_keeps_arrays_aligned(self):
+        result = compact_response(ROWS, "columnar")
+        assert result["data"] == {
+            "bi": [1, 2],
+            "sd": ["2024-03-01", None],
+            "s": ["Standard", "Deep"],
+            "e": [None, ["Oven"]],
+        }
+        assert "state" not in result["keys"].values()
+
+    def test_envelope_keeps_other_keys(self):
+        page = {"bookings": ROWS, "next_cursor": "abc"}
+        result = compact_response(page, "columnar", "bookings")
+        assert result["next_cursor"] == "abc"
+        assert result["bookings"]["bi"] == [1, 2]
+        assert result["keys"]["bi"] == "booking_id"
+        assert page["bookings"] is ROWS  # cached results are not modified
+
+    def test_unpaged_list_with_envelope_key(self):
+        result = compact_response(ROWS, "compact", "bookings")
+        assert set(result) == {"keys", "data"}
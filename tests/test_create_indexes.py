@@ -0,0 +1,106 @@
+"""Tests for app/database/create_indexes.py — model indexes and the concurrent build script."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, inspect
+from sqlmodel import SQLModel
+
+from app.database.create_indexes import create_indexes, index_statements
+from app.models.booking import Booking
+
+
+def _patch_engine(conn):
+    ctx = AsyncMock()
+    ctx.__aenter__.return_value = conn
+    return patch("app.database.create_indexes.engine", MagicMock(connect=MagicMock(return_value=ctx)))
+
+
+class TestBookingIndexes:
+    def test_indexes_cover_dao_access_paths(self):
+        columns = {
+            i.name: [c.name for c in i.columns] for i in Booking.__table__.indexes
+        }
+        assert columns["ix_bookings_category_status_created"] == ["service_category", "booking_status", "_created_at"]
+        assert columns["ix_bookings_status_service_date"] == ["booking_status", "_service_date"]
+        assert columns["ix_bookings_email_service_date"] == ["email", "_service_date"]
+
+    def test_missing_location_index_is_partial(self):
+        statements = dict(index_statements(SQLModel.metadata))
+        assert statements["ix_bookings_missing_location"].endswith("WHERE location IS NULL")
+
+    def test_created_at_is_brin_and_service_date_is_btree(self):
+        statements = dict(index_statements(SQLModel.metadata))
+        assert "USING brin (_created_at)" in statements["ix_bookings_created_at_brin"]
+        assert statements["ix_bookings_service_date"].endswith("ON bookings (_service_date)")
+        assert "ix_bookings_service_date_brin" not in statements
+
+
+class TestIndexStatements:
+    def test_every_statement_is_concurrent_and_idempotent(self):
+        for _, sql in index_statements(SQLModel.metadata):
+            assert "INDEX CONCURRENTLY IF NOT EXISTS" in sql
+
+    def test_contact_fields_have_trigram_indexes(self):
+        statements = dict(index_statements(SQLModel.metadata))
+        for name, table in (("ix_bookings_text_search_trgm", "bookings"), ("ix_customer_text_search_trgm", "customer")):
+            sql = statements[name]
+            assert f"ON {table} USING gin ((coalesce(name, '') || ' ' || coalesce(address, '')" in sql
+            assert sql.endswith("gin_trgm_ops)")
+
+    def test_unique_indexes_stay_unique(self):
+        statements = dict(index_statements(SQLModel.metadata))
+        assert statements["ix_bookings_booking_id"].startswith("CREATE UNIQUE INDEX CONCURRENTLY")
+
+
+class TestCreateIndexes:
+    async def test_runs_in_autocommit_and_creates_each_index(self):
+        conn = AsyncMock()
+        conn.execution_options.return_value = conn
+        conn.execute.return_value = MagicMock(scalars=MagicMock(return_value=MagicMock(all=MagicMock(return_value=[]))))
+        with _patch_engine(conn):
+            names = await create_indexes()
+
+        conn.execution_options.assert_awaited_once_with(isolation_level="AUTOCOMMIT")
+        # pg_trgm, one lookup for invalid indexes, then one CREATE per index
+        assert conn.execute.await_count == 2 + len(names)
+        assert str(conn.execute.await_args_list[0].args[0]) == "CREATE EXTENSION IF NOT EXISTS pg_trgm"
+
+    async def test_invalid_index_is_dropped_before_rebuild(self):
+        conn = AsyncMock()
+        conn.execution_options.return_value = conn
+        conn.execute.return_value = MagicMock(
+            scalars=MagicMock(return_value=MagicMock(all=MagicMock(return_value=["ix_bookings_email_service_date"])))
+        )
+        with _patch_engine(conn):
+            await create_indexes()
+
+        sql = [str(call.args[0]) for call in conn.execute.await_args_list]
+        drop = sql.index('DROP INDEX CONCURRENTLY IF EXISTS "ix_bookings_email_service_date"')
+        create = next(i for i, s in enumerate(sql) if "ix_bookings_email_service_date ON" in s)
+        assert drop < create
+
+    async def test_creates_missing_tables_before_building_indexes(self):
+        metadata = MetaData()
+        Table("fresh", metadata, Column("id", Integer, primary_key=True), Column("code", Integer, index=True))
+        sqlite = create_engine("sqlite://")
+        events = []
+
+        def run_sync(fn, *args, **kwargs):
+            events.append("create_all")
+            with sqlite.begin() as sync_conn:
+                return fn(sync_conn, *args, **kwargs)
+
+        async def execute(stmt, *args):
+            events.append(str(stmt).split(" ON ")[0])
+            return MagicMock(scalars=MagicMock(return_value=MagicMock(all=MagicMock(return_value=[]))))
+
+        conn = AsyncMock()
+        conn.execution_options.return_value = conn
+        conn.run_sync.side_effect = run_sync
+        conn.execute.side_effect = execute
+        assert not inspect(sqlite).has_table("fresh")
+        with _patch_engine(conn):
+            await create_indexes(metadata)
+
+        assert inspect(sqlite).has_table("fresh")
+        assert events.index("create_all") < events.index("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_fresh_code")
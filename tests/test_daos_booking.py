@@ -0,0 +1,263 @@
+"""Tests for app/daos/booking.py — column-projected search queries."""
+
+from datetime import date
+from unittest.mock import AsyncMock, MagicMock
+
+from app.daos.booking import (
+    COMPLETED_FIELDS,
+    EMAIL_WEEK_FIELDS,
+    MISSING_LOCATION_FIELDS,
+    QUERY_DEFAULT_FIELDS,
+    QUERY_FIELDS,
+    QUERY_SORT_FIELDS,
+    SEARCH_FIELDS,
+    STATS_DIMENSIONS,
+    TEXT_SEARCH_FIELDS,
+    BookingDAO,
+)
+from app.models.booking import Booking
+
+
+def _make_dao():
+    return BookingDAO(Booking)
+
+
+def _make_db(rows=()):
+    """Return a mock AsyncSession whose result yields `rows` from all()/first()."""
+    mock_result = MagicMock()
+    mock_result.all.return_value = list(rows)
+    mock_result.first.return_value = rows[0] if rows else None
+    db = AsyncMock()
+    db.execute.return_value = mock_result
+    return db
+
+
+def _selected(db) -> list[str]:
+    stmt = db.execute.call_args[0][0]
+    return list(stmt.selected_columns.keys())
+
+
+class TestProjectedQueries:
+    async def test_date_range_selects_search_columns_only(self):
+        db = _make_db()
+        await _make_dao().get_by_date_range(db, "House", "NOT_COMPLETE", "2024-01-01", "2024-01-31")
+        assert _selected(db) == list(SEARCH_FIELDS)
+
+    async def test_completed_selects_completed_columns(self):
+        db = _make_db()
+        await _make_dao().completed_bookings_by_service_date(db, date(2024, 2, 1), date(2024, 2, 29))
+        assert _selected(db) == list(COMPLETED_FIELDS)
+
+    async def test_email_week_selects_lookup_columns(self):
+        db = _make_db()
+        await _make_dao().get_by_booking_email_service_date_range(db, "jane@example.com", "2024-02-15")
+        assert _selected(db) == list(EMAIL_WEEK_FIELDS)
+
+    async def test_missing_locations_selects_postcode(self):
+        db = _make_db()
+        await _make_dao().get_bookings_missing_locations(db)
+        assert _selected(db) == list(MISSING_LOCATION_FIELDS)
+
+    async def test_wide_text_columns_are_not_loaded(self):
+        for fields in (SEARCH_FIELDS, COMPLETED_FIELDS, EMAIL_WEEK_FIELDS):
+            assert not {"customer_notes", "staff_notes", "rating_comment"} & set(fields)
+
+    async def test_rows_are_returned_without_scalars(self):
+        row = MagicMock(booking_id=1)
+        db = _make_db([row])
+        rows = await _make_dao().get_by_date_range(db, "House", "NOT_COMPLETE", "2024-01-01", "2024-01-31")
+        assert rows == [row]
+        db.execute.return_value.scalars.assert_not_called()
+
+
+class TestKeysetPaging:
+    def _sql(self, db) -> str:
+        from sqlalchemy.dialects import postgresql
+
+        stmt, params = db.execute.call_args[0]
+        return str(stmt.params(params).compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+    async def test_unpaged_query_has_no_order_or_limit(self):
+        db = _make_db()
+        await _make_dao().completed_bookings_by_service_date(db, date(2024, 2, 1), date(2024, 2, 29))
+        sql = self._sql(db)
+        assert "ORDER BY" not in sql
+        assert "LIMIT" not in sql
+
+    async def test_paged_query_orders_by_key_and_seeks_past_cursor(self):
+        db = _make_db()
+        await _make_dao().completed_bookings_by_service_date(
+            db, date(2024, 2, 1), date(2024, 2, 29), limit=11, after=(date(2024, 2, 10), 55),
+        )
+        sql = self._sql(db)
+        assert "(bookings._service_date, bookings.booking_id) > ('2024-02-10', 55)" in sql
+        assert "ORDER BY bookings._service_date, bookings.booking_id" in sql
+        assert sql.rstrip().endswith("LIMIT 11")
+
+
+class TestCachedStatements:
+    async def test_statement_is_built_once_and_rebound_per_call(self):
+        dao = _make_dao()
+        db = _make_db()
+        await dao.get_by_date_range(db, "House", "NOT_COMPLETE", "2024-01-01", "2024-01-31", limit=5)
+        await dao.get_by_date_range(db, "Bond", "COMPLETED", "2024-02-01", "2024-02-29", limit=9)
+        (first, first_params), (second, second_params) = [c[0] for c in db.execute.call_args_list]
+        assert first is second
+        assert second_params["service_category"] == "Bond"
+        assert second_params["limit"] == 9
+
+    async def test_each_paging_shape_gets_its_own_statement(self):
+        dao = _make_dao()
+        db = _make_db()
+        await dao.get_by_date_range(db, "House", "NOT_COMPLETE", "2024-01-01", "2024-01-31")
+        await dao.get_by_date_range(db, "House", "NOT_COMPLETE", "2024-01-01", "2024-01-31", limit=5)
+        await dao.get_by_date_range(
+            db, "House", "NOT_COMPLETE", "2024-01-01", "2024-01-31", limit=5, after=(None, 3),
+        )
+        statements = [c[0][0] for c in db.execute.call_args_list]
+        assert len({id(s) for s in statements}) == 3
+        assert db.execute.call_args[0][1]["after_date"] == date.min
+
+    async def test_point_lookup_binds_booking_id(self):
+        dao = _make_dao()
+        db = _make_db()
+        await dao.get_by_booking_id(db, 42)
+        await dao.get_by_booking_id(db, 43)
+        (first, _), (second, params) = [c[0] for c in db.execute.call_args_list]
+        assert first is second
+        assert params == {"booking_id": 43}
+
+
+class TestTextSearch:
+    async def test_ranks_by_word_similarity_on_indexed_expression(self):
+        from sqlalchemy.dialects import postgresql
+
+        db = _make_db()
+        await _make_dao().search_text(db, "smith elm street", 5)
+        stmt, params = db.execute.call_args[0]
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+        assert list(stmt.selected_columns.keys()) == [*TEXT_SEARCH_FIELDS, "score"]
+        assert "<%% (coalesce(name, '') || ' ' || coalesce(address, '')" in sql
+        assert "ORDER BY score DESC" in sql
+        assert params == {"q": "smith elm street", "limit": 5}
+
+
+class TestAggregate:
+    def _sql(self, db):
+        from sqlalchemy.dialects import postgresql
+
+        stmt = db.execute.call_args[0][0]
+        return str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+    async def test_groups_and_sums_in_sql(self):
+        db = _make_db()
+        await _make_dao().aggregate(db, ["month", "category"], booking_status="COMPLETED")
+        sql = self._sql(db)
+        assert _selected(db) == ["month", "category", "count", "final_price_sum"]
+        assert "CAST(date_trunc('month', bookings._service_date) AS DATE) AS month" in sql
+        assert "coalesce(sum(bookings._final_price), 0)" in sql
+        assert "bookings.booking_status = 'COMPLETED'" in sql
+        assert "GROUP BY" in sql and "ORDER BY month, category" in sql
+
+    async def test_no_dimensions_gives_totals_only(self):
+        db = _make_db()
+        await _make_dao().aggregate(db, [], from_date=date(2024, 1, 1), to_date=date(2024, 1, 31))
+        sql = self._sql(db)
+        assert _selected(db) == ["count", "final_price_sum"]
+        assert "GROUP BY" not in sql
+        assert "bookings._service_date >= '2024-01-01'" in sql
+
+    def test_dimensions_map_to_booking_fields(self):
+        assert set(STATS_DIMENSIONS.values()) <= set(Booking.model_fields)
+
+
+class TestQuery:
+    def _sql(self, db):
+        from sqlalchemy.dialects import postgresql
+
+        stmt = db.execute.call_args[0][0]
+        return str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+    async def test_selects_only_requested_fields(self):
+        db = _make_db()
+        await _make_dao().query(db, ["booking_id", "final_price"], 11, "final_price", descending=True)
+        sql = self._sql(db)
+        assert _selected(db) == ["booking_id", "final_price"]
+        assert "ORDER BY bookings._final_price DESC NULLS LAST, bookings.booking_id DESC" in sql
+        assert "LIMIT 11" in sql
+        assert "WHERE" not in sql
+
+    async def test_applies_only_given_filters(self):
+        db = _make_db()
+        await _make_dao().query(
+            db, ["booking_id"], 5, booking_status="COMPLETED", team="50%",
+            postcode="4000", from_date=date(2024, 3, 1),
+        )
+        sql = self._sql(db)
+        assert "bookings.booking_status = 'COMPLETED'" in sql
+        assert "bookings.postcode = '4000'" in sql
+        assert "bookings._teams_assigned ILIKE '%%' || '50/%%' || '%%' ESCAPE '/'" in sql
+        assert "bookings._service_date >= '2024-03-01'" in sql
+        assert "email" not in sql and "location" not in sql
+        assert "ORDER BY bookings._service_date ASC NULLS LAST, bookings.booking_id" in sql
+
+    def test_allow_lists_are_booking_fields(self):
+        assert "id" not in QUERY_FIELDS
+        assert set(QUERY_DEFAULT_FIELDS) <= set(QUERY_FIELDS)
+        assert set(QUERY_SORT_FIELDS) <= set(QUERY_FIELDS)
+
+
+class TestExport:
+    def test_export_query_selects_every_field(self):
+        stmt = _make_dao().export_query()
+        assert list(stmt.selected_columns.keys()) == list(Booking.model_fields)
+
+    def test_export_query_applies_only_given_filters(self):
+        from sqlalchemy.dialects import postgresql
+
+        stmt = _make_dao().export_query(booking_status="COMPLETED", from_date=date(2024, 2, 1))
+        sql = str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+        assert "bookings.booking_status = 'COMPLETED'" in sql
+        assert "bookings._service_date >= '2024-02-01'" in sql
+        assert "service_category" not in sql.split("WHERE")[1]
+
+    async def test_stream_partitions_uses_server_side_cursor(self):
+        async def partitions():
+            yield [(1,), (2,)]
+            yield [(3,)]
+
+        stream_result = MagicMock()
+        stream_result.partitions.return_value = partitions()
+        db = AsyncMock()
+        db.stream.return_value = stream_result
+
+        dao = _make_dao()
+        chunks = [p async for p in dao.stream_partitions(db, dao.export_query(), 500)]
+
+        assert chunks == [[(1,), (2,)], [(3,)]]
+        stmt = db.stream.call_args[0][0]
+        assert stmt.get_execution_options()["yield_per"] == 500
+
+
+def _stream_db(*partitions):
+    async def gen():
+        for rows in partitions:
+            yield rows
+
+    stream_result = MagicMock()
+    stream_result.partitions.return_value = gen()
+    db = AsyncMock()
+    db.stream.return_value = stream_result
+    return db
+
+
+class TestIterMethods:
+    async def test_iter_missing_locations_yields_batches(self):
+        db = _stream_db([(1, "3000"), (2, None)], [(3, "4000")])
+        batches = [b async for b in _make_dao().iter_bookings_missing_locations(db, chunk_size=2)]
+
+        assert batches == [[(1, "3000"), (2, None)], [(3, "4000")]]
+        stmt = db.stream.call_args[0][0]
+        assert list(stmt.selected_columns.keys()) == list(MISSING_LOCATION_FIELDS)
+        assert stmt.get_execution_options()["yield_per"] == 2
+
@@ -0,0 +1,193 @@
+"""Tests for app/daos/booking_rollup.py and app/database/rebuild_rollup.py — the daily rollup."""
+
+from datetime import date
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.dialects import postgresql
+
+from app.daos.base import BaseDAO
+from app.daos.booking import booking_dao
+from app.daos.booking_rollup import BookingRollupDAO, booking_rollup_dao
+from app.database.rebuild_rollup import month_ranges, rebuild
+from app.models.booking import Booking
+from app.models.booking_rollup import BookingDailyRollup
+
+DAY = date(2024, 2, 1)
+
+
+def _booking(**overrides):
+    values = dict(
+        service_date=DAY, service_category="House Clean", booking_status="NOT_COMPLETE",
+        location=None, final_price=15000,
+    )
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+def _make_db():
+    db = AsyncMock()
+    db.no_autoflush = MagicMock()
+    db.execute.return_value = MagicMock()
+    return db
+
+
+def _sql(stmt, literal=False):
+    kwargs = {"compile_kwargs": {"literal_binds": True}} if literal else {}
+    return str(stmt.compile(dialect=postgresql.dialect(), **kwargs))
+
+
+class TestDeltas:
+    def test_snapshot_uses_empty_string_for_missing_dimensions(self):
+        assert BookingRollupDAO.snapshot(_booking()) == ((DAY, "House Clean", "NOT_COMPLETE", ""), 15000)
+
+    def test_booking_without_service_date_is_not_rolled_up(self):
+        assert BookingRollupDAO.snapshot(_booking(service_date=None)) is None
+        assert BookingRollupDAO.snapshot(None) is None
+
+    def test_new_booking_adds_one(self):
+        after = BookingRollupDAO.snapshot(_booking())
+        assert BookingRollupDAO.deltas(None, after) == [(after[0], 1, 15000)]
+
+    def test_status_change_moves_count_and_price(self):
+        before = BookingRollupDAO.snapshot(_booking())
+        after = BookingRollupDAO.snapshot(_booking(booking_status="COMPLETED", final_price=16000))
+        assert BookingRollupDAO.deltas(before, after) == [
+            (after[0], 1, 16000),
+            (before[0], -1, -15000),
+        ]
+
+    def test_price_change_only_adjusts_sum(self):
+        before = BookingRollupDAO.snapshot(_booking())
+        after = BookingRollupDAO.snapshot(_booking(final_price=12000))
+        assert BookingRollupDAO.deltas(before, after) == [(before[0], 0, -3000)]
+
+    def test_unchanged_booking_has_no_deltas(self):
+        snap = BookingRollupDAO.snapshot(_booking())
+        assert BookingRollupDAO.deltas(snap, snap) == []
+
+
+class TestApply:
+    async def test_upserts_each_delta(self):
+        db = _make_db()
+        before = BookingRollupDAO.snapshot(_booking())
+        after = BookingRollupDAO.snapshot(_booking(booking_status="CANCELLED"))
+        await booking_rollup_dao.apply(db, before, after)
+
+        assert db.execute.await_count == 2
+        sql = _sql(db.execute.call_args_list[0][0][0])
+        assert "ON CONFLICT ON CONSTRAINT uq_booking_daily_rollup_key DO UPDATE" in sql
+        assert "count = (booking_daily_rollup.count + excluded.count)" in sql
+        db.no_autoflush.__enter__.assert_called_once()
+
+    async def test_booking_dao_applies_deltas_on_upsert(self):
+        existing = MagicMock(spec=Booking)
+        existing.service_date, existing.final_price = DAY, 15000
+        existing.service_category, existing.booking_status, existing.location = "House Clean", "NOT_COMPLETE", "Brisbane"
+        existing.model_dump.return_value = {}
+
+        def complete(data):
+            existing.booking_status = "COMPLETED"
+
+        existing.update_from_webhook.side_effect = complete
+        result = MagicMock()
+        result.scalars.return_value.first.return_value = existing
+        db = _make_db()
+        db.execute.return_value = result
+
+        with patch.object(booking_rollup_dao, "apply", new_callable=AsyncMock) as mock_apply, \
+                patch("app.daos.base.get_location", new_callable=AsyncMock, return_value=None):
+            await booking_dao.create_update_booking(db, {"id": "99"})
+
+        before, after = mock_apply.call_args[0][1:]
+        assert before[0][2] == "NOT_COMPLETE" and after[0][2] == "COMPLETED"
+        assert "FOR UPDATE" in _sql(db.execute.call_args_list[0][0][0])
+
+    def test_base_dao_without_rollup_does_not_lock(self):
+        assert "FOR UPDATE" not in _sql(BaseDAO(Booking)._for_write())
+
+
+class TestAggregate:
+    async def test_sums_rollup_rows(self):
+        db = _make_db()
+        await booking_rollup_dao.aggregate(db, ["month", "location"], from_date=date(2024, 1, 1))
+        stmt = db.execute.call_args[0][0]
+        sql = _sql(stmt, literal=True)
+        assert list(stmt.selected_columns.keys()) == ["month", "location", "count", "final_price_sum"]
+        assert "nullif(booking_daily_rollup.location, '') AS location" in sql
+        assert "sum(booking_daily_rollup.count)" in sql
+        assert "HAVING sum(booking_daily_rollup.count) != 0" in sql
+        assert "FROM booking_daily_rollup" in sql and "bookings" not in sql
+
+
+    async def test_matches_booking_aggregate_when_a_group_drops_to_zero(self):
+        """Every NOT_COMPLETE booking completed: its rollup row stays at count 0 but is not returned."""
+        engine = create_engine("sqlite://")
+        with engine.begin() as conn:
+            Booking.__table__.create(conn)
+            BookingDailyRollup.__table__.create(conn)
+            before = booking_rollup_dao.snapshot(_booking())
+            after = booking_rollup_dao.snapshot(_booking(booking_status="COMPLETED"))
+            rollup = BookingDailyRollup.__table__
+            for deltas in (booking_rollup_dao.deltas(None, before), booking_rollup_dao.deltas(before, after)):
+                for (day, category, status, location), count, amount in deltas:
+                    key = (rollup.c.day == day) & (rollup.c.status == status)
+                    if conn.execute(select(rollup.c.id).where(key)).first():
+                        conn.execute(rollup.update().where(key).values(
+                            count=rollup.c.count + count, final_price_sum=rollup.c.final_price_sum + amount,
+                        ))
+                    else:
+                        conn.execute(rollup.insert().values(
+                            day=day, category=category, status=status, location=location,
+                            count=count, final_price_sum=amount,
+                        ))
+            conn.execute(Booking.__table__.insert().values(
+                id=1, _service_date=DAY, service_category="House Clean",
+                booking_status="COMPLETED", _final_price=15000,
+            ))
+            db = AsyncMock()
+            db.execute.side_effect = conn.execute
+
+            from_bookings = await booking_dao.aggregate(db, ["status"])
+            from_rollup = await booking_rollup_dao.aggregate(db, ["status"])
+            assert conn.execute(select(rollup.c.count).where(rollup.c.status == "NOT_COMPLETE")).scalar() == 0
+
+        assert [tuple(r) for r in from_rollup] == [tuple(r) for r in from_bookings] == [("COMPLETED", 1, 15000)]
+
+
+class TestRebuild:
+    async def test_replaces_range_under_table_lock(self):
+        db = _make_db()
+        db.execute.return_value = MagicMock(rowcount=7)
+        written = await booking_rollup_dao.rebuild(db, date(2024, 1, 1), date(2024, 1, 31))
+
+        statements = [_sql(c[0][0]) for c in db.execute.call_args_list]
+        assert statements[0].startswith("LOCK TABLE booking_daily_rollup")
+        assert statements[1].startswith("DELETE FROM booking_daily_rollup")
+        assert statements[2].startswith("INSERT INTO booking_daily_rollup")
+        assert "GROUP BY bookings._service_date" in statements[2]
+        db.commit.assert_awaited_once()
+        assert written == 7
+
+    def test_month_ranges_split_at_month_ends(self):
+        assert list(month_ranges(date(2024, 1, 20), date(2024, 3, 5))) == [
+            (date(2024, 1, 20), date(2024, 1, 31)),
+            (date(2024, 2, 1), date(2024, 2, 29)),
+            (date(2024, 3, 1), date(2024, 3, 5)),
+        ]
+
+    async def test_defaults_to_every_service_date(self):
+        session = AsyncMock()
+        with patch("app.database.rebuild_rollup.async_session", MagicMock(return_value=session)), \
+                patch("app.database.rebuild_rollup.booking_dao.service_date_bounds",
+                      new_callable=AsyncMock, return_value=(date(2024, 1, 15), date(2024, 2, 10))), \
+                patch("app.database.rebuild_rollup.booking_rollup_dao.rebuild",
+                      new_callable=AsyncMock, return_value=3) as mock_rebuild:
+            total = await rebuild()
+
+        assert total == 6
+        assert [c[0][1:] for c in mock_rebuild.call_args_list] == [
+            (date(2024, 1, 15), date(2024, 1, 31)),
+            (date(2024, 2, 1), date(2024, 2, 10)),
+        ]
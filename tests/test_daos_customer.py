@@ -192,3 +192,22 @@ class TestCreateOrUpdateCustomer:
             await dao.create_or_update_customer(db, _customer_data())
 
         mock_update.assert_called_once_with(db, existing, _customer_data())
+
+
+class TestSearchText:
+    async def test_selects_contact_fields_and_score(self):
+        db = _make_db()
+        await _make_dao().search_text(db, "jane smith", 10)
+        stmt, params = db.execute.call_args[0]
+        assert list(stmt.selected_columns.keys()) == [
+            "customer_id", "name", "address", "email", "phone", "location", "score",
+        ]
+        assert params == {"q": "jane smith", "limit": 10}
+
+    async def test_statement_is_built_once(self):
+        dao = _make_dao()
+        db = _make_db()
+        await dao.search_text(db, "jane", 10)
+        await dao.search_text(db, "smith", 5)
+        first, second = (c.args[0] for c in db.execute.call_args_list)
+        assert first is second
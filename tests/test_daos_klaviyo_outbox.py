@@ -0,0 +1,150 @@
+"""Tests for app/daos/klaviyo_outbox.py — staging, claiming, and status recording."""
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.daos.klaviyo_outbox import KlaviyoOutboxDAO
+from app.models.klaviyo_outbox import KlaviyoOutbox, OutboxStatus
+from app.utils.klaviyo import WebhookRoute
+
+
+def _make_dao():
+    return KlaviyoOutboxDAO(KlaviyoOutbox)
+
+
+def _make_row(attempts=0):
+    return KlaviyoOutbox(id=1, route=WebhookRoute.BOOKING_NEW, payload={}, attempts=attempts)
+
+
+class TestEnqueue:
+    def test_adds_row_with_route_and_payload(self):
+        db = MagicMock()
+        row = _make_dao().enqueue(db, {"email": "jane@example.com"}, WebhookRoute.BOOKING_NEW)
+
+        db.add.assert_called_once_with(row)
+        assert row.route == "booking_new"
+        assert row.payload == {"email": "jane@example.com"}
+        assert row.status == OutboxStatus.PENDING
+
+    def test_payload_is_json_safe(self):
+        """The cancellation route injects a datetime; it must be stored as a string."""
+        db = MagicMock()
+        when = datetime(2024, 2, 15, 10, 30)
+        row = _make_dao().enqueue(db, {"_cancellation_datetime": when}, WebhookRoute.BOOKING_CANCELLATION)
+        assert row.payload["_cancellation_datetime"] == "2024-02-15T10:30:00"
+
+
+class TestEnsureCommitted:
+    async def test_re_adds_row_dropped_by_rollback(self):
+        db = AsyncMock()
+        db.__contains__ = MagicMock(return_value=False)
+        row = _make_row()
+        await _make_dao().ensure_committed(db, row)
+        db.add.assert_called_once_with(row)
+        db.commit.assert_called_once()
+
+    async def test_row_still_in_session_is_committed(self):
+        db = AsyncMock()
+        db.__contains__ = MagicMock(return_value=True)
+        await _make_dao().ensure_committed(db, _make_row())
+        db.add.assert_not_called()
+        db.commit.assert_called_once()
+
+
+class TestClaimBatch:
+    async def test_uses_skip_locked_and_limit(self):
+        mock_result = MagicMock()
+        mock_result.scalars.return_value.all.return_value = []
+        db = AsyncMock()
+        db.execute.return_value = mock_result
+
+        await _make_dao().claim_batch(db, 25, 300)
+
+        stmt = db.execute.call_args[0][0]
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+        assert "FOR UPDATE SKIP LOCKED" in sql
+        assert "LIMIT" in sql
+        assert "klaviyo_outbox.status IN" in sql
+
+    async def test_marks_rows_in_progress_with_lease(self):
+        row = _make_row()
+        mock_result = MagicMock()
+        mock_result.scalars.return_value.all.return_value = [row]
+        db = AsyncMock()
+        db.execute.return_value = mock_result
+
+        before = datetime.now(timezone.utc)
+        assert await _make_dao().claim_batch(db, 25, 300) == [row]
+        assert row.status == OutboxStatus.IN_PROGRESS
+        assert row.available_at >= before + timedelta(seconds=300)
+        db.commit.assert_not_called()
+
+
+class TestSaveOutcome:
+    async def test_updates_leased_row_and_commits(self):
+        db = AsyncMock()
+        db.execute.return_value = MagicMock(rowcount=1)
+        row = _make_row()
+        _make_dao().mark_sent(row)
+
+        assert await _make_dao().save_outcome(db, row) is True
+        stmt = db.execute.call_args[0][0]
+        sql = str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+        assert sql.startswith("UPDATE klaviyo_outbox SET")
+        assert "klaviyo_outbox.status = 'IN_PROGRESS'" in sql
+        db.commit.assert_awaited_once()
+
+    async def test_reports_lost_lease(self):
+        db = AsyncMock()
+        db.execute.return_value = MagicMock(rowcount=0)
+        assert await _make_dao().save_outcome(db, _make_row()) is False
+
+
+class TestGetUndeliveredEmails:
+    async def test_selects_unsent_rows_for_route_and_normalises(self):
+        mock_result = MagicMock()
+        mock_result.scalars.return_value.all.return_value = [" Jane@Example.com", None]
+        db = AsyncMock()
+        db.execute.return_value = mock_result
+
+        emails = await _make_dao().get_undelivered_emails(db, WebhookRoute.CUSTOMER_NEW)
+
+        assert emails == {"jane@example.com"}
+        stmt = db.execute.call_args[0][0]
+        sql = str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+        assert "klaviyo_outbox.route = 'customer_new'" in sql
+        assert "klaviyo_outbox.status != 'SENT'" in sql
+
+
+class TestMarkStatus:
+    def test_mark_sent(self):
+        row = _make_row()
+        _make_dao().mark_sent(row)
+        assert row.status == OutboxStatus.SENT
+        assert row.attempts == 1
+        assert row.sent_at is not None
+
+    def test_mark_failed_backs_off_while_attempts_remain(self):
+        row = _make_row()
+        row.status = OutboxStatus.IN_PROGRESS
+        before = datetime.now(timezone.utc)
+        _make_dao().mark_failed(row, "timeout", max_attempts=5)
+        assert row.status == OutboxStatus.PENDING
+        assert row.attempts == 1
+        assert row.last_error == "timeout"
+        assert row.available_at > before
+
+    def test_mark_failed_gives_up_at_max_attempts(self):
+        row = _make_row(attempts=4)
+        _make_dao().mark_failed(row, "timeout", max_attempts=5)
+        assert row.status == OutboxStatus.FAILED
+        assert row.attempts == 5
+
+    def test_mark_failed_rejected_is_final(self):
+        row = _make_row()
+        _make_dao().mark_failed(row, "422 bad email", max_attempts=5, retryable=False)
+        assert row.status == OutboxStatus.FAILED
+        assert row.attempts == 1
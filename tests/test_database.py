@@ -0,0 +1,69 @@
+"""Tests for app/core/database.py — engine options and read-replica session routing."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from fastapi.routing import APIRoute
+
+from app.core import database
+from app.core.config import Settings
+
+
+def _dependencies(route: APIRoute) -> set:
+    return {d.call for d in route.dependant.dependencies}
+
+
+class TestReadReplica:
+    def test_reads_share_the_primary_when_no_replica_is_configured(self):
+        assert database.read_engine is database.engine
+
+    def test_replica_url_is_normalised(self):
+        settings = Settings(READ_DATABASE_URL="postgres://reader@replica/db")
+        assert settings.SQLALCHEMY_READ_DATABASE_URI == "postgresql://reader@replica/db"
+        assert Settings(READ_DATABASE_URL="").SQLALCHEMY_READ_DATABASE_URI is None
+
+    async def test_get_read_db_yields_a_read_session(self):
+        session = AsyncMock()
+        ctx = AsyncMock()
+        ctx.__aenter__.return_value = session
+        with patch("app.core.database.read_session", MagicMock(return_value=ctx)):
+            assert [s async for s in database.get_read_db()] == [session]
+
+    async def test_mcp_requests_use_the_mcp_pools(self):
+        from app.core.surface import MCP, current_surface
+
+        sessions = {
+            name: MagicMock(return_value=name)
+            for name in ("async_session", "read_session", "mcp_session", "mcp_read_session")
+        }
+        with patch.multiple("app.core.database", **sessions):
+            assert (database.open_session(), database.open_session(read=True)) == ("async_session", "read_session")
+            token = current_surface.set(MCP)
+            try:
+                assert (database.open_session(), database.open_session(read=True)) == ("mcp_session", "mcp_read_session")
+            finally:
+                current_surface.reset(token)
+
+    def test_mcp_pool_is_separate_from_the_webhook_pool(self):
+        assert database.mcp_engine is not database.engine
+        assert database.mcp_engine.pool.size() == 3
+
+    def test_prepared_statement_cache_is_sized_from_settings(self):
+        with patch("app.core.database.create_async_engine") as mock_create, \
+                patch("app.core.database.get_settings", return_value=MagicMock(DB_PREPARED_STATEMENT_CACHE_SIZE=0)):
+            database._create_engine("postgresql://u@h/db")
+        url = mock_create.call_args[0][0]
+        assert url == "postgresql+asyncpg://u@h/db"
+        assert mock_create.call_args[1]["connect_args"] == {"prepared_statement_cache_size": 0}
+
+    def test_booking_reads_use_the_read_session_and_webhooks_the_primary(self):
+        from app.main import app
+
+        routes = [r for r in app.routes if isinstance(r, APIRoute) and r.path.startswith("/booking")]
+        for route in routes:
+            deps = _dependencies(route)
+            if "GET" in route.methods:
+                assert database.get_db not in deps, route.path
+                if route.path != "/booking/export":
+                    assert database.get_read_db in deps, route.path
+            else:
+                assert database.get_db in deps and database.get_read_db not in deps, route.path
@@ -1,11 +1,16 @@
 """Tests for app/utils/email_service.py — Gmail email sending helpers."""
 
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
+from urllib.parse import parse_qs
 
+import httpx
 import pytest
 
+from app.utils import email_service
 from app.utils.email_service import (
+    GMAIL_SEND_URL,
     _send_notification,
+    build_gmail_service,
     send_completed_bookings_email,
     send_email,
     send_error_email,
@@ -20,10 +25,10 @@ from app.utils.email_service import (
 
 
 class TestSendEmail:
-    def test_suppressed_in_testing_mode(self):
+    async def test_suppressed_in_testing_mode(self):
         """In testing mode no Gmail call should be made."""
-        with patch("app.utils.email_service._get_gmail_service") as mock_gmail:
-            send_email(
+        with patch("app.utils.email_service._post_message") as mock_gmail:
+            await send_email(
                 subject="Test",
                 sender="noreply@example.com",
                 recipients=["user@example.com"],
@@ -31,10 +36,10 @@ class TestSendEmail:
             )
         mock_gmail.assert_not_called()
 
-    def test_suppressed_logs_message(self, caplog):
+    async def test_suppressed_logs_message(self, caplog):
         import logging
         with caplog.at_level(logging.DEBUG, logger="app.utils.email_service"):
-            send_email(
+            await send_email(
                 subject="Test Subject",
                 sender="noreply@example.com",
                 recipients=["user@example.com"],
@@ -43,22 +48,122 @@ class TestSendEmail:
         assert "suppressed" in caplog.text.lower() or "testing" in caplog.text.lower()
 
 
+# ---------------------------------------------------------------------------
+# Gmail client construction
+# ---------------------------------------------------------------------------
+
+
+class TestGmailServiceCache:
+    def test_build_uses_bundled_discovery_document(self):
+        with (
+            patch("google.oauth2.service_account.Credentials.from_service_account_info") as mock_creds,
+            patch("googleapiclient.discovery.build") as mock_build,
+        ):
+            build_gmail_service({"type": "service_account"}, "noreply@example.com")
+        _, kwargs = mock_build.call_args
+        assert kwargs["static_discovery"] is True
+        assert kwargs["cache_discovery"] is False
+        assert mock_creds.call_args[1]["subject"] == "noreply@example.com"
+
+
+
+# ---------------------------------------------------------------------------
+# Async REST sender
+# ---------------------------------------------------------------------------
+
+
+@pytest.fixture
+def gmail_api():
+    """Route the shared AsyncClient to a fake token + send endpoint."""
+    calls = {"token": 0, "token_forms": [], "send": [], "send_status": [200]}
+
+    def handler(request):
+        if request.url.path == "/token":
+            calls["token"] += 1
+            calls["token_forms"].append(parse_qs(request.read().decode()))
+            return httpx.Response(200, json={"access_token": f"tok{calls['token']}", "expires_in": 3600})
+        calls["send"].append(request)
+        status = calls["send_status"].pop(0) if len(calls["send_status"]) > 1 else calls["send_status"][0]
+        return httpx.Response(status, json={})
+
+    settings = MagicMock(testing=False, FROM_ADDRESS="noreply@example.com")
+    email_service._access_token.update(token=None, expires_at=0.0)
+    email_service._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    with (
+        patch("app.utils.email_service.get_settings", return_value=settings),
+        patch(
+            "app.utils.email_service._service_account_info",
+            return_value={"client_email": "sa@example.com", "token_uri": "https://oauth2.example.com/token"},
+        ),
+        patch("app.utils.email_service._token_assertion", return_value="signed.jwt"),
+    ):
+        yield calls
+    email_service._client = None
+    email_service._access_token.update(token=None, expires_at=0.0)
+
+
+class TestAsyncSender:
+    async def test_posts_raw_message_with_bearer_token(self, gmail_api):
+        await send_email("S", ("M2M", "noreply@example.com"), ["a@example.com"], "<p>x</p>")
+
+        request = gmail_api["send"][0]
+        assert str(request.url) == GMAIL_SEND_URL
+        assert request.headers["Authorization"] == "Bearer tok1"
+        assert "raw" in request.read().decode()
+
+    async def test_token_request_posts_the_assertion_as_text(self, gmail_api):
+        await send_email("S", "noreply@example.com", ["a@example.com"], "<p>x</p>")
+        assert gmail_api["token_forms"] == [{
+            "grant_type": ["urn:ietf:params:oauth:grant-type:jwt-bearer"],
+            "assertion": ["signed.jwt"],
+        }]
+
+    def test_token_assertion_is_a_str(self):
+        with patch("google.auth.crypt.RSASigner.from_service_account_info"), \
+                patch("google.auth.jwt.encode", return_value=b"header.payload.sig"):
+            assertion = email_service._token_assertion({"client_email": "sa@example.com"}, "noreply@example.com")
+        assert assertion == "header.payload.sig"
+
+    async def test_access_token_is_cached_between_sends(self, gmail_api):
+        for _ in range(3):
+            await send_email("S", "noreply@example.com", ["a@example.com"], "<p>x</p>")
+        assert gmail_api["token"] == 1
+        assert len(gmail_api["send"]) == 3
+
+    async def test_unauthorised_send_refreshes_token_once(self, gmail_api):
+        gmail_api["send_status"] = [401, 200]
+        await send_email("S", "noreply@example.com", ["a@example.com"], "<p>x</p>")
+        assert gmail_api["token"] == 2
+        assert gmail_api["send"][1].headers["Authorization"] == "Bearer tok2"
+
+    async def test_send_failure_is_logged_not_raised(self, gmail_api, caplog):
+        gmail_api["send_status"] = [500]
+        await send_email("S", "noreply@example.com", ["a@example.com"], "<p>x</p>")
+        assert "Failed to send email" in caplog.text
+
+    async def test_close_email_client(self, gmail_api):
+        client = email_service._client
+        await email_service.close_email_client()
+        assert client.is_closed
+        assert email_service._client is None
+
+
 # ---------------------------------------------------------------------------
 # _send_notification
 # ---------------------------------------------------------------------------
 
 
 class TestSendNotification:
-    def test_accepts_string_recipient(self):
-        with patch("app.utils.email_service.send_email") as mock_send:
-            _send_notification("Subject", "Body", "user@example.com")
+    async def test_accepts_string_recipient(self):
+        with patch("app.utils.email_service.send_email", new_callable=AsyncMock) as mock_send:
+            await _send_notification("Subject", "Body", "user@example.com")
         mock_send.assert_called_once()
         _, kwargs = mock_send.call_args
         assert kwargs.get("recipients") == ["user@example.com"] or mock_send.call_args[0][2] == ["user@example.com"]
 
-    def test_accepts_list_recipient(self):
-        with patch("app.utils.email_service.send_email") as mock_send:
-            _send_notification("Subject", "Body", ["a@x.com", "b@x.com"])
+    async def test_accepts_list_recipient(self):
+        with patch("app.utils.email_service.send_email", new_callable=AsyncMock) as mock_send:
+            await _send_notification("Subject", "Body", ["a@x.com", "b@x.com"])
         mock_send.assert_called_once()
 
 
@@ -68,62 +173,62 @@ class TestSendNotification:
 
 
 class TestSendErrorEmail:
-    def test_calls_send_notification(self):
-        with patch("app.utils.email_service._send_notification") as mock_notify:
-            send_error_email("support@example.com", "Something went wrong")
+    async def test_calls_send_notification(self):
+        with patch("app.utils.email_service._send_notification", new_callable=AsyncMock) as mock_notify:
+            await send_error_email("support@example.com", "Something went wrong")
         mock_notify.assert_called_once()
         subject = mock_notify.call_args[0][0]
         assert "Error" in subject
 
-    def test_body_contains_error_message(self):
-        with patch("app.utils.email_service._send_notification") as mock_notify:
-            send_error_email("support@example.com", "DB connection failed")
+    async def test_body_contains_error_message(self):
+        with patch("app.utils.email_service._send_notification", new_callable=AsyncMock) as mock_notify:
+            await send_error_email("support@example.com", "DB connection failed")
         body = mock_notify.call_args[0][1]
         assert "DB connection failed" in body
 
 
 class TestSendMissingLocationEmail:
-    def test_calls_send_notification(self):
-        with patch("app.utils.email_service._send_notification") as mock_notify:
-            send_missing_location_email("support@example.com", "['3000']", 5, 1)
+    async def test_calls_send_notification(self):
+        with patch("app.utils.email_service._send_notification", new_callable=AsyncMock) as mock_notify:
+            await send_missing_location_email("support@example.com", "['3000']", 5, 1)
         mock_notify.assert_called_once()
 
-    def test_body_contains_counts(self):
-        with patch("app.utils.email_service._send_notification") as mock_notify:
-            send_missing_location_email("support@example.com", "['3000']", 5, 1)
+    async def test_body_contains_counts(self):
+        with patch("app.utils.email_service._send_notification", new_callable=AsyncMock) as mock_notify:
+            await send_missing_location_email("support@example.com", "['3000']", 5, 1)
         body = mock_notify.call_args[0][1]
         assert "5" in body
         assert "1" in body
 
 
 class TestSendUpdatedLocationsEmail:
-    def test_calls_send_notification(self):
-        with patch("app.utils.email_service._send_notification") as mock_notify:
-            send_updated_locations_email("support@example.com", 10, 8, 2, 3)
+    async def test_calls_send_notification(self):
+        with patch("app.utils.email_service._send_notification", new_callable=AsyncMock) as mock_notify:
+            await send_updated_locations_email("support@example.com", 10, 8, 2, 3)
         mock_notify.assert_called_once()
 
-    def test_body_contains_counts(self):
-        with patch("app.utils.email_service._send_notification") as mock_notify:
-            send_updated_locations_email("support@example.com", 10, 8, 2, 3)
+    async def test_body_contains_counts(self):
+        with patch("app.utils.email_service._send_notification", new_callable=AsyncMock) as mock_notify:
+            await send_updated_locations_email("support@example.com", 10, 8, 2, 3)
         body = mock_notify.call_args[0][1]
         assert "10" in body
         assert "8" in body
 
 
 class TestSendCompletedBookingsEmail:
-    def test_calls_send_notification(self):
-        with patch("app.utils.email_service._send_notification") as mock_notify:
-            send_completed_bookings_email("support@example.com", 12, 15, "AEST")
+    async def test_calls_send_notification(self):
+        with patch("app.utils.email_service._send_notification", new_callable=AsyncMock) as mock_notify:
+            await send_completed_bookings_email("support@example.com", 12, 15, "AEST")
         mock_notify.assert_called_once()
 
-    def test_body_contains_timezone(self):
-        with patch("app.utils.email_service._send_notification") as mock_notify:
-            send_completed_bookings_email("support@example.com", 12, 15, "AEST")
+    async def test_body_contains_timezone(self):
+        with patch("app.utils.email_service._send_notification", new_callable=AsyncMock) as mock_notify:
+            await send_completed_bookings_email("support@example.com", 12, 15, "AEST")
         body = mock_notify.call_args[0][1]
         assert "AEST" in body
 
-    def test_subject_contains_count(self):
-        with patch("app.utils.email_service._send_notification") as mock_notify:
-            send_completed_bookings_email("support@example.com", 12, 15, "AEST")
+    async def test_subject_contains_count(self):
+        with patch("app.utils.email_service._send_notification", new_callable=AsyncMock) as mock_notify:
+            await send_completed_bookings_email("support@example.com", 12, 15, "AEST")
         subject = mock_notify.call_args[0][0]
         assert "12" in subject
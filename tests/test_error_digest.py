@@ -0,0 +1,54 @@
+"""Tests for app/utils/error_digest.py — error fingerprinting and digest formatting."""
+
+from app.utils.error_digest import ErrorDigest, format_digest
+
+
+class TestErrorDigest:
+    def test_repeats_are_counted_under_one_fingerprint(self):
+        digest = ErrorDigest()
+        for i in range(50):
+            digest.record("OperationalError", "/booking/search", f"conn refused {i}")
+        digest.record("ValueError", "/booking/search", "bad date")
+
+        entries, overflow = digest.drain()
+        assert overflow == 0
+        assert [(e["kind"], e["count"]) for e in entries] == [
+            ("OperationalError", 50), ("ValueError", 1),
+        ]
+        assert entries[0]["message"] == "conn refused 49"
+
+    def test_same_type_on_other_route_is_separate(self):
+        digest = ErrorDigest()
+        digest.record("KeyError", "/a", "x")
+        digest.record("KeyError", "/b", "x")
+        assert len(digest) == 2
+
+    def test_drain_resets(self):
+        digest = ErrorDigest()
+        digest.record("KeyError", "/a", "x")
+        digest.drain()
+        assert digest.drain() == ([], 0)
+
+    def test_distinct_fingerprints_beyond_limit_count_as_overflow(self):
+        digest = ErrorDigest(max_entries=2)
+        for route in ("/a", "/b", "/c", "/d"):
+            digest.record("KeyError", route, "x")
+        entries, overflow = digest.drain()
+        assert len(entries) == 2
+        assert overflow == 2
+
+
+class TestFormatDigest:
+    def test_body_lists_counts_and_first_detail(self):
+        digest = ErrorDigest()
+        digest.record("ValueError", "/booking/new", "bad value", "Traceback ...")
+        digest.record("ValueError", "/booking/new", "bad value again", "ignored")
+        body = format_digest(*digest.drain())
+
+        assert body.startswith("1 distinct errors, 2 occurrences")
+        assert "[2x] ValueError on /booking/new" in body
+        assert "Traceback ..." in body
+        assert "ignored" not in body
+
+    def test_overflow_is_reported(self):
+        assert "plus 3 further errors not itemised" in format_digest([], 3)
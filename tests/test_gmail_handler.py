@@ -0,0 +1,167 @@
+"""Tests for app/utils/gmail_handler.py — queued, non-blocking error email handler."""
+
+import logging
+import sys
+import threading
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy import exc as sa_exc
+
+from app.utils.gmail_handler import QueuedGmailHandler
+
+
+class _RecordingHandler(logging.Handler):
+    """Target handler that records messages, optionally blocking until released."""
+
+    def __init__(self, gate: threading.Event | None = None):
+        super().__init__()
+        self.gate = gate
+        self.messages = []
+        self.closed = False
+
+    def emit(self, record):
+        if self.gate is not None:
+            self.gate.wait(5)
+        self.messages.append(record.getMessage())
+
+    def close(self):
+        self.closed = True
+        super().close()
+
+
+def _record(msg):
+    return logging.LogRecord("test", logging.ERROR, __file__, 1, msg, None, None)
+
+
+class TestQueuedGmailHandler:
+    def test_emit_does_not_wait_for_target(self):
+        gate = threading.Event()
+        target = _RecordingHandler(gate)
+        handler = QueuedGmailHandler(target, maxsize=10)
+        try:
+            start = time.monotonic()
+            handler.handle(_record("boom"))
+            assert time.monotonic() - start < 0.1
+        finally:
+            gate.set()
+            handler.close()
+        assert target.messages == ["boom"]
+
+    def test_close_flushes_queued_records(self):
+        target = _RecordingHandler()
+        handler = QueuedGmailHandler(target, maxsize=10)
+        for i in range(5):
+            handler.handle(_record(f"error {i}"))
+        handler.close()
+        assert target.messages == [f"error {i}" for i in range(5)]
+        assert target.closed
+
+    def test_overflow_is_dropped_and_summarised(self):
+        gate = threading.Event()
+        target = _RecordingHandler(gate)
+        handler = QueuedGmailHandler(target, maxsize=2)
+        handler.handle(_record("first"))
+        time.sleep(0.05)  # listener picks up "first" and blocks on the gate
+        for i in range(6):
+            handler.handle(_record(f"burst {i}"))
+        gate.set()
+        handler.close()
+
+        assert target.messages[0] == "first"
+        assert "4 further error log records were dropped (email queue full)" in target.messages
+        assert [m for m in target.messages if m.startswith("burst")] == ["burst 0", "burst 1"]
+        assert len(target.messages) == 4
+
+    def test_traceback_text_is_kept(self):
+        target = _RecordingHandler()
+        handler = QueuedGmailHandler(target, maxsize=10)
+        try:
+            raise ValueError("bad value")
+        except ValueError:
+            record = logging.LogRecord(
+                "test", logging.ERROR, __file__, 1, "failed", None, sys.exc_info(),
+            )
+        handler.handle(record)
+        handler.close()
+        assert "ValueError: bad value" in target.messages[0]
+
+    def test_digest_window_batches_repeats_into_one_email(self):
+        target = _RecordingHandler()
+        handler = QueuedGmailHandler(target, maxsize=100, digest_window=60)
+        for i in range(20):
+            handler.handle(_record(f"db down {i}"))
+        time.sleep(0.05)
+        assert target.messages == ["db down 0"]  # first alert sent, repeats wait for the window
+        handler.close()
+
+        assert len(target.messages) == 2
+        assert "[19x] test on " in target.messages[1]
+
+    def test_first_of_each_fingerprint_is_sent_immediately(self):
+        target = _RecordingHandler()
+        handler = QueuedGmailHandler(target, maxsize=100, digest_window=60)
+        try:
+            handler.handle(_record("first"))
+            handler.handle(_record("again"))
+            other = _record("elsewhere")
+            other.route = "/other"
+            handler.handle(other)
+            time.sleep(0.05)
+            assert target.messages == ["first", "elsewhere"]
+        finally:
+            handler.close()
+
+    def test_digest_fingerprints_by_exception_type_and_route(self):
+        target = _RecordingHandler()
+        handler = QueuedGmailHandler(target, maxsize=100, digest_window=60)
+        for route in ("/a", "/a", "/a", "/b", "/b"):
+            try:
+                raise KeyError("missing")
+            except KeyError:
+                record = logging.LogRecord(
+                    "app.main", logging.ERROR, __file__, 1, "failed", None, sys.exc_info(),
+                )
+            record.route = route
+            handler.handle(record)
+        handler.close()
+
+        assert len(target.messages) == 3
+        body = target.messages[-1]
+        assert "[2x] KeyError on /a" in body
+        assert "[1x] KeyError on /b" in body
+        assert "Traceback" in body
+
+    def test_digest_is_sent_when_window_elapses(self):
+        target = _RecordingHandler()
+        handler = QueuedGmailHandler(target, maxsize=100, digest_window=0.05)
+        try:
+            handler.handle(_record("boom"))
+            time.sleep(0.2)
+            assert len(target.messages) == 1
+        finally:
+            handler.close()
+        assert len(target.messages) == 1
+
+    def test_close_is_idempotent(self):
+        handler = QueuedGmailHandler(_RecordingHandler(), maxsize=1)
+        handler.close()
+        handler.close()
+
+    def test_ids_on_one_route_share_a_fingerprint(self, client, caplog):
+        error = sa_exc.OperationalError("SELECT", {}, Exception("connection reset"))
+        with patch(
+            "app.routers.bookings.get_booking_document", new_callable=AsyncMock, side_effect=error,
+        ):
+            with caplog.at_level(logging.ERROR, logger="app.main"):
+                for booking_id in (1, 2):
+                    assert client.get(f"/booking/{booking_id}").status_code == 503
+
+        records = [r for r in caplog.records if r.name == "app.main"]
+        assert [r.route for r in records] == ["/booking/{booking_id}"] * 2
+        handler = QueuedGmailHandler(_RecordingHandler(), maxsize=1)
+        try:
+            assert handler._fingerprint(records[0]) == handler._fingerprint(records[1])
+        finally:
+            handler.close()
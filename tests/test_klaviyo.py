@@ -5,15 +5,33 @@ from unittest.mock import AsyncMock, MagicMock, patch
 import pytest
 
 from app.utils.klaviyo import (
+    Klaviyo,
+    KlaviyoRateLimited,
+    KlaviyoRejected,
+    KlaviyoServerError,
     WebhookRoute,
     _clean_price,
+    _retry_after_seconds,
     _normalize_phone,
     check_klaviyo_profile,
+    klaviyo_handles,
+    known_profiles,
     notify_klaviyo,
     process_with_klaviyo,
+    seed_known_profiles,
+    sent_notifications,
 )
 
 
+@pytest.fixture(autouse=True)
+def _clear_klaviyo_caches():
+    known_profiles.clear()
+    sent_notifications.clear()
+    yield
+    known_profiles.clear()
+    sent_notifications.clear()
+
+
 # ---------------------------------------------------------------------------
 # _normalize_phone
 # ---------------------------------------------------------------------------
@@ -99,9 +117,9 @@ class TestWebhookRoute:
 # ---------------------------------------------------------------------------
 
 
-def _enabled_settings():
+def _enabled_settings(dedupe_window=86400):
     """Mock settings with Klaviyo enabled."""
-    return MagicMock(KLAVIYO_ENABLED=True)
+    return MagicMock(KLAVIYO_ENABLED=True, KLAVIYO_DEDUPE_WINDOW_SECONDS=dedupe_window)
 
 
 class TestNotifyKlaviyo:
@@ -112,6 +130,7 @@ class TestNotifyKlaviyo:
             patch("app.utils.klaviyo.Klaviyo") as MockKlaviyo,
         ):
             instance = AsyncMock()
+            instance.post_home_data.return_value = MagicMock(status_code=201)
             MockKlaviyo.return_value = instance
             await notify_klaviyo("House Clean", data)
         instance.post_home_data.assert_called_once_with(data)
@@ -123,6 +142,7 @@ class TestNotifyKlaviyo:
             patch("app.utils.klaviyo.Klaviyo") as MockKlaviyo,
         ):
             instance = AsyncMock()
+            instance.post_bond_data.return_value = MagicMock(status_code=201)
             MockKlaviyo.return_value = instance
             await notify_klaviyo("Bond Clean", data)
         instance.post_bond_data.assert_called_once_with(data)
@@ -138,6 +158,103 @@ class TestNotifyKlaviyo:
             await notify_klaviyo("House Clean", {"email": "x@x.com"})
         MockKlaviyo.assert_not_called()
 
+    async def test_failure_propagates_for_outbox_retry(self):
+        with (
+            patch("app.utils.klaviyo.get_settings", return_value=_enabled_settings()),
+            patch("app.utils.klaviyo.Klaviyo") as MockKlaviyo,
+        ):
+            instance = AsyncMock()
+            instance.post_home_data.side_effect = Exception("network error")
+            MockKlaviyo.return_value = instance
+            with pytest.raises(Exception, match="network error"):
+                await notify_klaviyo("House Clean", {"email": "x@x.com"})
+
+
+# ---------------------------------------------------------------------------
+# notify_klaviyo dedupe
+# ---------------------------------------------------------------------------
+
+
+class TestNotifyKlaviyoDedupe:
+    async def _notify_twice(self, first, second, settings=None):
+        with (
+            patch("app.utils.klaviyo.get_settings", return_value=settings or _enabled_settings()),
+            patch("app.utils.klaviyo.Klaviyo") as MockKlaviyo,
+        ):
+            instance = AsyncMock()
+            instance.post_home_data.return_value = instance.post_bond_data.return_value = MagicMock(status_code=201)
+            MockKlaviyo.return_value = instance
+            await notify_klaviyo(*first)
+            await notify_klaviyo(*second)
+        return instance
+
+    async def test_identical_notification_suppressed(self):
+        data = {"email": "jane@example.com", "final_price": "$143.00"}
+        instance = await self._notify_twice(("House Clean", data), ("House Clean", dict(data)))
+        instance.post_home_data.assert_called_once()
+
+    async def test_changed_payload_is_sent_again(self):
+        data = {"email": "jane@example.com", "final_price": "$143.00"}
+        changed = {**data, "final_price": "$160.00"}
+        instance = await self._notify_twice(("House Clean", data), ("House Clean", changed))
+        assert instance.post_home_data.call_count == 2
+
+    async def test_different_category_is_sent(self):
+        data = {"email": "jane@example.com"}
+        instance = await self._notify_twice(("House Clean", data), ("Bond Clean", data))
+        instance.post_home_data.assert_called_once()
+        instance.post_bond_data.assert_called_once()
+
+    async def test_zero_window_disables_dedupe(self):
+        data = {"email": "jane@example.com"}
+        instance = await self._notify_twice(
+            ("House Clean", data), ("House Clean", data), settings=_enabled_settings(0),
+        )
+        assert instance.post_home_data.call_count == 2
+
+    async def test_failed_send_not_remembered(self):
+        data = {"email": "jane@example.com"}
+        with (
+            patch("app.utils.klaviyo.get_settings", return_value=_enabled_settings()),
+            patch("app.utils.klaviyo.Klaviyo") as MockKlaviyo,
+        ):
+            instance = AsyncMock()
+            instance.post_home_data.side_effect = [Exception("boom"), MagicMock(status_code=201)]
+            MockKlaviyo.return_value = instance
+            with pytest.raises(Exception):
+                await notify_klaviyo("House Clean", data)
+            await notify_klaviyo("House Clean", data)
+        assert instance.post_home_data.call_count == 2
+
+
+    async def test_non_2xx_response_not_remembered(self):
+        data = {"email": "jane@example.com"}
+        with (
+            patch("app.utils.klaviyo.get_settings", return_value=_enabled_settings()),
+            patch("app.utils.klaviyo.Klaviyo") as MockKlaviyo,
+        ):
+            instance = AsyncMock()
+            instance.post_home_data.return_value = MagicMock(status_code=500)
+            MockKlaviyo.return_value = instance
+            await notify_klaviyo("House Clean", data)
+            await notify_klaviyo("House Clean", data)
+        assert instance.post_home_data.call_count == 2
+        assert not sent_notifications
+
+    async def test_rejected_send_is_raised_and_not_remembered(self):
+        client = AsyncMock()
+        client.post.return_value = MagicMock(status_code=400, headers={}, text="bad payload")
+        ctx = AsyncMock()
+        ctx.__aenter__.return_value = client
+        with (
+            patch("app.utils.klaviyo.get_settings", return_value=_enabled_settings()),
+            patch("app.utils.klaviyo.httpx.AsyncClient", return_value=ctx),
+            patch("app.utils.klaviyo.rate_limiter", MagicMock(acquire=AsyncMock())),
+        ):
+            with pytest.raises(KlaviyoRejected):
+                await notify_klaviyo("House Clean", {"email": "jane@example.com"})
+        assert not sent_notifications
+
 
 # ---------------------------------------------------------------------------
 # process_with_klaviyo
@@ -231,6 +348,20 @@ class TestProcessWithKlaviyo:
         mock_check.assert_not_called()
 
 
+class TestKlaviyoHandles:
+    def test_booking_routes_need_a_qualifying_category(self):
+        assert klaviyo_handles({"service_category": "House Clean"}, WebhookRoute.BOOKING_COMPLETED)
+        assert not klaviyo_handles({"service_category": "NDIS Clean"}, WebhookRoute.BOOKING_NEW)
+
+    def test_customer_routes_need_an_email(self):
+        assert klaviyo_handles({"email": "a@example.com"}, WebhookRoute.CUSTOMER_NEW)
+        assert not klaviyo_handles({}, WebhookRoute.CUSTOMER_UPDATED)
+
+    def test_ignored_routes_and_data(self):
+        assert not klaviyo_handles({"service_category": "House Clean"}, WebhookRoute.BOOKING_TEAM_CHANGED)
+        assert not klaviyo_handles("OK", WebhookRoute.BOOKING_NEW)
+
+
 # ---------------------------------------------------------------------------
 # check_klaviyo_profile
 # ---------------------------------------------------------------------------
@@ -258,3 +389,135 @@ class TestCheckKlaviyoProfile:
             MockKlaviyo.return_value = instance
             result = await check_klaviyo_profile("test@example.com")
         assert result == {"exists": False, "profile_id": None}
+
+
+# ---------------------------------------------------------------------------
+# Known-profile cache
+# ---------------------------------------------------------------------------
+
+
+class TestKnownProfileCache:
+    async def test_existing_profile_cached_after_first_check(self):
+        with (
+            patch("app.utils.klaviyo.get_settings", return_value=_enabled_settings()),
+            patch("app.utils.klaviyo.Klaviyo") as MockKlaviyo,
+        ):
+            instance = AsyncMock()
+            instance.check_profile.return_value = {"exists": True, "profile_id": "p1"}
+            MockKlaviyo.return_value = instance
+            first = await check_klaviyo_profile("Jane@Example.com")
+            second = await check_klaviyo_profile("jane@example.com ")
+        assert first == second == {"exists": True, "profile_id": "p1"}
+        instance.check_profile.assert_called_once()
+
+    async def test_missing_profile_not_cached(self):
+        with (
+            patch("app.utils.klaviyo.get_settings", return_value=_enabled_settings()),
+            patch("app.utils.klaviyo.Klaviyo") as MockKlaviyo,
+        ):
+            instance = AsyncMock()
+            instance.check_profile.return_value = {"exists": False, "profile_id": None}
+            MockKlaviyo.return_value = instance
+            await check_klaviyo_profile("new@example.com")
+            await check_klaviyo_profile("new@example.com")
+        assert instance.check_profile.call_count == 2
+
+    async def test_seeded_email_skips_api(self):
+        assert seed_known_profiles(["seed@example.com", None, ""]) == 1
+        with (
+            patch("app.utils.klaviyo.get_settings", return_value=_enabled_settings()),
+            patch("app.utils.klaviyo.Klaviyo") as MockKlaviyo,
+        ):
+            result = await check_klaviyo_profile("SEED@example.com")
+        assert result["exists"] is True
+        MockKlaviyo.assert_not_called()
+
+    async def test_created_profile_is_remembered(self):
+        response = MagicMock(status_code=201)
+        response.json.return_value = {"profile_id": "p9"}
+        with patch("app.utils.klaviyo.get_settings", return_value=_enabled_settings()):
+            k = Klaviyo()
+            with patch.object(k, "_request", new_callable=AsyncMock, return_value=response):
+                await k.create_klaviyo_profile({"email": "made@example.com"})
+        assert known_profiles["made@example.com"] == "p9"
+
+
+# ---------------------------------------------------------------------------
+# Rate limiting and Retry-After
+# ---------------------------------------------------------------------------
+
+
+class TestRetryAfterSeconds:
+    def test_delta_seconds(self):
+        assert _retry_after_seconds("7") == 7.0
+
+    def test_missing_uses_default(self):
+        assert _retry_after_seconds(None) == 1.0
+
+    def test_http_date_in_past_is_zero(self):
+        assert _retry_after_seconds("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+    def test_garbage_uses_default(self):
+        assert _retry_after_seconds("soon", default=2.0) == 2.0
+
+
+class TestKlaviyoRequestRateLimit:
+    def _client(self, *responses):
+        client = AsyncMock()
+        client.get.side_effect = list(responses)
+        ctx = AsyncMock()
+        ctx.__aenter__.return_value = client
+        return client, ctx
+
+    async def test_429_pauses_limiter_and_retries(self):
+        throttled = MagicMock(status_code=429, headers={"Retry-After": "3"})
+        ok = MagicMock(status_code=200, headers={})
+        client, ctx = self._client(throttled, ok)
+        limiter = MagicMock(acquire=AsyncMock())
+        with (
+            patch("app.utils.klaviyo.httpx.AsyncClient", return_value=ctx),
+            patch("app.utils.klaviyo.rate_limiter", limiter),
+        ):
+            res = await Klaviyo()._request("get", "/profile/check")
+        assert res is ok
+        limiter.pause.assert_called_once_with(3.0)
+        assert limiter.acquire.call_count == 2
+
+    async def test_persistent_429_gives_up(self):
+        throttled = MagicMock(status_code=429, headers={"Retry-After": "0"})
+        client, ctx = self._client(throttled, throttled, throttled)
+        limiter = MagicMock(acquire=AsyncMock())
+        with (
+            patch("app.utils.klaviyo.httpx.AsyncClient", return_value=ctx),
+            patch("app.utils.klaviyo.rate_limiter", limiter),
+        ):
+            with pytest.raises(Exception) as exc_info:
+                await Klaviyo()._request("get", "/profile/check")
+        assert client.get.call_count == 3
+        assert isinstance(exc_info.value.last_attempt.exception(), KlaviyoRateLimited)
+
+    async def test_server_error_is_retried_then_raised(self):
+        failing = MagicMock(status_code=503, headers={}, text="unavailable")
+        client, ctx = self._client(failing, failing, failing)
+        with (
+            patch("app.utils.klaviyo.httpx.AsyncClient", return_value=ctx),
+            patch("app.utils.klaviyo.rate_limiter", MagicMock(acquire=AsyncMock())),
+            patch("app.utils.klaviyo._backoff", return_value=0),
+        ):
+            with pytest.raises(Exception) as exc_info:
+                await Klaviyo()._request("get", "/profile/check")
+        assert client.get.call_count == 3
+        assert isinstance(exc_info.value.last_attempt.exception(), KlaviyoServerError)
+
+    async def test_client_error_is_raised_without_retry(self):
+        rejected = MagicMock(status_code=422, headers={}, text="bad email")
+        client, ctx = self._client(rejected)
+        with (
+            patch("app.utils.klaviyo.httpx.AsyncClient", return_value=ctx),
+            patch("app.utils.klaviyo.rate_limiter", MagicMock(acquire=AsyncMock())),
+        ):
+            with pytest.raises(KlaviyoRejected) as exc_info:
+                await Klaviyo()._request("get", "/profile/check")
+        assert client.get.call_count == 1
+        assert exc_info.value.status_code == 422
+        assert "bad email" in str(exc_info.value)
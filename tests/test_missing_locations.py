@@ -3,7 +3,7 @@ Tests for app/database/missing_locations.py.
 
 Covers:
 * ``find_missing_locations()`` — DB query + deduplication logic
-* ``main()``                   — orchestration: email gating, thread dispatch
+* ``main()``                   — orchestration: email gating, email dispatch
 
 The database and email service are fully mocked so no live connections are
 required.  ``pytest-asyncio`` is used for async test support.
@@ -25,6 +25,18 @@ def _make_booking(postcode: str | None) -> MagicMock:
     return b
 
 
+def _patch_iter(bookings, batch_size: int = 2):
+    """Patch iter_bookings_missing_locations to yield `bookings` in batches."""
+    async def fake_iter(db, chunk_size=1000):
+        for i in range(0, len(bookings), batch_size):
+            yield bookings[i:i + batch_size]
+
+    return patch(
+        "app.database.missing_locations.booking_dao.iter_bookings_missing_locations",
+        side_effect=fake_iter,
+    )
+
+
 # ---------------------------------------------------------------------------
 # find_missing_locations()
 # ---------------------------------------------------------------------------
@@ -40,11 +52,7 @@ class TestFindMissingLocations:
             patch(
                 "app.database.missing_locations.async_session",
             ) as mock_session_factory,
-            patch(
-                "app.database.missing_locations.booking_dao.get_bookings_missing_locations",
-                new_callable=AsyncMock,
-                return_value=[],
-            ),
+            _patch_iter([]),
         ):
             # async_session() used as async context manager
             mock_ctx = AsyncMock()
@@ -70,11 +78,7 @@ class TestFindMissingLocations:
 
         with (
             patch("app.database.missing_locations.async_session") as mock_session_factory,
-            patch(
-                "app.database.missing_locations.booking_dao.get_bookings_missing_locations",
-                new_callable=AsyncMock,
-                return_value=bookings,
-            ),
+            _patch_iter(bookings),
         ):
             mock_ctx = AsyncMock()
             mock_ctx.__aenter__.return_value = MagicMock()
@@ -98,11 +102,7 @@ class TestFindMissingLocations:
 
         with (
             patch("app.database.missing_locations.async_session") as mock_session_factory,
-            patch(
-                "app.database.missing_locations.booking_dao.get_bookings_missing_locations",
-                new_callable=AsyncMock,
-                return_value=bookings,
-            ),
+            _patch_iter(bookings),
         ):
             mock_ctx = AsyncMock()
             mock_ctx.__aenter__.return_value = MagicMock()
@@ -122,11 +122,7 @@ class TestFindMissingLocations:
 
         with (
             patch("app.database.missing_locations.async_session") as mock_session_factory,
-            patch(
-                "app.database.missing_locations.booking_dao.get_bookings_missing_locations",
-                new_callable=AsyncMock,
-                return_value=bookings,
-            ),
+            _patch_iter(bookings),
         ):
             mock_ctx = AsyncMock()
             mock_ctx.__aenter__.return_value = MagicMock()
@@ -159,15 +155,15 @@ class TestMain:
                 return_value={"total": 0, "postcodes": []},
             ),
             patch(
-                "app.database.missing_locations.asyncio.to_thread",
+                "app.database.missing_locations.send_missing_location_email",
                 new_callable=AsyncMock,
-            ) as mock_to_thread,
+            ) as mock_send,
         ):
             from app.database.missing_locations import main
 
             await main()
 
-        mock_to_thread.assert_not_called()
+        mock_send.assert_not_called()
 
     @pytest.mark.asyncio
     async def test_missing_locations_sends_email_with_correct_args(self):
@@ -181,9 +177,9 @@ class TestMain:
                 return_value={"total": 5, "postcodes": postcodes},
             ),
             patch(
-                "app.database.missing_locations.asyncio.to_thread",
+                "app.database.missing_locations.send_missing_location_email",
                 new_callable=AsyncMock,
-            ) as mock_to_thread,
+            ) as mock_send,
             patch(
                 "app.database.missing_locations.get_settings",
                 return_value=MagicMock(
@@ -196,11 +192,10 @@ class TestMain:
 
             await main()
 
-        # asyncio.to_thread(fn, *args) — assert correct positional args
-        mock_to_thread.assert_called_once()
-        call_args = mock_to_thread.call_args[0]  # positional args tuple
+        mock_send.assert_called_once()
+        call_args = mock_send.call_args[0]  # positional args tuple
 
-        _fn, toaddr, msg, total, n_postcodes = call_args
+        toaddr, msg, total, n_postcodes = call_args
         assert toaddr == "support@example.com"
         assert msg == str(postcodes)
         assert total == 5
@@ -217,9 +212,9 @@ class TestMain:
                 return_value={"total": 3, "postcodes": []},
             ),
             patch(
-                "app.database.missing_locations.asyncio.to_thread",
+                "app.database.missing_locations.send_missing_location_email",
                 new_callable=AsyncMock,
-            ) as mock_to_thread,
+            ) as mock_send,
             patch(
                 "app.database.missing_locations.get_settings",
                 return_value=MagicMock(
@@ -232,8 +227,8 @@ class TestMain:
 
             await main()
 
-        mock_to_thread.assert_called_once()
-        call_args = mock_to_thread.call_args[0]
-        _fn, _toaddr, _msg, total, n_postcodes = call_args
+        mock_send.assert_called_once()
+        call_args = mock_send.call_args[0]
+        _toaddr, _msg, total, n_postcodes = call_args
         assert total == 3
         assert n_postcodes == 0
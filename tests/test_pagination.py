@@ -0,0 +1,37 @@
+"""Tests for app/utils/pagination.py — keyset cursor encoding and page sizing."""
+
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+
+from app.utils.pagination import decode_cursor, encode_cursor, page_size
+
+
+class TestCursor:
+    def test_round_trip(self):
+        assert decode_cursor(encode_cursor(date(2024, 2, 15), 12345)) == (date(2024, 2, 15), 12345)
+
+    def test_round_trip_without_service_date(self):
+        assert decode_cursor(encode_cursor(None, 7)) == (None, 7)
+
+    def test_cursor_is_url_safe(self):
+        token = encode_cursor(date(2024, 2, 15), 12345)
+        assert all(c.isalnum() or c in "-_" for c in token)
+
+    @pytest.mark.parametrize("token", ["not-a-cursor", "", "W10", "WyJ4Il0"])
+    def test_malformed_cursor_is_400(self, token):
+        with pytest.raises(HTTPException) as exc_info:
+            decode_cursor(token)
+        assert exc_info.value.status_code == 400
+
+
+class TestPageSize:
+    def test_unpaged_without_limit_or_cursor(self):
+        assert page_size(None, None, 100, 500) is None
+
+    def test_cursor_alone_uses_default(self):
+        assert page_size(None, "abc", 100, 500) == 100
+
+    def test_limit_is_capped_at_maximum(self):
+        assert page_size(10_000, None, 100, 500) == 500
@@ -0,0 +1,45 @@
+"""Tests for app/utils/rate_limit.py — token bucket refill, queueing, and pause."""
+
+import asyncio
+import time
+
+import pytest
+
+from app.utils.rate_limit import TokenBucket
+
+
+class TestTokenBucket:
+    async def test_burst_is_immediate(self):
+        bucket = TokenBucket(rate=1, capacity=5)
+        start = time.monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+        assert time.monotonic() - start < 0.05
+
+    async def test_waits_for_refill_when_empty(self):
+        bucket = TokenBucket(rate=50, capacity=1)
+        await bucket.acquire()
+        start = time.monotonic()
+        await bucket.acquire()
+        assert time.monotonic() - start >= 0.015
+
+    async def test_concurrent_callers_are_spread_at_rate(self):
+        bucket = TokenBucket(rate=100, capacity=1)
+        start = time.monotonic()
+        await asyncio.gather(*(bucket.acquire() for _ in range(5)))
+        # first token is free, four more at 10ms each
+        assert time.monotonic() - start >= 0.035
+
+    async def test_pause_blocks_until_elapsed(self):
+        bucket = TokenBucket(rate=1000, capacity=10)
+        bucket.pause(0.05)
+        start = time.monotonic()
+        await bucket.acquire()
+        assert time.monotonic() - start >= 0.045
+
+    async def test_zero_rate_disables_limiting(self):
+        bucket = TokenBucket(rate=0, capacity=1)
+        start = time.monotonic()
+        for _ in range(20):
+            await bucket.acquire()
+        assert time.monotonic() - start < 0.05
@@ -1,5 +1,6 @@
 """Tests for app/routers/bookings.py — all booking webhook and query endpoints."""
 
+from datetime import date
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
@@ -22,10 +23,6 @@ def _patch_update_table(return_value):
     )
 
 
-def _patch_klaviyo():
-    return patch("app.routers.bookings.process_with_klaviyo", new_callable=AsyncMock)
-
-
 # ---------------------------------------------------------------------------
 # POST /booking/new
 # ---------------------------------------------------------------------------
@@ -33,23 +30,30 @@ def _patch_klaviyo():
 
 class TestPostBookingNew:
     def test_returns_ok(self, client, auth_headers, booking_data):
-        with _patch_update_table(booking_data), _patch_klaviyo():
+        with _patch_update_table(booking_data):
             response = _post(client, "/booking/new", booking_data, auth_headers)
         assert response.status_code == 200
         assert response.json() == "OK"
 
     def test_internal_meeting_still_returns_ok(self, client, auth_headers):
         data = {"service_category": "Internal Meeting", "zip": "tbc"}
-        with _patch_update_table("OK"), _patch_klaviyo():
+        with _patch_update_table("OK"):
             response = _post(client, "/booking/new", data, auth_headers)
         assert response.status_code == 200
 
     def test_update_table_called_with_not_complete_status(self, client, auth_headers, booking_data):
-        with _patch_update_table(booking_data) as mock_update, _patch_klaviyo():
+        with _patch_update_table(booking_data) as mock_update:
             _post(client, "/booking/new", booking_data, auth_headers)
         _, kwargs = mock_update.call_args
         assert kwargs.get("status") == "NOT_COMPLETE" or mock_update.call_args[1].get("status") == "NOT_COMPLETE"
 
+    def test_klaviyo_route_passed_to_update_table(self, client, auth_headers, booking_data):
+        from app.utils.klaviyo import WebhookRoute
+
+        with _patch_update_table(booking_data) as mock_update:
+            _post(client, "/booking/new", booking_data, auth_headers)
+        assert mock_update.call_args[1].get("route") == WebhookRoute.BOOKING_NEW
+
 
 # ---------------------------------------------------------------------------
 # POST /booking/restored
@@ -58,7 +62,7 @@ class TestPostBookingNew:
 
 class TestPostBookingRestored:
     def test_returns_ok(self, client, auth_headers, booking_data):
-        with _patch_update_table(booking_data), _patch_klaviyo():
+        with _patch_update_table(booking_data):
             response = _post(client, "/booking/restored", booking_data, auth_headers)
         assert response.status_code == 200
         assert response.json() == "OK"
@@ -71,12 +75,12 @@ class TestPostBookingRestored:
 
 class TestPostBookingCompleted:
     def test_returns_ok(self, client, auth_headers, booking_data):
-        with _patch_update_table(booking_data), _patch_klaviyo():
+        with _patch_update_table(booking_data):
             response = _post(client, "/booking/completed", booking_data, auth_headers)
         assert response.status_code == 200
 
     def test_update_table_called_with_completed_status(self, client, auth_headers, booking_data):
-        with _patch_update_table(booking_data) as mock_update, _patch_klaviyo():
+        with _patch_update_table(booking_data) as mock_update:
             _post(client, "/booking/completed", booking_data, auth_headers)
         called_kwargs = mock_update.call_args[1]
         assert called_kwargs.get("status") == "COMPLETED"
@@ -89,18 +93,18 @@ class TestPostBookingCompleted:
 
 class TestPostBookingCancellation:
     def test_returns_ok(self, client, auth_headers, booking_data):
-        with _patch_update_table(booking_data), _patch_klaviyo():
+        with _patch_update_table(booking_data):
             response = _post(client, "/booking/cancellation", booking_data, auth_headers)
         assert response.status_code == 200
 
     def test_tbc_postcode_rejected_returns_ok(self, client, auth_headers):
         data = {"zip": "tbc", "service_category": "House Clean"}
-        with _patch_update_table("OK"), _patch_klaviyo():
+        with _patch_update_table("OK"):
             response = _post(client, "/booking/cancellation", data, auth_headers)
         assert response.status_code == 200
 
     def test_cancellation_datetime_injected(self, client, auth_headers, booking_data):
-        with _patch_update_table(booking_data) as mock_update, _patch_klaviyo():
+        with _patch_update_table(booking_data) as mock_update:
             _post(client, "/booking/cancellation", booking_data, auth_headers)
         # update_table should have been called with _cancellation_datetime in data
         called_data = mock_update.call_args[0][0]
@@ -114,7 +118,7 @@ class TestPostBookingCancellation:
 
 class TestPostBookingUpdated:
     def test_returns_ok(self, client, auth_headers, booking_data):
-        with _patch_update_table(booking_data), _patch_klaviyo():
+        with _patch_update_table(booking_data):
             response = _post(client, "/booking/updated", booking_data, auth_headers)
         assert response.status_code == 200
 
@@ -126,17 +130,23 @@ class TestPostBookingUpdated:
 
 class TestPostBookingTeamChanged:
     def test_returns_ok(self, client, auth_headers, booking_data):
-        with _patch_update_table(booking_data), _patch_klaviyo():
+        with _patch_update_table(booking_data):
             response = _post(client, "/booking/team_changed", booking_data, auth_headers)
         assert response.status_code == 200
 
     def test_is_restored_flag_set(self, client, auth_headers, booking_data):
         """team_changed must pass is_restored=True to skip customer upsert."""
-        with _patch_update_table(booking_data) as mock_update, _patch_klaviyo():
+        with _patch_update_table(booking_data) as mock_update:
             _post(client, "/booking/team_changed", booking_data, auth_headers)
         called_kwargs = mock_update.call_args[1]
         assert called_kwargs.get("is_restored") is True
 
+    def test_no_klaviyo_route(self, client, auth_headers, booking_data):
+        """Team changes never notify Klaviyo, so no outbox row is requested."""
+        with _patch_update_table(booking_data) as mock_update:
+            _post(client, "/booking/team_changed", booking_data, auth_headers)
+        assert mock_update.call_args[1].get("route") is None
+
 
 # ---------------------------------------------------------------------------
 # GET /booking (search)
@@ -164,6 +174,26 @@ class TestGetBookingSearch:
         response = client.get("/booking", headers=auth_headers)
         assert response.status_code == 422
 
+    def test_columnar_page(self, client, auth_headers):
+        page = {
+            "bookings": [{"booking_id": 1, "name": "Jane"}, {"booking_id": 2, "name": None}],
+            "next_cursor": None,
+        }
+        with patch("app.routers.bookings.search_bookings", new_callable=AsyncMock, return_value=page):
+            response = client.get(
+                "/booking",
+                params={
+                    "category": "House Clean", "date": "2024-02-15", "booking_status": "NOT_COMPLETE",
+                    "limit": 2, "response_mode": "columnar",
+                },
+                headers=auth_headers,
+            )
+        assert response.json() == {
+            "bookings": {"bi": [1, 2], "n": ["Jane", None]},
+            "next_cursor": None,
+            "keys": {"bi": "booking_id", "n": "name"},
+        }
+
 
 # ---------------------------------------------------------------------------
 # GET /booking/{booking_id}
@@ -191,6 +221,55 @@ class TestGetBookingDetails:
         response = client.get("/booking/99999", headers=auth_headers)
         assert response.status_code == 404
 
+    def _found(self, mock_db_session):
+        from app.models.booking import Booking
+
+        booking = MagicMock(spec=Booking)
+        booking.model_dump.return_value = {
+            "booking_id": 12345, "updated_at": "2024-02-15T10:00:00+10:00", "name": "Jane",
+        }
+        mock_result = MagicMock()
+        mock_result.scalars.return_value.first.return_value = booking
+        mock_db_session.execute.return_value = mock_result
+
+    def test_response_carries_etag(self, client, auth_headers, mock_db_session):
+        self._found(mock_db_session)
+        response = client.get("/booking/12345", headers=auth_headers)
+        assert response.json()["name"] == "Jane"
+        assert response.headers["etag"].startswith('"')
+
+    def test_matching_if_none_match_returns_304(self, client, auth_headers, mock_db_session):
+        self._found(mock_db_session)
+        etag = client.get("/booking/12345", headers=auth_headers).headers["etag"]
+
+        response = client.get("/booking/12345", headers={**auth_headers, "If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+    def test_stale_if_none_match_returns_body(self, client, auth_headers, mock_db_session):
+        self._found(mock_db_session)
+        response = client.get("/booking/12345", headers={**auth_headers, "If-None-Match": '"old"'})
+        assert response.status_code == 200
+
+    def test_compact_mode_by_query_or_header(self, client, auth_headers, mock_db_session):
+        self._found(mock_db_session)
+        full = client.get("/booking/12345", headers=auth_headers)
+        by_query = client.get("/booking/12345", params={"response_mode": "compact"}, headers=auth_headers)
+        by_header = client.get("/booking/12345", headers={**auth_headers, "X-Response-Mode": "compact"})
+
+        assert by_query.json() == by_header.json() == {
+            "keys": {"bi": "booking_id", "ua": "updated_at", "n": "name"},
+            "data": {"bi": 12345, "ua": "2024-02-15T10:00:00+10:00", "n": "Jane"},
+        }
+        assert by_query.headers["etag"] != full.headers["etag"]
+        assert by_query.headers["vary"] == "X-Response-Mode"
+
+    def test_unknown_mode_header_is_422(self, client, auth_headers, mock_db_session):
+        self._found(mock_db_session)
+        response = client.get("/booking/12345", headers={**auth_headers, "X-Response-Mode": "tiny"})
+        assert response.status_code == 422
+
 
 # ---------------------------------------------------------------------------
 # GET /booking/was_new_customer/{booking_id}
@@ -202,7 +281,7 @@ class TestGetWasNewCustomer:
         from app.models.booking import Booking
 
         booking = MagicMock(spec=Booking)
-        booking.was_new_customer = True
+        booking.model_dump.return_value = {"booking_id": 12345, "was_new_customer": True}
         mock_result = MagicMock()
         mock_result.scalars.return_value.first.return_value = booking
         mock_db_session.execute.return_value = mock_result
@@ -245,6 +324,167 @@ class TestGetSearchCompleted:
         response = client.get("/booking/search/completed", headers=auth_headers)
         assert response.status_code == 422
 
+    def test_limit_and_cursor_are_forwarded(self, client, auth_headers):
+        page = {"bookings": [{"booking_id": 1}], "next_cursor": "abc"}
+        with patch(
+            "app.routers.bookings.search_completed_bookings_by_service_date",
+            new_callable=AsyncMock,
+            return_value=page,
+        ) as mock_search:
+            response = client.get(
+                "/booking/search/completed",
+                params={"from": "2024-02-01", "to": "2024-02-28", "limit": 1, "cursor": "xyz"},
+                headers=auth_headers,
+            )
+        assert response.json() == page
+        assert mock_search.call_args[1] == {"limit": 1, "cursor": "xyz"}
+
+    def test_zero_limit_returns_422(self, client, auth_headers):
+        response = client.get(
+            "/booking/search/completed",
+            params={"from": "2024-02-01", "to": "2024-02-28", "limit": 0},
+            headers=auth_headers,
+        )
+        assert response.status_code == 422
+
+
+# ---------------------------------------------------------------------------
+# GET /booking/export
+# ---------------------------------------------------------------------------
+
+
+class TestGetExport:
+    def _fake_export(self, *chunks):
+        async def gen(fmt, **filters):
+            for chunk in chunks:
+                yield chunk
+        return gen
+
+    def test_streams_ndjson_by_default(self, client, auth_headers):
+        with patch(
+            "app.routers.bookings.export_bookings",
+            side_effect=self._fake_export('{"booking_id": 1}\n', '{"booking_id": 2}\n'),
+        ):
+            response = client.get("/booking/export", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        assert response.text.splitlines() == ['{"booking_id": 1}', '{"booking_id": 2}']
+
+    def test_csv_is_an_attachment(self, client, auth_headers):
+        with patch(
+            "app.routers.bookings.export_bookings",
+            side_effect=self._fake_export("booking_id\n", "1\n"),
+        ) as mock_export:
+            response = client.get(
+                "/booking/export",
+                params={"format": "csv", "booking_status": "completed", "from": "2024-02-01"},
+                headers=auth_headers,
+            )
+        assert response.headers["content-type"].startswith("text/csv")
+        assert 'filename="bookings.csv"' in response.headers["content-disposition"]
+        kwargs = mock_export.call_args[1]
+        assert kwargs["booking_status"] == "COMPLETED"
+        assert kwargs["from_date"] == date(2024, 2, 1)
+
+    def test_unknown_format_returns_422(self, client, auth_headers):
+        response = client.get("/booking/export", params={"format": "xml"}, headers=auth_headers)
+        assert response.status_code == 422
+
+
+# ---------------------------------------------------------------------------
+# GET /booking/stats
+# ---------------------------------------------------------------------------
+
+
+class TestGetStats:
+    def test_returns_groups(self, client, auth_headers):
+        payload = {"group_by": ["category"], "groups": [{"category": "Bond Clean", "count": 3, "final_price_sum": 150000}]}
+        with patch(
+            "app.routers.bookings.booking_stats", new_callable=AsyncMock, return_value=payload,
+        ) as mock_stats:
+            response = client.get(
+                "/booking/stats",
+                params={"group_by": "category", "booking_status": "completed", "from": "2024-01-01"},
+                headers=auth_headers,
+            )
+        assert response.status_code == 200
+        assert response.json() == payload
+        assert mock_stats.call_args[0][1] == "category"
+        kwargs = mock_stats.call_args[1]
+        assert kwargs["booking_status"] == "COMPLETED"
+        assert kwargs["from_date_str"] == "2024-01-01"
+
+    def test_is_not_routed_as_booking_id(self, client, auth_headers):
+        with patch(
+            "app.routers.bookings.booking_stats",
+            new_callable=AsyncMock,
+            return_value={"group_by": [], "groups": [{"count": 0, "final_price_sum": 0}]},
+        ):
+            response = client.get("/booking/stats", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["groups"] == [{"count": 0, "final_price_sum": 0}]
+
+
+# ---------------------------------------------------------------------------
+# GET /booking/query
+# ---------------------------------------------------------------------------
+
+
+class TestGetQuery:
+    def test_passes_typed_filters(self, client, auth_headers):
+        payload = {"fields": ["booking_id"], "bookings": [{"booking_id": 7}], "more": False}
+        with patch(
+            "app.routers.bookings.query_bookings", new_callable=AsyncMock, return_value=payload,
+        ) as mock_query:
+            response = client.get(
+                "/booking/query",
+                params={
+                    "limit": 5, "fields": "booking_id", "sort": "-created_at", "booking_status": "completed",
+                    "team": "Team A", "service_from": "2024-03-01", "created_to": "2024-03-31",
+                },
+                headers=auth_headers,
+            )
+        assert response.status_code == 200
+        assert response.json() == payload
+        args, kwargs = mock_query.call_args
+        assert args[1:] == (5, "booking_id", "-created_at")
+        assert kwargs["booking_status"] == "COMPLETED"
+        assert kwargs["team"] == "Team A"
+        assert kwargs["from_date"] == date(2024, 3, 1)
+        assert kwargs["start_created"] is None
+        assert kwargs["end_created"].date() in (date(2024, 3, 31), date(2024, 3, 30))
+
+    def test_limit_is_required(self, client, auth_headers):
+        response = client.get("/booking/query", headers=auth_headers)
+        assert response.status_code == 422
+
+    def test_bad_date_is_422(self, client, auth_headers):
+        response = client.get("/booking/query", params={"limit": 5, "service_from": "March"}, headers=auth_headers)
+        assert response.status_code == 422
+
+
+# ---------------------------------------------------------------------------
+# GET /booking/search/text
+# ---------------------------------------------------------------------------
+
+
+class TestGetSearchText:
+    def test_returns_ranked_matches(self, client, auth_headers):
+        matches = [{"booking_id": 5, "name": "J Smith", "score": 0.8}]
+        with patch(
+            "app.routers.bookings.search_bookings_text", new_callable=AsyncMock, return_value=matches,
+        ) as mock_search:
+            response = client.get(
+                "/booking/search/text", params={"q": "smith elm street", "limit": 3}, headers=auth_headers,
+            )
+        assert response.status_code == 200
+        assert response.json() == matches
+        assert mock_search.call_args[0][1:] == ("smith elm street", 3)
+
+    def test_short_query_is_422(self, client, auth_headers):
+        response = client.get("/booking/search/text", params={"q": "sm"}, headers=auth_headers)
+        assert response.status_code == 422
+
 
 # ---------------------------------------------------------------------------
 # GET /booking/service_date/search
@@ -1,9 +1,11 @@
-"""Tests for app/routers/customers.py — customer webhook endpoints."""
+"""Tests for app/routers/customers.py — customer webhook and search endpoints."""
 
 from unittest.mock import AsyncMock, patch
 
 import pytest
 
+from app.utils.klaviyo import WebhookRoute
+
 
 def _patch_create_or_update(return_value="OK"):
     return patch(
@@ -13,37 +15,47 @@ def _patch_create_or_update(return_value="OK"):
     )
 
 
-def _patch_klaviyo():
-    return patch("app.routers.customers.process_with_klaviyo", new_callable=AsyncMock)
-
-
 class TestPostCustomerNew:
     def test_returns_ok_for_valid_data(self, client, auth_headers, customer_data):
-        with _patch_create_or_update(), _patch_klaviyo():
+        with _patch_create_or_update() as mock_create:
             response = client.post("/customer/new", json=customer_data, headers=auth_headers)
         assert response.status_code == 200
         assert response.json() == "OK"
+        assert mock_create.call_args[1].get("route") == WebhookRoute.CUSTOMER_NEW
 
     def test_empty_body_missing_id_raises_422(self, client, auth_headers):
-        with _patch_klaviyo():
-            response = client.post("/customer/new", json={"email": "x@x.com"}, headers=auth_headers)
+        response = client.post("/customer/new", json={"email": "x@x.com"}, headers=auth_headers)
         assert response.status_code == 422
 
     def test_missing_id_raises_422(self, client, auth_headers):
         # Let the real service run; it should raise 422 for missing id
-        with _patch_klaviyo():
-            response = client.post("/customer/new", json={}, headers=auth_headers)
+        response = client.post("/customer/new", json={}, headers=auth_headers)
         assert response.status_code == 422
 
 
 class TestPostCustomerUpdated:
     def test_returns_ok_for_valid_data(self, client, auth_headers, customer_data):
-        with _patch_create_or_update(), _patch_klaviyo():
+        with _patch_create_or_update():
             response = client.post("/customer/updated", json=customer_data, headers=auth_headers)
         assert response.status_code == 200
         assert response.json() == "OK"
 
     def test_missing_id_raises_422(self, client, auth_headers):
-        with _patch_klaviyo():
-            response = client.post("/customer/updated", json={}, headers=auth_headers)
+        response = client.post("/customer/updated", json={}, headers=auth_headers)
+        assert response.status_code == 422
+
+
+class TestGetCustomerSearch:
+    def test_returns_ranked_matches(self, client, auth_headers):
+        matches = [{"customer_id": 7, "name": "Jane Smith", "score": 0.9}]
+        with patch(
+            "app.routers.customers.search_customers", new_callable=AsyncMock, return_value=matches,
+        ) as mock_search:
+            response = client.get("/customer/search", params={"q": "jane smith"}, headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json() == matches
+        assert mock_search.call_args[0][1:] == ("jane smith", 10)
+
+    def test_limit_is_capped(self, client, auth_headers):
+        response = client.get("/customer/search", params={"q": "jane", "limit": 500}, headers=auth_headers)
         assert response.status_code == 422
@@ -0,0 +1,40 @@
+"""Tests for app/routers/sql.py — POST /sql/query."""
+
+from unittest.mock import AsyncMock, patch
+
+from fastapi.routing import APIRoute
+
+from app.core.config import get_settings
+from app.core.database import get_read_db
+
+
+class TestPostSQLQuery:
+    def test_returns_rows(self, client, auth_headers, mock_db_session):
+        payload = {"columns": ["n"], "rows": [[42]], "truncated": False}
+        with patch(
+            "app.routers.sql.run_readonly_query", new_callable=AsyncMock, return_value=payload,
+        ) as mock_run:
+            response = client.post(
+                "/sql/query", json={"sql": "select count(*) as n from bookings"}, headers=auth_headers,
+            )
+        assert response.status_code == 200
+        assert response.json() == payload
+        assert mock_run.call_args[0] == (mock_db_session, "select count(*) as n from bookings", 100)
+
+    def test_disallowed_sql_is_422(self, client, auth_headers, mock_db_session):
+        with patch.object(get_settings(), "SQL_QUERY_ROLE", "m2m_sql_reader"):
+            response = client.post("/sql/query", json={"sql": "select pg_sleep(5)"}, headers=auth_headers)
+        assert response.status_code == 422
+        mock_db_session.execute.assert_not_called()
+
+    def test_disabled_until_a_role_is_configured(self, client, auth_headers, mock_db_session):
+        response = client.post("/sql/query", json={"sql": "select 1"}, headers=auth_headers)
+        assert response.status_code == 503
+        mock_db_session.execute.assert_not_called()
+
+    def test_runs_on_the_read_pool_and_lists_the_schema(self):
+        from app.main import app
+
+        route = next(r for r in app.routes if isinstance(r, APIRoute) and r.path == "/sql/query")
+        assert get_read_db in {d.call for d in route.dependant.dependencies}
+        assert "bookings(" in route.description and "_service_date" in route.description
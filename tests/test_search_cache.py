@@ -0,0 +1,88 @@
+"""Tests for app/services/search_cache.py — result caching and write-driven invalidation."""
+
+import time
+from datetime import date, datetime, timezone
+from unittest.mock import patch
+
+from app.services.search_cache import SearchCache, booking_scope
+
+
+def _cache():
+    return SearchCache(maxsize=16, ttl=60)
+
+
+class TestBookingScope:
+    def test_matches_category_status_and_created_range(self):
+        covers = booking_scope(
+            category="House Clean",
+            status="NOT_COMPLETE",
+            created=(datetime(2024, 1, 1, tzinfo=timezone.utc), datetime(2024, 1, 31, tzinfo=timezone.utc)),
+        )
+        data = {"service_category": "House Clean", "booking_status": "NOT_COMPLETE", "created_at": "2024-01-15T10:00:00Z"}
+        assert covers(data)
+        assert not covers({**data, "service_category": "Bond Clean"})
+        assert not covers({**data, "created_at": "2024-02-15T10:00:00Z"})
+
+    def test_service_date_range(self):
+        covers = booking_scope(status="COMPLETED", service_dates=(date(2024, 2, 1), date(2024, 2, 29)))
+        assert covers({"booking_status": "COMPLETED", "service_date": "2024-02-10"})
+        assert not covers({"booking_status": "COMPLETED", "service_date": "2024-03-10"})
+
+    def test_missing_or_unparseable_fields_count_as_match(self):
+        covers = booking_scope(
+            category="House Clean",
+            created=(datetime(2024, 1, 1, tzinfo=timezone.utc), datetime(2024, 1, 31, tzinfo=timezone.utc)),
+        )
+        assert covers({})
+        # naive vs aware comparison cannot be decided, so it invalidates
+        assert covers({"service_category": "House Clean", "created_at": "15/01/2024 10:00"})
+
+
+class TestSearchCache:
+    def test_get_returns_put_value(self):
+        cache = _cache()
+        cache.put("k", [{"booking_id": 1}], booking_scope())
+        assert cache.get("k") == [{"booking_id": 1}]
+
+    def test_zero_ttl_disables(self):
+        cache = SearchCache(maxsize=16, ttl=0)
+        cache.put("k", [], booking_scope())
+        assert cache.get("k") is None
+        assert cache.invalidate({"id": 1}) == 0
+
+    def test_write_to_contained_booking_invalidates(self):
+        cache = _cache()
+        cache.put("k", [{"booking_id": 7}], booking_scope(category="House Clean"))
+        # booking 7 moved to another category: no longer in scope, but it was in the result
+        assert cache.invalidate({"id": "7", "service_category": "Bond Clean"}) == 1
+        assert cache.get("k") is None
+
+    def test_write_in_scope_invalidates_page_envelope(self):
+        cache = _cache()
+        cache.put("k", {"bookings": [], "next_cursor": None}, booking_scope(category="House Clean"))
+        assert cache.invalidate({"id": "8", "service_category": "House Clean"}) == 1
+
+    def test_unrelated_write_keeps_entry(self):
+        cache = _cache()
+        cache.put("k", [{"booking_id": 7}], booking_scope(category="House Clean"))
+        cache.put("lookup", {"data": {"booking_id": 9}, "status": "found"}, booking_scope(email="a@example.com"))
+        assert cache.invalidate({"id": "8", "service_category": "Bond Clean", "email": "b@example.com"}) == 0
+        assert cache.get("k") == [{"booking_id": 7}]
+
+    def test_result_read_just_after_a_write_is_not_stored(self):
+        cache = SearchCache(maxsize=16, ttl=60, write_window=5)
+        cache.invalidate({"id": "7", "service_category": "Bond Clean"})
+        # a lagging replica may still return booking 7 as it was before the write
+        cache.put("k", [{"booking_id": 7}], booking_scope(category="House Clean"))
+        cache.put("scope", [], booking_scope(category="Bond Clean"))
+        cache.put("other", [{"booking_id": 9}], booking_scope(category="House Clean"))
+        assert cache.get("k") is None
+        assert cache.get("scope") is None
+        assert cache.get("other") == [{"booking_id": 9}]
+
+    def test_write_window_expires(self):
+        cache = SearchCache(maxsize=16, ttl=60, write_window=5)
+        cache.invalidate({"id": "7"})
+        with patch("app.services.search_cache.time.monotonic", return_value=time.monotonic() + 6):
+            cache.put("k", [{"booking_id": 7}], booking_scope())
+        assert cache.get("k") == [{"booking_id": 7}]
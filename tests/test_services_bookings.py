@@ -7,13 +7,20 @@ import pytest
 from fastapi import HTTPException
 from sqlalchemy import exc as sa_exc
 
+from app.core.surface import MCP, current_surface
 from app.services.bookings import (
+    booking_stats,
+    query_bookings,
+    search_bookings_text,
     get_booking_by_email_service_date,
     reject_booking,
     search_bookings,
     search_completed_bookings_by_service_date,
     update_table,
+    export_bookings,
 )
+from app.utils.klaviyo import WebhookRoute
+from app.utils.pagination import decode_cursor, encode_cursor
 
 
 # ---------------------------------------------------------------------------
@@ -148,6 +155,69 @@ class TestUpdateTable:
 
         assert result is data
 
+    async def test_route_stages_outbox_row_and_commits_it(self):
+        db = AsyncMock()
+        data = {
+            "id": "12345",
+            "is_first_recurring": "false",
+            "is_new_customer": "false",
+            "zip": "3000",
+            "service_category": "House Clean",
+            "customer": {"id": "1", "zip": "3000"},
+        }
+        with (
+            patch(
+                "app.services.bookings.booking_dao.create_update_booking",
+                new_callable=AsyncMock,
+            ),
+            patch(
+                "app.services.bookings.customer_dao.create_or_update_customer",
+                new_callable=AsyncMock,
+            ),
+            patch("app.services.bookings.klaviyo_outbox_dao") as mock_outbox,
+        ):
+            mock_outbox.ensure_committed = AsyncMock()
+            await update_table(data, db, status="COMPLETED", route=WebhookRoute.BOOKING_COMPLETED)
+
+        mock_outbox.enqueue.assert_called_once_with(db, data, WebhookRoute.BOOKING_COMPLETED)
+        mock_outbox.ensure_committed.assert_called_once_with(db, mock_outbox.enqueue.return_value)
+
+    async def test_route_klaviyo_ignores_writes_no_outbox_row(self):
+        db = AsyncMock()
+        data = {"id": "12345", "zip": "3000", "service_category": "NDIS Clean", "customer": {"id": "1"}}
+        with (
+            patch(
+                "app.services.bookings.booking_dao.create_update_booking",
+                new_callable=AsyncMock,
+            ),
+            patch(
+                "app.services.bookings.customer_dao.create_or_update_customer",
+                new_callable=AsyncMock,
+            ),
+            patch("app.services.bookings.klaviyo_outbox_dao") as mock_outbox,
+        ):
+            await update_table(data, db, route=WebhookRoute.BOOKING_NEW)
+
+        mock_outbox.enqueue.assert_not_called()
+
+    async def test_no_route_writes_no_outbox_row(self):
+        db = AsyncMock()
+        data = {"id": "12345", "zip": "3000", "customer": {"id": "1"}}
+        with (
+            patch(
+                "app.services.bookings.booking_dao.create_update_booking",
+                new_callable=AsyncMock,
+            ),
+            patch(
+                "app.services.bookings.customer_dao.create_or_update_customer",
+                new_callable=AsyncMock,
+            ),
+            patch("app.services.bookings.klaviyo_outbox_dao") as mock_outbox,
+        ):
+            await update_table(data, db, is_restored=True)
+
+        mock_outbox.enqueue.assert_not_called()
+
 
 # ---------------------------------------------------------------------------
 # search_bookings
@@ -247,6 +317,90 @@ class TestSearchCompletedBookingsByServiceDate:
         assert exc_info.value.status_code == 503
 
 
+class TestSearchPaging:
+    def _rows(self, n):
+        return [
+            MagicMock(
+                booking_id=i, service_date=date(2024, 2, i), service_category="House Clean",
+                name=f"Customer {i}", location="Melbourne",
+            )
+            for i in range(1, n + 1)
+        ]
+
+    async def test_requests_one_extra_row_and_returns_next_cursor(self):
+        db = AsyncMock()
+        with patch(
+            "app.services.bookings.booking_dao.get_by_date_range",
+            new_callable=AsyncMock,
+            return_value=self._rows(3),
+        ) as mock_dao:
+            page = await search_bookings(db, "House Clean", "s", "e", "NOT_COMPLETE", limit=2)
+
+        assert mock_dao.call_args[1]["limit"] == 3
+        assert [b["booking_id"] for b in page["bookings"]] == [1, 2]
+        assert decode_cursor(page["next_cursor"]) == (date(2024, 2, 2), 2)
+
+    async def test_last_page_has_no_cursor(self):
+        db = AsyncMock()
+        with patch(
+            "app.services.bookings.booking_dao.get_by_date_range",
+            new_callable=AsyncMock,
+            return_value=self._rows(2),
+        ):
+            page = await search_bookings(db, "House Clean", "s", "e", "NOT_COMPLETE", limit=2)
+        assert page["next_cursor"] is None
+
+    async def test_cursor_is_passed_to_dao_as_key(self):
+        db = AsyncMock()
+        with patch(
+            "app.services.bookings.booking_dao.completed_bookings_by_service_date",
+            new_callable=AsyncMock,
+            return_value=[],
+        ) as mock_dao:
+            page = await search_completed_bookings_by_service_date(
+                db, "2024-02-01", "2024-02-28", cursor=encode_cursor(date(2024, 2, 10), 55),
+            )
+        assert mock_dao.call_args[1]["after"] == (date(2024, 2, 10), 55)
+        assert page == {"bookings": [], "next_cursor": None}
+
+    async def test_limit_above_server_maximum_is_capped(self):
+        db = AsyncMock()
+        with patch(
+            "app.services.bookings.booking_dao.get_by_date_range",
+            new_callable=AsyncMock,
+            return_value=[],
+        ) as mock_dao:
+            await search_bookings(db, "House Clean", "s", "e", "NOT_COMPLETE", limit=1_000_000)
+        assert mock_dao.call_args[1]["limit"] == 501
+
+    async def test_unpaged_mcp_call_gets_default_page(self):
+        db = AsyncMock()
+        token = current_surface.set(MCP)
+        try:
+            with patch(
+                "app.services.bookings.booking_dao.completed_bookings_by_service_date",
+                new_callable=AsyncMock,
+                return_value=self._rows(3),
+            ) as mock_dao:
+                page = await search_completed_bookings_by_service_date(db, "2024-02-01", "2024-02-28")
+        finally:
+            current_surface.reset(token)
+        assert mock_dao.call_args[1]["limit"] == 101
+        assert page["next_cursor"] is None
+        assert len(page["bookings"]) == 3
+
+    async def test_unpaged_api_call_stays_a_list(self):
+        db = AsyncMock()
+        with patch(
+            "app.services.bookings.booking_dao.get_by_date_range",
+            new_callable=AsyncMock,
+            return_value=self._rows(3),
+        ) as mock_dao:
+            result = await search_bookings(db, "House Clean", "s", "e", "NOT_COMPLETE")
+        assert mock_dao.call_args[1]["limit"] is None
+        assert len(result) == 3
+
+
 # ---------------------------------------------------------------------------
 # get_booking_by_email_service_date
 # ---------------------------------------------------------------------------
@@ -289,3 +443,231 @@ class TestGetBookingByEmailServiceDate:
 
         assert result["status"] == "not found"
         assert result["data"] == {}
+
+
+# ---------------------------------------------------------------------------
+# export_bookings
+# ---------------------------------------------------------------------------
+
+
+def _patch_export_source(partitions):
+    async def fake_partitions(db, stmt, chunk_size):
+        for rows in partitions:
+            yield rows
+
+    mock_ctx = AsyncMock()
+    mock_ctx.__aenter__.return_value = AsyncMock()
+    return (
+        patch("app.services.bookings.open_session", return_value=mock_ctx),
+        patch("app.services.bookings.booking_dao.stream_partitions", side_effect=fake_partitions),
+        patch(
+            "app.services.bookings.booking_dao.export_query",
+            return_value=MagicMock(selected_columns=MagicMock(keys=lambda: ["booking_id", "service_date"])),
+        ),
+    )
+
+
+class TestExportBookings:
+    async def test_ndjson_yields_one_chunk_per_partition(self):
+        session, partitions, query = _patch_export_source([
+            [(1, date(2024, 2, 1)), (2, None)],
+            [(3, date(2024, 2, 3))],
+        ])
+        with session, partitions, query:
+            chunks = [c async for c in export_bookings("ndjson")]
+
+        assert len(chunks) == 2
+        assert chunks[0].splitlines() == [
+            '{"booking_id": 1, "service_date": "2024-02-01"}',
+            '{"booking_id": 2, "service_date": null}',
+        ]
+
+    async def test_csv_starts_with_header(self):
+        session, partitions, query = _patch_export_source([[(1, date(2024, 2, 1))]])
+        with session, partitions, query:
+            body = "".join([c async for c in export_bookings("csv")])
+        assert body.splitlines() == ["booking_id,service_date", "1,2024-02-01"]
+
+    async def test_filters_are_passed_to_query(self):
+        session, partitions, query = _patch_export_source([])
+        with session, partitions, query as mock_query:
+            [c async for c in export_bookings("ndjson", booking_status="COMPLETED")]
+        mock_query.assert_called_once_with(booking_status="COMPLETED")
+
+
+# ---------------------------------------------------------------------------
+# search result cache
+# ---------------------------------------------------------------------------
+
+
+class TestSearchCaching:
+    def _patch_cache(self):
+        from app.services.search_cache import SearchCache
+
+        return patch("app.services.bookings.search_cache", SearchCache(maxsize=16, ttl=60))
+
+    async def test_repeat_search_is_served_from_cache(self):
+        db = AsyncMock()
+        row = MagicMock(service_category="House Clean", name="Jane", location="Melbourne", booking_id=1)
+        with (
+            self._patch_cache(),
+            patch(
+                "app.services.bookings.booking_dao.get_by_date_range",
+                new_callable=AsyncMock,
+                return_value=[row],
+            ) as mock_dao,
+        ):
+            first = await search_bookings(db, "House Clean", "s", "e", "NOT_COMPLETE")
+            second = await search_bookings(db, "House Clean", "s", "e", "NOT_COMPLETE")
+
+        assert first == second
+        mock_dao.assert_awaited_once()
+
+    async def test_update_table_invalidates_matching_lookup(self):
+        db = AsyncMock()
+        with (
+            self._patch_cache(),
+            patch(
+                "app.services.bookings.booking_dao.get_by_booking_email_service_date_range",
+                new_callable=AsyncMock,
+                return_value=None,
+            ) as mock_lookup,
+            patch("app.services.bookings.booking_dao.create_update_booking", new_callable=AsyncMock),
+            patch("app.services.bookings.customer_dao.create_or_update_customer", new_callable=AsyncMock),
+        ):
+            await get_booking_by_email_service_date(db, "jane@example.com", "2024-02-15")
+            await update_table({"id": "5", "email": "jane@example.com", "customer": {}}, db)
+            await get_booking_by_email_service_date(db, "jane@example.com", "2024-02-15")
+
+        assert mock_lookup.await_count == 2
+
+
+# ---------------------------------------------------------------------------
+# booking_stats
+# ---------------------------------------------------------------------------
+
+
+def _stats_row(**values):
+    return MagicMock(_mapping=values)
+
+
+class TestBookingStats:
+    async def test_groups_are_returned_as_dicts(self):
+        rows = [
+            _stats_row(month=date(2024, 1, 1), count=12, final_price_sum=345600),
+            _stats_row(month=date(2024, 2, 1), count=9, final_price_sum=281000),
+        ]
+        with patch(
+            "app.services.bookings.booking_dao.aggregate", new_callable=AsyncMock, return_value=rows,
+        ) as mock_agg:
+            result = await booking_stats(
+                AsyncMock(), "Month", booking_status="COMPLETED",
+                from_date_str="2024-01-01", to_date_str="2024-02-29",
+            )
+
+        assert result == {
+            "group_by": ["month"],
+            "groups": [
+                {"month": "2024-01-01", "count": 12, "final_price_sum": 345600},
+                {"month": "2024-02-01", "count": 9, "final_price_sum": 281000},
+            ],
+        }
+        kwargs = mock_agg.call_args[1]
+        assert kwargs["from_date"] == date(2024, 1, 1)
+        assert kwargs["booking_status"] == "COMPLETED"
+
+    async def test_unknown_dimension_is_422(self):
+        with pytest.raises(HTTPException) as exc_info:
+            await booking_stats(AsyncMock(), "category,postcode")
+        assert exc_info.value.status_code == 422
+
+    async def test_day_and_month_together_is_422(self):
+        with pytest.raises(HTTPException) as exc_info:
+            await booking_stats(AsyncMock(), "day,month")
+        assert exc_info.value.status_code == 422
+
+    async def test_operational_error_is_503(self):
+        with patch(
+            "app.services.bookings.booking_dao.aggregate",
+            new_callable=AsyncMock,
+            side_effect=sa_exc.OperationalError("SELECT", {}, Exception("down")),
+        ):
+            with pytest.raises(HTTPException) as exc_info:
+                await booking_stats(AsyncMock(), "status")
+        assert exc_info.value.status_code == 503
+
+    async def test_rollup_answers_dated_queries_when_enabled(self):
+        with patch("app.services.bookings.get_settings", return_value=MagicMock(STATS_USE_ROLLUP=True)), \
+                patch("app.services.bookings.booking_rollup_dao.aggregate", new_callable=AsyncMock, return_value=[]) as rollup, \
+                patch("app.services.bookings.booking_dao.aggregate", new_callable=AsyncMock, return_value=[]) as bookings:
+            await booking_stats(AsyncMock(), "month,category", from_date_str="2024-01-01")
+            await booking_stats(AsyncMock(), "team", from_date_str="2024-01-01")
+            await booking_stats(AsyncMock(), "month")
+
+        assert rollup.await_count == 1
+        assert bookings.await_count == 2
+
+
+class TestQueryBookings:
+    async def test_projects_rows_and_reports_more(self):
+        rows = [_stats_row(booking_id=i, service_date=date(2024, 3, i)) for i in (1, 2, 3)]
+        with patch(
+            "app.services.bookings.booking_dao.query", new_callable=AsyncMock, return_value=rows,
+        ) as mock_query:
+            result = await query_bookings(
+                AsyncMock(), 2, "booking_id, service_date,booking_id", "-service_date", location="Brisbane",
+            )
+
+        assert result == {
+            "fields": ["booking_id", "service_date"],
+            "bookings": [
+                {"booking_id": 1, "service_date": "2024-03-01"},
+                {"booking_id": 2, "service_date": "2024-03-02"},
+            ],
+            "more": True,
+        }
+        args, kwargs = mock_query.call_args
+        assert args[1:] == (["booking_id", "service_date"], 3, "service_date", True)
+        assert kwargs == {"location": "Brisbane"}
+
+    async def test_default_fields_and_limit_cap(self):
+        with patch(
+            "app.services.bookings.booking_dao.query", new_callable=AsyncMock, return_value=[],
+        ) as mock_query:
+            result = await query_bookings(AsyncMock(), 10_000)
+        assert result["fields"][0] == "booking_id" and result["more"] is False
+        assert mock_query.call_args[0][2] == 501  # SEARCH_PAGE_SIZE_MAX + 1
+
+    @pytest.mark.parametrize("fields,sort", [("name,password", "service_date"), (None, "email"), ("id", "name")])
+    async def test_unknown_field_or_sort_is_422(self, fields, sort):
+        with pytest.raises(HTTPException) as exc_info:
+            await query_bookings(AsyncMock(), 5, fields, sort)
+        assert exc_info.value.status_code == 422
+
+    async def test_operational_error_is_503(self):
+        with patch(
+            "app.services.bookings.booking_dao.query",
+            new_callable=AsyncMock,
+            side_effect=sa_exc.OperationalError("SELECT", {}, Exception("down")),
+        ):
+            with pytest.raises(HTTPException) as exc_info:
+                await query_bookings(AsyncMock(), 5)
+        assert exc_info.value.status_code == 503
+
+
+# ---------------------------------------------------------------------------
+# search_bookings_text
+# ---------------------------------------------------------------------------
+
+
+class TestSearchBookingsText:
+    async def test_dates_are_isoformatted_and_score_rounded(self):
+        row = MagicMock(
+            _mapping={"booking_id": 5, "service_date": date(2024, 2, 15), "name": "J Smith", "score": 0.71428},
+            score=0.71428,
+        )
+        with patch(
+            "app.services.bookings.booking_dao.search_text", new_callable=AsyncMock, return_value=[row],
+        ):
+            result = await search_bookings_text(AsyncMock(), "smith elm", 10)
+        assert result == [{"booking_id": 5, "service_date": "2024-02-15", "name": "J Smith", "score": 0.714}]
@@ -1,11 +1,13 @@
-"""Tests for app/services/customers.py — customer upsert validation."""
+"""Tests for app/services/customers.py — customer upsert validation and text search."""
 
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from fastapi import HTTPException
+from sqlalchemy import exc as sa_exc
 
-from app.services.customers import create_or_update_customer
+from app.services.customers import create_or_update_customer, search_customers
+from app.utils.klaviyo import WebhookRoute
 
 
 class TestCreateOrUpdateCustomer:
@@ -35,3 +37,42 @@ class TestCreateOrUpdateCustomer:
         with pytest.raises(HTTPException) as exc_info:
             await create_or_update_customer({"id": ""}, db)
         assert exc_info.value.status_code == 422
+
+    async def test_route_commits_outbox_row_with_upsert(self):
+        db = AsyncMock()
+        data = {"id": "67890", "email": "jane@example.com"}
+
+        with (
+            patch(
+                "app.services.customers.customer_dao.create_or_update_customer",
+                new_callable=AsyncMock,
+            ),
+            patch("app.services.customers.klaviyo_outbox_dao") as mock_outbox,
+        ):
+            mock_outbox.ensure_committed = AsyncMock()
+            await create_or_update_customer(data, db, route=WebhookRoute.CUSTOMER_NEW)
+
+        mock_outbox.enqueue.assert_called_once_with(db, data, WebhookRoute.CUSTOMER_NEW)
+        mock_outbox.ensure_committed.assert_called_once()
+
+
+class TestSearchCustomers:
+    async def test_rounds_score_and_strips_query(self):
+        row = MagicMock(_mapping={"customer_id": 7, "name": "Jane Smith", "score": 0.8333333}, score=0.8333333)
+        with patch(
+            "app.services.customers.customer_dao.search_text", new_callable=AsyncMock, return_value=[row],
+        ) as mock_search:
+            result = await search_customers(AsyncMock(), "  jane smith ", 5)
+
+        assert result == [{"customer_id": 7, "name": "Jane Smith", "score": 0.833}]
+        assert mock_search.call_args[0][1:] == ("jane smith", 5)
+
+    async def test_operational_error_is_503(self):
+        with patch(
+            "app.services.customers.customer_dao.search_text",
+            new_callable=AsyncMock,
+            side_effect=sa_exc.OperationalError("SELECT", {}, Exception("down")),
+        ):
+            with pytest.raises(HTTPException) as exc_info:
+                await search_customers(AsyncMock(), "jane", 5)
+        assert exc_info.value.status_code == 503
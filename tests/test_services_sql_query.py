@@ -0,0 +1,161 @@
+"""Tests for app/services/sql_query.py — SELECT checking and the read-only query runner."""
+
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import exc as sa_exc
+
+from app.core.config import get_settings
+from app.services.sql_query import SQLNotAllowed, check_sql, role_identifier, run_readonly_query
+
+
+class TestCheckSQL:
+    @pytest.mark.parametrize("sql", [
+        "select count(*) from bookings;",
+        "SELECT date_trunc('month', b._service_date)::date AS m, count(*) n, sum(b._final_price) "
+        "FROM bookings b WHERE b.booking_status = 'COMPLETED' GROUP BY 1 ORDER BY 1",
+        "with t as (select location, count(*) c from customer group by location) select * from t where c > 2",
+        'select "NDIS_who_pays", count(*) from bookings group by 1 -- by payer',
+        "select x.n from (select count(*) as n from bookings) x",
+    ])
+    def test_allowed_selects(self, sql):
+        assert check_sql(sql) == sql.strip().rstrip(";")
+
+    @pytest.mark.parametrize("sql,message", [
+        ("delete from bookings", "Only a single SELECT"),
+        ("select 1; drop table bookings", "Unexpected character ';'"),
+        ("select * from klaviyo_outbox", "'klaviyo_outbox'"),
+        ("select pg_sleep(10)", "'pg_sleep' is not allowed"),
+        ("select 1 from bookings where _service_date > now()", "Function 'now'"),
+        ("select current_setting('role')", "'current_setting' is not allowed"),
+        ("select * into copy_of from bookings", "'into' is not allowed"),
+        ("select :param", "Unexpected character ':'"),
+        ("select $$text$$", "Unexpected character '$'"),
+        ("select * from bookings) q, (select 1", "Unbalanced parentheses"),
+        ("select e'\\x41'", "'e'"),
+        ("SELECT 1 AS database_to_xml, database_to_xml(true, false, '')", "Function 'database_to_xml'"),
+        ("SELECT 1 AS table_to_xml, table_to_xml('klaviyo_outbox', true, false, '') FROM bookings",
+         "Function 'table_to_xml'"),
+        ("select x(1) from bookings x", "Function 'x'"),
+        ("select year(_service_date) from bookings", "Function 'year'"),
+    ])
+    def test_rejected_statements(self, sql, message):
+        with pytest.raises(SQLNotAllowed, match=message.replace("(", r"\(").replace("$", r"\$")):
+            check_sql(sql)
+
+    def test_type_casts_and_syntax_parentheses_are_allowed(self):
+        sql = (
+            "select _final_price::numeric(10,2), count(*) filter (where _tip > 0) from bookings "
+            "where booking_id in (1, 2) and exists (select 1 from customer)"
+        )
+        assert check_sql(sql) == sql
+
+    @pytest.mark.parametrize("role", ["", "Reader", 'x"; drop', "a b"])
+    def test_invalid_role_names(self, role):
+        with pytest.raises(ValueError):
+            role_identifier(role)
+
+
+def _db(plan_tables=("bookings",), columns=("n",), rows=((3,),)):
+    """Session mock answering SET, SET ROLE and SET, then EXPLAIN and the query on its connection."""
+    plan = MagicMock()
+    plan.scalar.return_value = json.dumps(
+        [{"Plan": {"Plans": [{"Relation Name": t} for t in plan_tables]}}]
+    )
+    result = MagicMock()
+    result.keys.return_value = list(columns)
+    result.all.return_value = list(rows)
+    db = AsyncMock()
+    db.connection.return_value.exec_driver_sql.side_effect = [plan, result]
+    return db
+
+
+def _statements(db) -> list[str]:
+    driver = db.connection.return_value.exec_driver_sql
+    return [str(c.args[0]) for c in db.execute.call_args_list + driver.call_args_list]
+
+
+@pytest.fixture(autouse=True)
+def sql_role():
+    with patch.object(get_settings(), "SQL_QUERY_ROLE", "m2m_sql_reader"):
+        yield
+
+
+class TestRunReadonlyQuery:
+    async def test_runs_wrapped_in_a_read_only_time_limited_transaction(self):
+        db = _db(rows=[(1,), (2,), (3,)])
+        result = await run_readonly_query(db, "select booking_id as n from bookings", 2)
+
+        assert result == {"columns": ["n"], "rows": [[1], [2]], "truncated": True}
+        statements = _statements(db)
+        assert statements[0] == "SET TRANSACTION READ ONLY"
+        assert statements[1] == 'SET LOCAL ROLE "m2m_sql_reader"'
+        assert statements[2] == "SET LOCAL statement_timeout = 5000"
+        assert statements[3].startswith("EXPLAIN (FORMAT JSON) SELECT * FROM (")
+        assert statements[4].endswith(") AS q LIMIT 3")
+        db.rollback.assert_awaited_once()
+
+    async def test_colon_in_a_string_literal_is_sent_to_the_driver_as_is(self):
+        db = _db()
+        sql = "select count(*) as n from bookings where name = 'note :x' or service ilike '%unit :1%'"
+        await run_readonly_query(db, sql, 5)
+        # plain strings, never text(): nothing is parsed for bind parameters
+        for call in db.connection.return_value.exec_driver_sql.call_args_list:
+            assert type(call.args[0]) is str
+            assert "'note :x'" in call.args[0] and "'%unit :1%'" in call.args[0]
+
+    async def test_row_limit_is_capped(self):
+        db = _db()
+        await run_readonly_query(db, "select count(*) as n from bookings", 10_000)
+        assert _statements(db)[4].endswith("LIMIT 501")
+
+    async def test_plan_touching_another_table_is_422(self):
+        db = _db(plan_tables=("bookings", "klaviyo_outbox"))
+        with pytest.raises(HTTPException) as exc_info:
+            await run_readonly_query(db, "select 1 as klaviyo_outbox from bookings", 5)
+        assert exc_info.value.status_code == 422
+        assert "klaviyo_outbox" in exc_info.value.detail
+        assert len(_statements(db)) == 4
+        db.rollback.assert_awaited_once()
+
+    async def test_disabled_without_a_role(self):
+        db = _db()
+        with patch.object(get_settings(), "SQL_QUERY_ROLE", ""):
+            with pytest.raises(HTTPException) as exc_info:
+                await run_readonly_query(db, "select count(*) as n from bookings", 5)
+        assert exc_info.value.status_code == 503
+        db.execute.assert_not_called()
+
+    async def test_rejected_sql_never_reaches_the_database(self):
+        db = _db()
+        with pytest.raises(HTTPException) as exc_info:
+            await run_readonly_query(db, "update bookings set tip = 0", 5)
+        assert exc_info.value.status_code == 422
+        db.execute.assert_not_called()
+
+    @pytest.mark.parametrize("error,status", [
+        (sa_exc.OperationalError("q", {}, Exception("canceling statement due to statement timeout")), 408),
+        (sa_exc.ProgrammingError("q", {}, Exception('column "nope" does not exist')), 422),
+        (sa_exc.OperationalError("q", {}, Exception("connection reset")), 503),
+        (sa_exc.StatementError("A value is required for bind parameter 'x'", "q", {}, None), 422),
+    ])
+    async def test_database_errors_are_mapped(self, error, status):
+        db = _db()
+        db.connection.return_value.exec_driver_sql.side_effect = [error]
+        with pytest.raises(HTTPException) as exc_info:
+            await run_readonly_query(db, "select count(*) as n from bookings", 5)
+        assert exc_info.value.status_code == status
+        db.rollback.assert_awaited_once()
+
+
+class TestCreateSQLRole:
+    def test_role_only_gets_select_on_the_allowed_tables(self):
+        from app.database.create_sql_role import role_statements
+
+        statements = role_statements("m2m_sql_reader")
+        assert "CREATE ROLE \"m2m_sql_reader\" NOLOGIN" in statements[0]
+        assert 'REVOKE ALL ON ALL TABLES IN SCHEMA public FROM "m2m_sql_reader"' in statements
+        assert 'GRANT SELECT ON bookings, customer TO "m2m_sql_reader"' in statements
+        assert statements[-1] == 'GRANT "m2m_sql_reader" TO CURRENT_USER'
@@ -0,0 +1,85 @@
+"""Tests for app/core/surface.py — request surface tagging and per-surface concurrency limits."""
+
+import asyncio
+
+import httpx
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app.core.surface import MCP, SURFACE_HEADER, SurfaceLimitMiddleware, current_surface
+
+MCP_HEADERS = {SURFACE_HEADER: MCP}
+
+
+def _client(limit: int, queue_timeout: float = 0.0, gate: asyncio.Event | None = None):
+    """httpx client for a one-route app whose handler reports the surface, held open by `gate`."""
+    async def handler(request):
+        surface = current_surface.get()
+        if gate is not None:
+            await gate.wait()
+        return JSONResponse({"surface": surface})
+
+    app = Starlette(routes=[Route("/", handler)])
+    wrapped = SurfaceLimitMiddleware(app, limits={MCP: limit}, queue_timeout=queue_timeout)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=wrapped), base_url="http://test")
+
+
+class TestSurfaceLimitMiddleware:
+    async def test_requests_are_tagged_by_header(self):
+        async with _client(limit=2) as client:
+            assert (await client.get("/")).json() == {"surface": "api"}
+            assert (await client.get("/", headers=MCP_HEADERS)).json() == {"surface": "mcp"}
+        assert current_surface.get() == "api"
+
+    async def test_mcp_over_limit_is_429_without_blocking_api(self):
+        gate = asyncio.Event()
+        async with _client(limit=1, gate=gate) as client:
+            held = asyncio.create_task(client.get("/", headers=MCP_HEADERS))
+            await asyncio.sleep(0.05)
+            rejected = await client.get("/", headers=MCP_HEADERS)
+            api = asyncio.create_task(client.get("/"))
+            await asyncio.sleep(0.05)
+            gate.set()
+            assert (await held).status_code == 200
+            assert (await api).json() == {"surface": "api"}
+
+        assert rejected.status_code == 429
+        assert rejected.headers["retry-after"] == "1"
+
+    async def test_mcp_over_limit_queues_for_a_free_slot(self):
+        gate = asyncio.Event()
+        async with _client(limit=1, queue_timeout=5, gate=gate) as client:
+            first = asyncio.create_task(client.get("/", headers=MCP_HEADERS))
+            second = asyncio.create_task(client.get("/", headers=MCP_HEADERS))
+            await asyncio.sleep(0.05)
+            assert not second.done()
+            gate.set()
+            assert [(await r).status_code for r in (first, second)] == [200, 200]
+
+    async def test_queue_timeout_gives_429(self):
+        gate = asyncio.Event()
+        async with _client(limit=1, queue_timeout=0.05, gate=gate) as client:
+            held = asyncio.create_task(client.get("/", headers=MCP_HEADERS))
+            await asyncio.sleep(0.02)
+            assert (await client.get("/", headers=MCP_HEADERS)).status_code == 429
+            gate.set()
+            await held
+
+    async def test_zero_limit_disables_the_limit(self):
+        async with _client(limit=0) as client:
+            responses = await asyncio.gather(*(client.get("/", headers=MCP_HEADERS) for _ in range(5)))
+        assert {r.status_code for r in responses} == {200}
+
+    def test_mcp_tool_calls_carry_the_surface_header(self):
+        from app.main import app, mcp
+
+        assert mcp._http_client.headers[SURFACE_HEADER] == MCP
+        assert any(m.cls is SurfaceLimitMiddleware for m in app.user_middleware)
+
+    def test_unbounded_export_is_not_an_mcp_tool(self):
+        from app.main import mcp
+
+        names = {tool.name for tool in mcp.tools}
+        assert "export_bookings" not in names
+        assert {"query_bookings", "get_booking_details"} <= names